@@ -0,0 +1,95 @@
+"""
+Fills in the columns that summarize other tables:
+  - the summary of each demand's bids on the Demand table: the lowest bid
+    (min_bid), the number of bids (bid_count) and the time of the latest
+    bid (last_bid_at)
+  - the average rating each client and developer received (avg_rating)
+    and gave (avg_given_rating)
+  - the number of users, clients and developers in the Counter table
+  - the opening balance of each client and developer in the Ledger table,
+    from the balance column of their row
+
+Usage:
+    python3 backfill.py
+
+Bid(), Rating(), the ledger and the User, Client and Developer classes keep
+these up to date, so this only needs to be run once on a database from
+before they were maintained, or to correct counters that drifted. It uses the CSV files or the database given by
+TURK_DATABASE_URL, the same way the site does.
+"""
+import pandas as pd
+import tables
+from models import Counter, Ledger
+
+
+def backfill_bids():
+    """
+    Computes min_bid, bid_count and last_bid_at for every demand from the Bid table.
+    """
+    with tables.session():
+        demands = tables.read('Demand').copy()
+        bids = tables.read('Bid').copy()
+
+        bids['bid_time'] = pd.to_datetime(bids['date_bidded'], format='%m-%d-%Y %I:%M %p')
+        grouped = bids.groupby('demand_id')
+        latest = bids.loc[grouped['bid_time'].idxmax()].set_index('demand_id')
+
+        demands['min_bid'] = grouped['bid_amount'].min()
+        demands['bid_count'] = grouped.size().reindex(demands.index).fillna(0).astype(int)
+        demands['last_bid_at'] = latest['date_bidded']
+
+        tables.write('Demand', demands)
+
+    print('Demand: {} rows, {} with bids'.format(len(demands), demands['bid_count'].gt(0).sum()))
+
+
+def backfill_ratings():
+    """
+    Computes avg_rating and avg_given_rating for every client and developer from the Rating table.
+    Users without ratings get 0, the same as new users.
+    """
+    with tables.session():
+        ratings = tables.read('Rating')
+        received = ratings.groupby('recipient')['rating'].mean()
+        given = ratings.groupby('rater')['rating'].mean()
+
+        for name in ['Client', 'Developer']:
+            users = tables.read(name).copy()
+            users['avg_rating'] = users['username'].map(received).fillna(0)
+            users['avg_given_rating'] = users['username'].map(given).fillna(0)
+            tables.write(name, users)
+
+            print('{}: {} rows, {} with ratings'.format(name, len(users), users['username'].isin(received.index).sum()))
+
+
+def backfill_counters():
+    """
+    Counts the users, clients and developers again and corrects their counters.
+    """
+    corrected = Counter.reconcile()
+    for name in sorted(Counter.COUNTED):
+        if name in corrected:
+            print('{}: {} -> {}'.format(name, corrected[name][0], corrected[name][1]))
+        else:
+            print('{}: {}'.format(name, Counter.get(name)))
+
+
+def backfill_ledger():
+    """
+    Gives the clients and developers who have no entries in the ledger their opening balance.
+    """
+    opened = Ledger.open_missing_accounts()
+    for username in sorted(opened):
+        print('{}: opened with {:.2f}'.format(username, opened[username]))
+    print('Ledger: {} accounts opened'.format(len(opened)))
+
+
+def backfill():
+    backfill_bids()
+    backfill_ratings()
+    backfill_counters()
+    backfill_ledger()
+
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,97 @@
+"""
+Measures how many of the truly most similar demands the MinHash index in
+minhash.py finds (its recall), and how long a query takes compared to
+computing the Jaccard similarity of the query with every demand.
+
+Usage:
+    python3 bench_minhash.py [number of demands] [number of queries]
+
+The demands are made up, so the benchmark does not touch the database. Each
+one takes a few tags from one of a number of topics, plus a few tags from
+the whole vocabulary, the way demands about the same kind of system share
+most of their tags. Recall is the share of the exact top COUNT demands
+with a similarity of at least THRESHOLD that the index also returns.
+"""
+import random
+import sys
+import time
+import pandas as pd
+import minhash
+
+COUNT = 5
+THRESHOLD = 0.5
+TOPICS = 200
+TAGS_PER_TOPIC = 12
+
+
+def _name(number):
+    # tags are made of letters only (see helpers.TAG_PATTERN)
+    letters = ''
+    while True:
+        number, letter = divmod(number, 26)
+        letters += chr(ord('a') + letter)
+        if number == 0:
+            return 'tag' + letters
+
+
+VOCABULARY = [_name(number) for number in range(TOPICS * TAGS_PER_TOPIC)]
+
+
+def make_demands(number, generator):
+    """
+    Returns a Demand-like frame of [number] rows with only the tags column.
+    """
+    tags = []
+    for _ in range(number):
+        topic = generator.randrange(TOPICS) * TAGS_PER_TOPIC
+        demand_tags = set(generator.sample(VOCABULARY[topic:topic + TAGS_PER_TOPIC], generator.randint(3, 6)))
+        demand_tags.update(generator.sample(VOCABULARY, generator.randint(0, 2)))
+        tags.append(' '.join(sorted(demand_tags)))
+    return pd.DataFrame({'tags': tags})
+
+
+def exact(index, tags, count, exclude):
+    """
+    Returns the ids of the [count] demands most similar to [tags] by comparing every demand.
+    """
+    scored = sorted((-minhash.jaccard(tags, demand_tags), demand_id)
+                    for demand_id, demand_tags in index.tags.items() if demand_id not in exclude)
+    return [demand_id for score, demand_id in scored[:count] if score < 0]
+
+
+def main(number, queries):
+    generator = random.Random(0)
+    demands = make_demands(number, generator)
+
+    start = time.perf_counter()
+    index = minhash.DemandIndex(demands)
+    print('built the index of %d demands in %.2fs' % (number, time.perf_counter() - start))
+
+    query_ids = generator.sample(range(number), queries)
+    found = relevant = 0
+    exact_seconds = lsh_seconds = 0.0
+    for demand_id in query_ids:
+        tags = index.tags[demand_id]
+
+        start = time.perf_counter()
+        expected = exact(index, tags, COUNT, [demand_id])
+        exact_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = index.similar(tags, COUNT, exclude=[demand_id])
+        lsh_seconds += time.perf_counter() - start
+
+        expected = [expected_id for expected_id in expected
+                    if minhash.jaccard(tags, index.tags[expected_id]) >= THRESHOLD]
+        relevant += len(expected)
+        found += len(set(expected) & set(result))
+
+    print('recall of the top %d with similarity >= %.1f: %.3f (%d of %d)'
+          % (COUNT, THRESHOLD, found / float(max(relevant, 1)), found, relevant))
+    print('exact:   %.3f ms per query' % (1000 * exact_seconds / queries))
+    print('minhash: %.3f ms per query' % (1000 * lsh_seconds / queries))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200)
@@ -0,0 +1,129 @@
+"""
+Queue of the upcoming deadlines of the demands, so that the deadline checks
+in models.py only look at the demands whose deadline has come instead of
+parsing the deadlines of every demand ever posted.
+
+Each demand has up to four entries, one per kind of check, due at:
+  - bidding_warning: when the bidding deadline is approaching
+  - expired: when the bidding deadline passes
+  - submission_warning: when the submission deadline is approaching
+  - overdue: when the submission deadline passes
+
+The queue is a view of the Demand table (see tables.view), so new demands
+are added to it as they are posted. That includes the demands posted and
+changed by other processes, such as the site's when the checks run in
+scheduler.py, which the queue reads from the table's journal instead of
+being built again. A demand that has nothing left to check
+for a kind, such as one that already expired, has no entry for it. When a
+demand changes so that a check applies to it again, it is queued again.
+"""
+import contextlib
+import datetime
+import heapq
+import threading
+import pandas as pd
+
+DATE_FORMAT = '%m-%d-%Y %I:%M %p'
+# a deadline is approaching once it is less than this far away, which is
+# when (deadline - now).days <= 1 in the checks
+APPROACHING = datetime.timedelta(days=2)
+
+
+def _false(values):
+    """
+    Returns True where [values] is falsy the way `not value` treats it, so NaN counts as True.
+    """
+    return values.fillna(True) == False
+
+
+def _bidding_warning(demands):
+    return _false(demands['bidding_deadline_approaching_notif_sent'])
+
+
+def _expired(demands):
+    # bids are never taken back, so a demand with bids can not expire
+    return _false(demands['is_expired']) & (demands['bid_count'].fillna(0) == 0)
+
+
+def _submission_warning(demands):
+    return (_false(demands['is_expired']) & demands['chosen_developer_username'].notnull() &
+            _false(demands['submission_deadline_approaching_notif_sent']))
+
+
+def _overdue(demands):
+    return _false(demands['is_expired']) & demands['chosen_developer_username'].notnull() & _false(demands['is_completed'])
+
+
+# kind of check -> (column with the deadline, how long before it the entry is due,
+#                   function returning which demands still need the check)
+KINDS = {'bidding_warning': ('bidding_deadline', APPROACHING, _bidding_warning),
+         'expired': ('bidding_deadline', datetime.timedelta(0), _expired),
+         'submission_warning': ('submission_deadline', APPROACHING, _submission_warning),
+         'overdue': ('submission_deadline', datetime.timedelta(0), _overdue)}
+
+# columns that decide whether a check applies to a demand, besides the ones in KINDS
+_INPUTS = ['chosen_developer_username']
+
+
+class DeadlineQueue:
+    """
+    A min-heap per kind of check of (due time, demand id), built from the rows [demands].
+    """
+    def __init__(self, demands):
+        self._lock = threading.Lock()
+        self._heaps = dict((kind, []) for kind in KINDS)
+        self.add(demands)
+
+    def add(self, demands):
+        """
+        Queues the checks that the rows [demands] still need.
+        """
+        self._push(demands, dict((kind, needed(demands)) for kind, (column, before, needed) in KINDS.items()))
+
+    def update(self, old_demands, new_demands):
+        """
+        Queues the checks that changed rows need again: the ones that did not apply to
+        [old_demands] or whose deadline or inputs changed.
+        """
+        rows = {}
+        for kind, (column, before, needed) in KINDS.items():
+            columns = [column] + _INPUTS
+            old, new = old_demands[columns], new_demands[columns]
+            changed = ~((old == new) | (old.isnull() & new.isnull())).all(axis=1)
+            rows[kind] = needed(new_demands) & (changed | ~needed(old_demands))
+        self._push(new_demands, rows)
+
+    def _push(self, demands, rows):
+        entries = []
+        for kind, (column, before, needed) in KINDS.items():
+            selected = demands.loc[rows[kind], column]
+            deadlines = pd.to_datetime(selected, format=DATE_FORMAT, errors='coerce').dropna()
+            for demand_id, deadline in zip(deadlines.index, deadlines):
+                entries.append((kind, deadline.to_pydatetime() - before, int(demand_id)))
+
+        with self._lock:
+            for kind, due, demand_id in entries:
+                heapq.heappush(self._heaps[kind], (due, demand_id))
+
+    @contextlib.contextmanager
+    def due(self, kind, now):
+        """
+        Takes the entries of [kind] that are due before [now] off the queue and runs the block
+        with the sorted list of their demand ids. If the block raises, the entries are put back.
+        """
+        with self._lock:
+            heap = self._heaps[kind]
+            entries = []
+            while heap and heap[0][0] < now:
+                entries.append(heapq.heappop(heap))
+        try:
+            yield sorted(set(demand_id for due, demand_id in entries))
+        except:
+            with self._lock:
+                for entry in entries:
+                    heapq.heappush(self._heaps[kind], entry)
+            raise
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(heap) for heap in self._heaps.values())
@@ -1,7 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, RadioField, SubmitField, SelectField, TextAreaField, DateField, ValidationError, DecimalField, FileField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, InputRequired
-from models import Applicant, Bid
+from models import Applicant, Demand
 
 def validate_user_id(form,field):
 	"""
@@ -27,11 +27,9 @@ def validate_bid_amount(form, field, demand_id):
 	Validates if bid_amount is less than the lowest bid, if there is any.
 	Also validates that bid_amount is a positive number.
 	"""
-	bids = Bid.get_bids_for_demand(demand_id)
-
-	if len(bids) > 0:
-		lowest_bid_amount = Bid.get_info(bids[0]).bid_amount
+	lowest_bid_amount = Demand.get_info(demand_id)['min_bid']
 
+	if lowest_bid_amount is not None:
 		if float(field.data) >= float(lowest_bid_amount):
 			print(field.data)
 			raise ValidationError('Bid must be lower than the currently lowest bid.')
@@ -179,6 +177,14 @@ class DeleteAccountApprovalForm(FlaskForm):
 	decision = SelectField(label='Please select your decision', id='decision', validators=[DataRequired('Please choose an option.')], choices = [('approve','Approve'),('deny','Deny')],)
 	submit = SubmitField('Submit')
 
+class BatchApprovalForm(FlaskForm):
+	"""
+	Form on the superuser's dashboard to approve/deny every selected item of a list at once
+	"""
+	decision = SelectField(label='Decision', validators=[DataRequired('Please choose an option.')], choices = [('approve','Approve selected'),('deny','Deny selected')],)
+	reason = TextAreaField(label='Reason for Decision')
+	submit = SubmitField('Submit')
+
 class AddFundsForm(FlaskForm):
 	"""
 	Form for user to add funds to their acccount.
@@ -1,10 +1,15 @@
 """
 Module of helper functions
 """
+import bisect
 import hashlib
+import re
 import pandas as pd
 from csv import reader
 
+# characters between tags: whitespace, punctuation and digits
+TAG_PATTERN = r'[^\s!,.?":;0-9]+'
+
 def hash_password(password):
     """
     Returns the hash of the given password.
@@ -12,3 +17,131 @@ def hash_password(password):
     hash_object = hashlib.sha256(password.encode())
     return hash_object.hexdigest()
 
+def tokenize_tags(tags):
+    """
+    Returns the set of lowercase tags in the string [tags].
+    Returns an empty set if [tags] is not a string, such as a NaN from an empty cell.
+    """
+    if not isinstance(tags, str):
+        return set()
+    return set(tag.lower() for tag in re.findall(TAG_PATTERN, tags))
+
+def build_tag_index(demands):
+    """
+    Returns an inverted index from each tag to the set of ids of the [demands] that have it.
+    """
+    index = {}
+    add_to_tag_index(index, demands)
+    return index
+
+def add_to_tag_index(index, demands):
+    """
+    Adds the tags of the new rows [demands] to the inverted [index].
+    """
+    for demand_id, tags in demands['tags'].items():
+        for tag in tokenize_tags(tags):
+            index.setdefault(tag, set()).add(demand_id)
+
+def update_tag_index(index, old_demands, new_demands):
+    """
+    Moves the changed rows from the tags in [old_demands] to the tags in [new_demands].
+    """
+    for demand_id, tags in old_demands['tags'].items():
+        for tag in tokenize_tags(tags):
+            index[tag].discard(demand_id)
+    add_to_tag_index(index, new_demands)
+
+def build_rating_totals(ratings):
+    """
+    Returns the running totals of [ratings]. The dictionary maps 'recipient' and 'rater' to a
+    dictionary from each username to the [sum, count] of the ratings they received or gave.
+    """
+    totals = {'recipient': {}, 'rater': {}}
+    add_to_rating_totals(totals, ratings)
+    return totals
+
+def add_to_rating_totals(totals, ratings):
+    """
+    Adds the new rows [ratings] to the running [totals].
+    """
+    for column, by_user in totals.items():
+        grouped = ratings.groupby(column)['rating'].agg(['sum', 'count'])
+        for username, rating_sum, rating_count in zip(grouped.index, grouped['sum'], grouped['count']):
+            total = by_user.setdefault(username, [0, 0])
+            total[0] += rating_sum
+            total[1] += rating_count
+
+def build_inbox_index(notifications):
+    """
+    Returns the inbox of each recipient of [notifications]. The dictionary maps each recipient to
+    [ids, unread_ids], the ids of all their notifications and of the ones whose read_status is
+    False, each from oldest to newest.
+    """
+    inboxes = {}
+    add_to_inbox_index(inboxes, notifications)
+    return inboxes
+
+def add_to_inbox_index(inboxes, notifications):
+    """
+    Adds the new rows [notifications] to the end of the [inboxes].
+    """
+    unread = notifications['read_status'] == False
+    for notification_id, recipient, is_unread in zip(notifications.index, notifications['recipient'], unread):
+        inbox = inboxes.setdefault(recipient, [[], []])
+        inbox[0].append(notification_id)
+        if is_unread:
+            inbox[1].append(notification_id)
+
+def update_inbox_index(inboxes, old_notifications, new_notifications):
+    """
+    Moves the changed rows from where [old_notifications] had them in the [inboxes]
+    to where [new_notifications] has them.
+    """
+    old_unread = old_notifications['read_status'] == False
+    new_unread = new_notifications['read_status'] == False
+    for notification_id in old_notifications.index:
+        inbox = inboxes[old_notifications.at[notification_id, 'recipient']]
+        inbox[0].remove(notification_id)
+        if old_unread[notification_id]:
+            inbox[1].remove(notification_id)
+
+        inbox = inboxes.setdefault(new_notifications.at[notification_id, 'recipient'], [[], []])
+        bisect.insort(inbox[0], notification_id)
+        if new_unread[notification_id]:
+            bisect.insort(inbox[1], notification_id)
+
+def build_blacklist(blacklisted):
+    """
+    Returns the set of usernames in the BlacklistedUser rows [blacklisted].
+    """
+    usernames = set()
+    add_to_blacklist(usernames, blacklisted)
+    return usernames
+
+def add_to_blacklist(usernames, blacklisted):
+    """
+    Adds the usernames of the new rows [blacklisted] to the set [usernames].
+    """
+    usernames.update(blacklisted['user_id'].dropna())
+
+def build_deleted_users(delete_requests):
+    """
+    Returns the set of usernames whose delete request in [delete_requests] was approved.
+    """
+    return set(delete_requests.loc[delete_requests['status'] == 'approved', 'username'].dropna())
+
+def build_balances(entries):
+    """
+    Returns the running balance of each account in the Ledger rows [entries], as a
+    dictionary from account to the sum of the amounts of its entries.
+    """
+    balances = {}
+    add_to_balances(balances, entries)
+    return balances
+
+def add_to_balances(balances, entries):
+    """
+    Adds the amounts of the new rows [entries] to the running [balances].
+    """
+    for account, amount in entries.groupby('account')['amount'].sum().items():
+        balances[account] = balances.get(account, 0) + amount
@@ -0,0 +1,117 @@
+"""
+Leaderboards of the users with the highest scores, such as the clients with
+the most projects or the developers with the most earnings.
+
+A leaderboard only keeps the order of its top SIZE users. It is a view of a
+table (see tables.view), so it is built once and then kept up to date as rows
+are appended and changed, and reading it does not sort the table.
+"""
+import heapq
+from collections import Counter
+import tables
+
+# number of users kept in order on each leaderboard, more than are shown so
+# that users who are blacklisted or deleted can be skipped
+SIZE = 10
+
+
+class Leaderboard:
+    """
+    The [size] users with the highest scores, out of [scores], an iterable of
+    (username, score) pairs. Users with the same score are ordered by username.
+    """
+    def __init__(self, size, scores):
+        self.size = size
+        self.scores = dict(scores)
+        self.top = heapq.nsmallest(size, self.scores, key=self._key)
+
+    def _key(self, username):
+        return (-self.scores[username], username)
+
+    def set(self, username, score):
+        """
+        Sets the score of [username] and moves them on the leaderboard.
+        """
+        old_score = self.scores.get(username)
+        self.scores[username] = score
+
+        if username in self.top:
+            if old_score is not None and score < old_score and len(self.scores) > self.size:
+                # someone who is not on the leaderboard may have passed them
+                self.top = heapq.nsmallest(self.size, self.scores, key=self._key)
+            else:
+                self.top.sort(key=self._key)
+        elif len(self.top) < self.size or self._key(username) < self._key(self.top[-1]):
+            self.top.append(username)
+            self.top.sort(key=self._key)
+            del self.top[self.size:]
+
+    def first(self, count, keep=None):
+        """
+        Returns the usernames of the first [count] users on the leaderboard,
+        skipping those for whom keep(username) is False.
+        """
+        usernames = []
+        for username in self.top:
+            if len(usernames) == count:
+                break
+            if keep is None or keep(username):
+                usernames.append(username)
+        return usernames
+
+
+class Board:
+    """
+    A leaderboard of the users in a table, scored by the value of [column]
+    in the row with their username.
+    """
+    def __init__(self, column):
+        self.column = column
+
+    def scores(self, rows):
+        rows = rows.loc[rows['username'].notnull()]
+        return zip(rows['username'], rows[self.column].fillna(0))
+
+    def build(self, frame):
+        return Leaderboard(SIZE, self.scores(frame))
+
+    def add(self, leaderboard, new_rows):
+        for username, score in self.scores(new_rows):
+            leaderboard.set(username, score)
+
+    def update(self, leaderboard, old_rows, new_rows):
+        self.add(leaderboard, new_rows)
+
+    def get(self, name):
+        """
+        Returns the leaderboard of the table [name].
+        """
+        return tables.view(name, self.build, self.add, self.update)
+
+
+class CountBoard(Board):
+    """
+    A leaderboard of users scored by the number of rows whose [column] holds
+    their username, such as the number of demands each client posted.
+    """
+    def scores(self, rows):
+        return rows.groupby(self.column).size().items()
+
+    def add(self, leaderboard, new_rows):
+        for username, count in self.scores(new_rows):
+            leaderboard.set(username, leaderboard.scores.get(username, 0) + count)
+
+    def update(self, leaderboard, old_rows, new_rows):
+        changes = Counter(dict(self.scores(new_rows)))
+        changes.subtract(dict(self.scores(old_rows)))
+        for username, change in changes.items():
+            if change != 0:
+                leaderboard.set(username, leaderboard.scores.get(username, 0) + change)
+
+
+# clients by the number of demands they posted, from the Demand table
+PROJECTS = CountBoard('client_username')
+# developers by their earnings, from the Developer table
+EARNINGS = Board('earnings')
+# clients or developers by the number of projects they completed, from the Client or Developer table
+COMPLETED = Board('num_of_completed_projects')
@@ -0,0 +1,39 @@
+"""
+Creates the SQLite database from the CSV files in the database folder.
+
+Usage:
+    python3 migrate.py [database url]
+
+The url defaults to the TURK_DATABASE_URL environment variable, or to
+sqlite:///database/turk.db if it is not set. Tables that already exist in
+the database are replaced by the contents of their CSV file.
+"""
+import os
+import sys
+from tables import CsvBackend
+from sqlstore import SqliteBackend, metadata, versions, journal
+
+DEFAULT_URL = 'sqlite:///database/turk.db'
+
+
+def migrate(url):
+    """
+    Copies every table from its CSV file into the database at [url].
+    """
+    source = CsvBackend()
+    target = SqliteBackend(url)
+
+    for name in metadata.tables:
+        if name in (versions.name, journal.name):
+            continue
+        df = source.load(name)
+        target.save(name, df)
+        print('{}: {} rows'.format(name, len(df)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        url = sys.argv[1]
+    else:
+        url = os.environ.get('TURK_DATABASE_URL', DEFAULT_URL)
+    migrate(url)
@@ -0,0 +1,142 @@
+"""
+MinHash signatures of the tag sets of the demands, stored in banded
+locality-sensitive hashing (LSH) buckets, for finding the demands with tags
+similar to a given set of tags without comparing it to every demand.
+
+The signature of a tag set holds, for each of NUM_HASHES hash functions, the
+smallest hash of its tags. Two sets agree on a position of their signatures
+with a probability equal to their Jaccard similarity (the size of their
+intersection over the size of their union). The signature is cut into BANDS
+bands of ROWS positions, and demands that agree on a whole band share a
+bucket. Only the demands in the query's buckets are compared to it. A demand
+with similarity s shares a bucket with probability 1 - (1 - s ** ROWS) ** BANDS,
+which is above 0.99 for s >= 0.4 with the sizes below but only about 0.25
+for s = 0.1.
+
+The index is a view of the Demand table (see tables.view), so it is kept up
+to date as demands are posted and their tags change. bench_minhash.py
+measures its recall and speed against comparing every demand.
+"""
+import threading
+import zlib
+import numpy as np
+import helpers
+
+BANDS = 32
+ROWS = 2
+NUM_HASHES = BANDS * ROWS
+
+# the hash functions are the high 32 bits of (a * x + b) mod 2 ** 64, with
+# a random odd a and random b, of the CRC32 of each tag, which does not change
+# between processes the way hash() does
+_random = np.random.RandomState(20171201)
+_A = _random.randint(0, 1 << 63, NUM_HASHES, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _random.randint(0, 1 << 63, NUM_HASHES, dtype=np.uint64)
+
+
+def signature(tags):
+    """
+    Returns the MinHash signature of the set of strings [tags], or None if it is empty.
+    """
+    if not tags:
+        return None
+    hashes = np.array([zlib.crc32(tag.encode('utf-8')) for tag in tags], dtype=np.uint64)
+    return ((hashes[:, None] * _A + _B) >> np.uint64(32)).min(axis=0)
+
+
+def bands(signature):
+    """
+    Returns the bucket keys of [signature], one per band.
+    """
+    return [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+def jaccard(first, second):
+    """
+    Returns the Jaccard similarity of the sets [first] and [second].
+    """
+    if not first or not second:
+        return 0.0
+    return len(first & second) / float(len(first | second))
+
+
+class DemandIndex:
+    """
+    The LSH buckets of the tag sets of the rows [demands].
+    """
+    def __init__(self, demands):
+        self._lock = threading.Lock()
+        # demand id -> frozenset of tags
+        self.tags = {}
+        # (band, values of the band) -> set of demand ids
+        self._buckets = {}
+        self.add(demands)
+
+    def add(self, demands):
+        """
+        Adds the new rows [demands] to the index.
+        """
+        entries = [(int(demand_id), frozenset(helpers.tokenize_tags(tags))) for demand_id, tags in demands['tags'].items()]
+        signatures = [signature(tags) for demand_id, tags in entries]
+        with self._lock:
+            for (demand_id, tags), demand_signature in zip(entries, signatures):
+                self._insert(demand_id, tags, demand_signature)
+
+    def update(self, old_demands, new_demands):
+        """
+        Moves the changed rows whose tags changed to the buckets of their new tags.
+        """
+        changed = [demand_id for demand_id in new_demands.index
+                   if helpers.tokenize_tags(old_demands.at[demand_id, 'tags']) != helpers.tokenize_tags(new_demands.at[demand_id, 'tags'])]
+        if not changed:
+            return
+
+        with self._lock:
+            for demand_id in changed:
+                self._remove(int(demand_id))
+        self.add(new_demands.loc[changed])
+
+    def _insert(self, demand_id, tags, demand_signature):
+        self.tags[demand_id] = tags
+        if demand_signature is not None:
+            for key in bands(demand_signature):
+                self._buckets.setdefault(key, set()).add(demand_id)
+
+    def _remove(self, demand_id):
+        tags = self.tags.pop(demand_id, None)
+        demand_signature = signature(tags)
+        if demand_signature is not None:
+            for key in bands(demand_signature):
+                bucket = self._buckets[key]
+                bucket.discard(demand_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def candidates(self, tags):
+        """
+        Returns the set of ids of the demands that share a bucket with the set [tags].
+        """
+        query = signature(tags)
+        if query is None:
+            return set()
+
+        found = set()
+        with self._lock:
+            for key in bands(query):
+                found |= self._buckets.get(key, set())
+        return found
+
+    def similar(self, tags, count, exclude=()):
+        """
+        Returns the ids of up to [count] demands whose tags are most similar to the set [tags],
+        most similar first, leaving out the ids in [exclude].
+        """
+        tags = frozenset(tags)
+        found = self.candidates(tags) - set(exclude)
+        scored = []
+        with self._lock:
+            for demand_id in found:
+                if demand_id in self.tags:
+                    scored.append((-jaccard(tags, self.tags[demand_id]), demand_id))
+        scored.sort()
+        return [demand_id for score, demand_id in scored[:count] if score < 0]
@@ -1,21 +1,41 @@
+import bisect
+import collections
 import numpy as np
 import pandas as pd
 import hashlib
 import datetime
+import json
 from werkzeug import generate_password_hash, check_password_hash
-import re
+import helpers
 from helpers import hash_password
+import tables
+import leaderboard
+import deadlines
+import minhash
+import similarity
+import pubsub
 
 class User:
     """
     User class. Has methods that inserts to and reads from the User table.
     """
     def __init__(self, first_name, last_name, email, phone, credit_card, type_of_user):
-        df = pd.read_csv('database/User.csv')
+        User.bulk_create([{'first_name': first_name, 'last_name': last_name, 'email': email,
+                           'phone': phone, 'credit_card': credit_card, 'type_of_user': type_of_user}])
 
-        df.loc[len(df)] = pd.Series(data=[' ', ' ', first_name, last_name, email, phone, credit_card, type_of_user,'','','',''],
-                           index=['username', 'password', 'first_name', 'last_name', 'email', 'phone', 'credit_card', 'type_of_user','portfolio', 'about', 'resume', 'interests'])
-        df.to_csv('database/User.csv', index=False)
+    @staticmethod
+    def bulk_create(rows):
+        """
+        Creates many users with one write. Each row is a dictionary with the first_name, last_name,
+        email, phone, credit_card and type_of_user of a user, who sets their username and password
+        later (see set_credentials).
+        """
+        with tables.session():
+            tables.append('User', [{'username': ' ', 'password': ' ',
+                                    'first_name': row['first_name'], 'last_name': row['last_name'],
+                                    'email': row['email'], 'phone': row['phone'],
+                                    'credit_card': row['credit_card'], 'type_of_user': row['type_of_user']} for row in rows])
+            Counter.add('users', len(rows))
 
     @staticmethod
     def has_user_id(username):
@@ -23,27 +43,55 @@ class User:
         Returns True if the username exists in the User table.
         Returns False otherwise.
         """
-        df = pd.read_csv('database/User.csv')
-        tmp = df.loc[df['username'] == username]
+        tmp = tables.lookup('User', 'username', username)
 
         return not tmp.empty
 
+    @staticmethod
+    def get_project_tags(username):
+        """
+        Returns a Counter of the number of the user's projects with each tag: the demands a
+        client posted, or the projects a developer completed.
+        """
+        if User.get_user_info(username)['type_of_user'] == 'client':
+            projects = Client.get_projects_posted(username)
+        else: #is developer
+            projects = Developer.get_past_projects(username)
+
+        tags = collections.Counter()
+        for demand_tags in tables.rows('Demand', projects)['tags']:
+            tags.update(helpers.tokenize_tags(demand_tags))
+        return tags
+
+    @staticmethod
+    def get_unlisted():
+        """
+        Returns the set of usernames that are blacklisted or deleted.
+        """
+        blacklisted = tables.view('BlacklistedUser', helpers.build_blacklist, helpers.add_to_blacklist)
+        deleted = tables.view('DeleteRequest', helpers.build_deleted_users)
+        return blacklisted | deleted
+
+    @staticmethod
+    def is_listed(username):
+        """
+        Returns True if [username] can be shown on leaderboards and recommendations,
+        that is, if they are neither blacklisted nor deleted.
+        """
+        return not BlacklistedUser.is_blacklisted(username) and not DeleteRequest.is_account_deleted(username)
+
     @staticmethod
     def set_credentials(username, password, email):
         """
         After a user is approved, the user can set his/her official username and password.
         This method stores this information in the User table.
         """
-        # Change the login credentials in Applicant database
-        df = pd.read_csv('database/Applicant.csv')
-        df.loc[df.email == email, 'username'] = username
-        df.loc[df.email == email, 'password'] = hash_password(password)
-        df.to_csv('database/Applicant.csv', index=False)
-        # Change the login credentials in User database
-        df = pd.read_csv('database/User.csv')
-        df.loc[df.email == email, 'username'] = username
-        df.loc[df.email == email, 'password'] = hash_password(password)
-        df.to_csv('database/User.csv', index=False)
+        credentials = {'username': username, 'password': hash_password(password)}
+        with tables.session():
+            # Change the login credentials in Applicant database
+            tables.update('Applicant', 'email', email, credentials)
+            # Change the login credentials in User database
+            tables.update('User', 'email', email, credentials)
 
     
     @staticmethod
@@ -52,12 +100,8 @@ class User:
         After a user is approved, the user can keep their old username and password.
         This method stores this information in the User table.
         """
-        df = pd.read_csv('database/Applicant.csv')
-        password = df.loc[df.user_id == username, 'password']
-        df = pd.read_csv('database/User.csv')
-        df.loc[df.email == email, 'username'] = username
-        df.loc[df.email == email, 'password'] = password
-        df.to_csv('database/User.csv', index=False)
+        password = tables.lookup('Applicant', 'user_id', username)['password'].item()
+        tables.update('User', 'email', email, {'username': username, 'password': password})
 
     @staticmethod
     def check_password(username, password):
@@ -66,8 +110,7 @@ class User:
         Returns true if password given matches the password for username 
         given and false if the password does not match.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
+        user = tables.lookup('User', 'username', username)
         if not user.empty:
             pwhash = user['password'].item()
             return pwhash == hash_password(password)  
@@ -77,8 +120,7 @@ class User:
         """
         Returns a dictionary of the user's information.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
+        user = tables.lookup('User', 'username', username)
 
         if not user.empty:
             return {'username': username,
@@ -99,8 +141,7 @@ class User:
         """
         Returns the number of users stored in the database. Excludes NaNs.
         """
-        df = pd.read_csv('database/User.csv')
-        return df['username'].count() # does not count NaNs
+        return Counter.get('users')
 
     @staticmethod
     def does_user_have_enough_money(username,amount):
@@ -108,19 +149,7 @@ class User:
         Returns whether [username] has enough balance in their account to afford a transaction of 
         [amount] dollars.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df.username == username]
-        type_of_user = user['type_of_user'].item()
-        balance = 0
-        if type_of_user == 'client':
-            df = pd.read_csv('database/Client.csv')
-            user = df.loc[df.username == username]
-            balance = user['balance'].item()
-        elif type_of_user == 'developer':
-            df = pd.read_csv('database/Developer.csv')
-            user = df.loc[df.username == username]
-            balance = user['balance'].item()
-        return balance >= amount
+        return Ledger.get_balance(username) >= amount
 
     @staticmethod
     def delete_user(username):
@@ -128,166 +157,135 @@ class User:
         Deletes [username]'s account
         """
         if User.has_user_id(username):
-            df = pd.read_csv('database/User.csv')
-            type_of_user = df.loc[df.username == username]['type_of_user'].item()
-            df = df.loc[df.username != username]
-            df.to_csv('database/User.csv', index=False)
+            type_of_user = tables.lookup('User', 'username', username)['type_of_user'].item()
+            with tables.session():
+                Counter.add('users', -len(tables.lookup('User', 'username', username)))
+                tables.delete('User', 'username', username)
+
+                if type_of_user == 'client':
+                    Counter.add('clients', -len(tables.lookup('Client', 'username', username)))
+                    tables.delete('Client', 'username', username)
 
-            if type_of_user == 'client':
-                df = pd.read_csv('database/Client.csv')
-                df = df.loc[df.username != username]
-                df.to_csv('database/Client.csv', index=False)
+                elif type_of_user == 'developer':
+                    Counter.add('developers', -len(tables.lookup('Developer', 'username', username)))
+                    tables.delete('Developer', 'username', username)
 
-            elif type_of_user == 'developer':
-                df = pd.read_csv('database/Developer.csv')
-                df = df.loc[df.username != username]
-                df.to_csv('database/Developer.csv', index=False)
+    @staticmethod
+    def delete_many(usernames):
+        """
+        Deletes the accounts of [usernames] with one write to each of the User, Client and Developer tables.
+        The rows are found under the write lock, so they cannot move before they are deleted.
+        """
+        usernames = set(usernames)
+        with tables.session(locked=True):
+            for name, counter in [('User', 'users'), ('Client', 'clients'), ('Developer', 'developers')]:
+                users = tables.read(name)
+                rows = users.index[users['username'].isin(usernames)]
+                if len(rows):
+                    Counter.add(counter, -len(rows))
+                    tables.delete_rows(name, rows)
 
     @staticmethod
     def set_username(username,new_username):
         """
         Modifies the user's username.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-        if not user.empty:
-            df.loc[df.username == username, 'username'] = new_username
-            df.to_csv('database/User.csv', index=False)
+        tables.update('User', 'username', username, {'username': new_username})
 
     @staticmethod
     def set_password(username,password):
         """
         Modifies the user's password.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-        if not user.empty:
-            df.loc[df.username == username, 'password'] = hash_password(password)
-            df.to_csv('database/User.csv', index=False)
+        tables.update('User', 'username', username, {'password': hash_password(password)})
 
     @staticmethod
     def set_first_name(username,first_name):
         """
         Modifies the user's first name.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-        if not user.empty:
-            df.loc[df.username == username, 'first_name'] = first_name
-            df.to_csv('database/User.csv', index=False)
+        tables.update('User', 'username', username, {'first_name': first_name})
 
     @staticmethod
     def set_last_name(username,last_name):
         """
         Modifies the user's last name.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-        if not user.empty:
-            df.loc[df.username == username, 'last_name'] = last_name
-            df.to_csv('database/User.csv', index=False)
+        tables.update('User', 'username', username, {'last_name': last_name})
 
     @staticmethod
     def set_email(username,email):
         """
         Modifies the user's email.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-        if not user.empty:
-            df.loc[df.username == username, 'email'] = email
-            df.to_csv('database/User.csv', index=False)
-
+        tables.update('User', 'username', username, {'email': email})
 
     @staticmethod
     def set_phone(username,phone):
         """
         Modifies the user's phone.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-        if not user.empty:
-            df.loc[df.username == username, 'phone'] = phone
-            df.to_csv('database/User.csv', index=False)
+        tables.update('User', 'username', username, {'phone': phone})
 
     @staticmethod
     def set_about(username, about):
         """
         Modifies the user's about/info.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-
-        if not user.empty:
-            df.loc[df.username == username, 'about'] = about
-            df.to_csv('database/User.csv', index=False)
+        tables.update('User', 'username', username, {'about': about})
 
     @staticmethod
     def set_resume(username,resume):
         """
         Modifies the user's resume.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-        if not user.empty:
-            df.loc[df.username == username, 'resume'] = resume
-            df.to_csv('database/User.csv', index=False)
+        tables.update('User', 'username', username, {'resume': resume})
 
     @staticmethod
     def set_portfolio(username,portfolio):
         """
         Modifies the user's portfolio.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-        if not user.empty:
-            df.loc[df.username == username, 'portfolio'] = portfolio
-            df.to_csv('database/User.csv', index=False)
+        tables.update('User', 'username', username, {'portfolio': portfolio})
 
     @staticmethod
     def set_interests(username,interests):
         """
         Modifies the user's interests.
         """
-        df = pd.read_csv('database/User.csv')
-        user = df.loc[df['username'] == username]
-        if not user.empty:
-            df.loc[df.username == username, 'interests'] = interests
-            df.to_csv('database/User.csv', index=False)
+        tables.update('User', 'username', username, {'interests': interests})
 
 class Client:
     """
     Client class. Has methods that inserts to and reads from the Client table.
     """
     def __init__(self, username):
-        df = pd.read_csv('database/Client.csv')
-
-        df.loc[len(df)] = pd.Series(data=[username, 0, 0, 0, 0, 100],
-            index=['username', 'avg_rating', 'avg_given_rating', 'num_of_completed_projects', 'num_of_warnings', 'balance'])
-        df.to_csv('database/Client.csv', index=False)
+        with tables.session():
+            tables.append('Client', [{'username': username, 'avg_rating': 0, 'avg_given_rating': 0,
+                                      'num_of_completed_projects': 0, 'num_of_warnings': 0, 'balance': 100}])
+            Counter.add('clients', 1)
+            Ledger.open_account(username, 100)
 
     @staticmethod
     def get_info(username):
         """
         Returns a dictionary of information for the given developer.
         """
-        df = pd.read_csv('database/Client.csv')
-        client = df.loc[df.username == username]
+        client = tables.lookup('Client', 'username', username)
 
         return {'username': username,
                 'avg_rating': client['avg_rating'].item(),
                 'avg_given_rating': client['avg_given_rating'].item(),
                 'num_of_completed_projects': client['num_of_completed_projects'].item(),
                 'num_of_warnings': client['num_of_warnings'].item(),
-                'balance': client['balance'].item()}
+                'balance': Ledger.get_balance(username)}
 
     @staticmethod
     def get_projects_posted(username):
         """
         Returns a list of all demands that the client posted.
         """
-        df = pd.read_csv('database/Demand.csv')
-        projects = df.loc[df.client_username == username]
+        projects = tables.lookup('Demand', 'client_username', username)
 
         return projects.index.tolist()
     
@@ -296,8 +294,8 @@ class Client:
         """
         Returns a list of all demands that the client posted.
         """
-        df = pd.read_csv('database/Demand.csv')
-        projects = df.loc[(df.client_username == username) & (df.is_completed)]
+        projects = tables.lookup('Demand', 'client_username', username)
+        projects = projects.loc[projects.is_completed == True]
 
         return projects.index.tolist()
 
@@ -306,24 +304,15 @@ class Client:
         """
         Returns the number of clients in the client database. Excludes NaNs.
         """
-        df = pd.read_csv('database/Client.csv')
-        return df['username'].count() # does not count NaNs
+        return Counter.get('clients')
 
     @staticmethod
     def get_most_active_clients():
         """
         Returns the top 3 clients with the most projects completed.
         """
-        df = pd.read_csv('database/Client.csv')
-        sorted_df = df.sort_values(by='num_of_completed_projects', ascending=False)
-        sorted_df = sorted_df.iloc[:3]
-
-        usernames = []
-        for index, row in sorted_df.iterrows():
-            if not BlacklistedUser.is_blacklisted(row['username']):
-                usernames.append(User.get_user_info(row['username']))
-
-        return usernames
+        usernames = leaderboard.COMPLETED.get('Client').first(3, User.is_listed)
+        return [User.get_user_info(username) for username in usernames]
 
     @staticmethod
     def get_clients_with_most_projects():
@@ -331,17 +320,7 @@ class Client:
         Returns the top 3 clients with the most projects, completed or not.
         This is used on the index page.
         """
-        df = pd.read_csv('database/Demand.csv')
-        projects = df.groupby(['client_username']).size()
-        projects = projects.sort_values(ascending=False)
-
-        usernames = []
-        for index, value in projects.iteritems():
-            if len(usernames) == 3:
-                break;
-            usernames.append(index)
-
-        return usernames
+        return leaderboard.PROJECTS.get('Demand').first(3, User.is_listed)
 
     @staticmethod
     def get_similar_clients(username):
@@ -349,43 +328,27 @@ class Client:
         Returns three clients with similar interests as the specified user, based
         on tags of the user's most recent completed projects.
         """
-        projects = []
-        user_type = User.get_user_info(username)['type_of_user']
-        if user_type == 'client':
-            projects = Client.get_projects_posted(username)
-        else: #is developer
-            projects = Developer.get_past_projects(username)
-        
-        tags = ""
-        for index in projects:
-            demand = Demand.get_info(index)
-            tags += str(demand['tags']) + " "
-        print("tag", tags)
-        similar_projects = Demand.get_filtered_demands(None, None, None, None, tags, None, None)
-        print(similar_projects)
-        similar_clients = []
-        similar_clients_usernames=[]
-
-        for index in similar_projects:
-            if len(similar_clients) == 3:
-                break
-            demand = Demand.get_info(index)
-            if not (demand['client_username'] == username) and not (demand['chosen_developer_username'] == username):
-                if demand['client_username'] not in similar_clients_usernames and not BlacklistedUser.is_blacklisted(demand['client_username']) and not DeleteRequest.is_account_deleted(demand['client_username']):
-                    similar_clients_usernames.append(demand['client_username'])
-                    similar_clients.append(User.get_user_info(demand['client_username']))
-
-        return similar_clients
+        tags = User.get_project_tags(username)
+        usernames = similarity.get_clients().similar(tags, 3, User.get_unlisted() | set([username]))
+        return [User.get_user_info(client) for client in usernames]
 
     @staticmethod
     def add_to_balance(username, amount):
         """
-        Adds amount of funds to balance.
+        Adds amount of funds to balance, as a deposit from the client's credit card.
+        """
+        Transaction.deposit(username, amount)
+
+    @staticmethod
+    def add_completed_project(username):
+        """
+        Adds one to the number of projects the client completed.
         """
-        df = pd.read_csv('database/Client.csv')
-        client = df.loc[df.username == username]
-        df.loc[df.username == username, 'balance'] = amount + client['balance'].item()
-        df.to_csv('database/Client.csv', index=False)
+        with tables.session(locked=True):
+            client = tables.lookup('Client', 'username', username)
+            if not client.empty:
+                tables.update('Client', 'username', username,
+                              {'num_of_completed_projects': client['num_of_completed_projects'].item() + 1})
 
 
 class Developer:
@@ -393,26 +356,24 @@ class Developer:
     Developer class. Has methods that inserts to and reads from the Developer table.
     """
     def __init__(self, username):
-        df = pd.read_csv('database/Developer.csv')
-
-        df.loc[len(df)] = pd.Series(data=[username, 0, 0, 0, 0, 0, 0],
-            index=['username', 'avg_rating', 'avg_given_rating', 'num_of_completed_projects', 'num_of_warnings', 'balance', 'earnings'])
-        df.to_csv('database/Developer.csv', index=False)
+        with tables.session():
+            tables.append('Developer', [{'username': username, 'avg_rating': 0, 'avg_given_rating': 0,
+                                         'num_of_completed_projects': 0, 'num_of_warnings': 0, 'balance': 0, 'earnings': 0}])
+            Counter.add('developers', 1)
 
     @staticmethod
     def get_info(username):
         """
         Returns a dictionary of information for the given developer.
         """
-        df = pd.read_csv('database/Developer.csv')
-        developer = df.loc[df.username == username]
+        developer = tables.lookup('Developer', 'username', username)
 
         return {'username': username,
                 'avg_rating': developer['avg_rating'].item(),
                 'avg_given_rating': developer['avg_given_rating'].item(),
                 'num_of_completed_projects': developer['num_of_completed_projects'].item(),
                 'num_of_warnings': developer['num_of_warnings'].item(),
-                'balance': developer['balance'].item()}
+                'balance': Ledger.get_balance(username)}
 
     @staticmethod
     def get_past_projects(username):
@@ -420,8 +381,8 @@ class Developer:
         Returns a list of past demands that the developer worked on.
         These past demands are ones that are completed.
         """
-        df = pd.read_csv('database/Demand.csv')
-        projects = df.loc[(df.chosen_developer_username == username) & (df.is_completed)]
+        projects = tables.lookup('Demand', 'chosen_developer_username', username)
+        projects = projects.loc[projects.is_completed == True]
 
         return projects.index.tolist()
 
@@ -430,24 +391,15 @@ class Developer:
         """
         Returns the number of developers in the developer database. Excludes NaNs.
         """
-        df = pd.read_csv('database/Developer.csv')
-        return df['username'].count() # does not count NaNs
+        return Counter.get('developers')
 
     @staticmethod
     def get_most_active_developers():
         """
         Returns the top 3 developers with the most projects completed.
         """
-        df = pd.read_csv('database/Developer.csv')
-        sorted_df = df.sort_values(by='num_of_completed_projects', ascending=False)
-        sorted_df = sorted_df.iloc[:3]
-
-        usernames = []
-        for index, row in sorted_df.iterrows():
-            if not BlacklistedUser.is_blacklisted(row['username']):
-                usernames.append(User.get_user_info(row['username']))
-
-        return usernames
+        usernames = leaderboard.COMPLETED.get('Developer').first(3, User.is_listed)
+        return [User.get_user_info(username) for username in usernames]
 
     @staticmethod
     def get_similar_developers(username):
@@ -455,46 +407,17 @@ class Developer:
         Returns three developers with similar interests as the specified user, based
         on tags of the user's most recent completed projects.
         """
-        projects = []
-        user_type = User.get_user_info(username)['type_of_user']
-        if user_type == 'client':
-            projects = Client.get_projects_posted(username)
-        else: #is developer
-            projects = Developer.get_past_projects(username)
-        
-        tags = ""
-        for index in projects:
-            demand = Demand.get_info(index)
-            tags += str(demand['tags']) + " "
-        print("tag", tags)
-        similar_projects = Demand.get_filtered_demands(None, None, None, None, tags, None, None)
-        similar_developers = []
-        similar_developers_usernames = []
-
-        for index in similar_projects:
-            if len(similar_developers) == 3:
-                break
-            demand = Demand.get_info(index)
-            if not (demand['client_username'] == username) and not (demand['chosen_developer_username'] == username):
-                if demand['chosen_developer_username'] not in similar_developers_usernames and not BlacklistedUser.is_blacklisted(demand['chosen_developer_username']) and not DeleteRequest.is_account_deleted(demand['chosen_developer_username']):
-                    similar_developers_usernames.append(demand['chosen_developer_username'])
-                    similar_developers.append(User.get_user_info(demand['chosen_developer_username']))
-
-        return similar_developers
+        tags = User.get_project_tags(username)
+        usernames = similarity.get_developers().similar(tags, 3, User.get_unlisted() | set([username]))
+        return [User.get_user_info(developer) for developer in usernames]
 
     @staticmethod
     def get_top_earners():
         """
         Returns a list of usernames belonging to the three developers with the most earnings.
         """
-        df = pd.read_csv('database/Developer.csv')
-        df = df.loc[df.earnings > 0]
-        sorted_df = df.sort_values(by='earnings', ascending=False)
-
-        if (len(sorted_df) > 3):
-            return sorted_df.username.tolist()[:3]
-        else:
-            return sorted_df.username.tolist()
+        board = leaderboard.EARNINGS.get('Developer')
+        return board.first(3, lambda username: board.scores[username] > 0 and User.is_listed(username))
 
     @staticmethod
     def submit_system(demand_id, username):
@@ -502,14 +425,16 @@ class Developer:
         Updates the Demand table so that the project is complete.
         Also notifies the client that the project is complete.
         """
-        df = pd.read_csv('database/Demand.csv')
-        df.loc[int(demand_id), 'is_completed'] = True
-
         demand_info = Demand.get_info(demand_id)
 
         message = 'The system for the {} demand has been uploaded. Please rate {} <a href="/bid/{}/rating/{}">here</a>.'.format(demand_info['title'], username, demand_id, username)
-        Notification(demand_info['client_username'], username, message)
-        df.to_csv('database/Demand.csv', index=False)
+        with tables.session():
+            tables.update_rows('Demand', [demand_id], {'is_completed': True})
+            Client.add_completed_project(demand_info['client_username'])
+            Developer.add_completed_project(username)
+            Recommendation.invalidate(demand_info['client_username'])
+            Recommendation.invalidate(username)
+            Notification(demand_info['client_username'], username, message)
 
     @staticmethod
     def add_earnings(username, amount):
@@ -517,9 +442,21 @@ class Developer:
         Updates the Developer table.
         Adds amount to the developer's current amount of earnings.
         """
-        df = pd.read_csv('database/Developer.csv')
-        df.loc[df['username'] == username, 'earnings'] += amount
-        df.to_csv('database/Developer.csv', index=False)
+        with tables.session(locked=True):
+            developer = tables.lookup('Developer', 'username', username)
+            if not developer.empty:
+                tables.update('Developer', 'username', username, {'earnings': developer['earnings'].item() + amount})
+
+    @staticmethod
+    def add_completed_project(username):
+        """
+        Adds one to the number of projects the developer completed.
+        """
+        with tables.session(locked=True):
+            developer = tables.lookup('Developer', 'username', username)
+            if not developer.empty:
+                tables.update('Developer', 'username', username,
+                              {'num_of_completed_projects': developer['num_of_completed_projects'].item() + 1})
 
 class Applicant:
     """
@@ -530,16 +467,11 @@ class Applicant:
         """
         Create a new applicant and store the information in the database.
         """
-        df = pd.read_csv('database/Applicant.csv')
-
         hashed = hash_password(password)
 
-        df.loc[len(df)] = pd.Series(data=[first_name, last_name, email,
-                            phone, card_info, temp_user_id, hashed, type_of_user, 'pending'],
-                           index=['first_name', 'last_name',
-                           'email', 'phone', 'credit_card', 'user_id',
-                           'password', 'type_of_user', 'status'])
-        df.to_csv('database/Applicant.csv', index=False)
+        tables.append('Applicant', [{'first_name': first_name, 'last_name': last_name, 'email': email,
+                                     'phone': phone, 'credit_card': card_info, 'user_id': temp_user_id,
+                                     'password': hashed, 'type_of_user': type_of_user, 'status': 'pending'}])
 
     def validate_email(self, email):
         """
@@ -547,8 +479,7 @@ class Applicant:
         The email should also be in the correc format.
         Returns True if the email is valid. Returns False otherwise.
         """
-        df = pd.read_csv('database/Applicant.csv')
-        tmp = df.loc[df['email'] == email]
+        tmp = tables.lookup('Applicant', 'email', email)
 
         return tmp.empty
 
@@ -558,8 +489,7 @@ class Applicant:
         Returns True if the user ID already exists in the Applicant table.
         Returns False if the user ID does not already exist.
         """
-        df = pd.read_csv('database/Applicant.csv')
-        tmp = df.loc[df['temp_user_id'] == user_id]
+        tmp = tables.lookup('Applicant', 'temp_user_id', user_id)
 
         return not tmp.empty
 
@@ -568,8 +498,7 @@ class Applicant:
         """
         Returns a dictionary of the applicant's information.
         """
-        df = pd.read_csv('database/Applicant.csv')
-        user = df.loc[df['user_id'] == user_id]
+        user = tables.lookup('Applicant', 'user_id', user_id)
 
         if not user.empty:
             return {'user_id': user_id,
@@ -588,14 +517,9 @@ class Applicant:
         Checks whether user_id is unique.
         Returns True if user_id is unique and False if user_id is not unique.
         """
-        df0 = pd.read_csv('database/Applicant.csv')
-        tmp0 = df0.loc[df0['user_id'] == user_id]
-
-        df1 = pd.read_csv('database/User.csv')
-        tmp1 = df1.loc[df1['username'] == user_id]
-
-        df2 = pd.read_csv('database/SuperUser.csv')
-        tmp2 = df2.loc[df2['username'] == user_id]
+        tmp0 = tables.lookup('Applicant', 'user_id', user_id)
+        tmp1 = tables.lookup('User', 'username', user_id)
+        tmp2 = tables.lookup('SuperUser', 'username', user_id)
 
         return tmp0.empty and tmp1.empty and tmp2.empty
 
@@ -605,14 +529,9 @@ class Applicant:
         Checks whether email is unique.
         Returns True if email is unique and False if email is not unique.
         """
-        df0 = pd.read_csv('database/Applicant.csv')
-        tmp0 = df0.loc[df0['email'] == email]
-
-        df1 = pd.read_csv('database/User.csv')
-        tmp1 = df1.loc[df1['email'] == email]
-
-        df2 = pd.read_csv('database/SuperUser.csv')
-        tmp2 = df2.loc[df2['email'] == email]
+        tmp0 = tables.lookup('Applicant', 'email', email)
+        tmp1 = tables.lookup('User', 'email', email)
+        tmp2 = tables.lookup('SuperUser', 'email', email)
 
         return tmp0.empty and tmp1.empty and tmp2.empty
 
@@ -623,8 +542,7 @@ class Applicant:
         Returns true if password given matches the password for user_id 
         given and false if the password does not match.
         """
-        df = pd.read_csv('database/Applicant.csv')
-        user = df.loc[df['user_id'] == user_id]
+        user = tables.lookup('Applicant', 'user_id', user_id)
         if not user.empty:
             pwhash = user['password'].item()
             return pwhash == hash_password(password) 
@@ -636,41 +554,72 @@ class Applicant:
         After adding to the User table, the applicant's status is changed to approved.
         """
         # get the applicant's information from the table
-        df = pd.read_csv('database/Applicant.csv')
-        user = df.loc[df.user_id == user_id]
+        user = tables.lookup('Applicant', 'user_id', user_id)
 
         if not user.empty:
             if user['status'].item() == 'pending':
-                # create a new row in the User table
-                User(user['first_name'].item(), user['last_name'].item(), user['email'].item(), user['phone'].item(),
-                    user['credit_card'].item(), user['type_of_user'].item())
+                with tables.session():
+                    # create a new row in the User table
+                    User(user['first_name'].item(), user['last_name'].item(), user['email'].item(), user['phone'].item(),
+                        user['credit_card'].item(), user['type_of_user'].item())
 
-                # update status
-                df.loc[df.user_id == user_id, 'status'] = 'approved'
-                df.to_csv('database/Applicant.csv', index=False)
+                    # update status
+                    tables.update('Applicant', 'user_id', user_id, {'status': 'approved'})
+
+
+    @staticmethod
+    def approve_many(user_ids):
+        """
+        Approves the pending applicants among [user_ids] with one write to the User table and one
+        to the Applicant table. Returns the user ids of the applicants that were approved.
+        """
+        with tables.session(locked=True):
+            applicants = Applicant.get_pending_rows(user_ids)
+            User.bulk_create([{'first_name': applicant['first_name'], 'last_name': applicant['last_name'],
+                               'email': applicant['email'], 'phone': applicant['phone'],
+                               'credit_card': applicant['credit_card'], 'type_of_user': applicant['type_of_user']}
+                              for position, applicant in applicants.iterrows()])
+            tables.update_rows('Applicant', applicants.index, {'status': 'approved'})
+        return applicants['user_id'].tolist()
+
+    @staticmethod
+    def reject_many(user_ids, reason):
+        """
+        Rejects the pending applicants among [user_ids] for the same [reason] with one write.
+        Returns the user ids of the applicants that were rejected.
+        """
+        with tables.session(locked=True):
+            applicants = Applicant.get_pending_rows(user_ids)
+            tables.update_rows('Applicant', applicants.index, {'status': 'rejected', 'reason': reason})
+        return applicants['user_id'].tolist()
 
+    @staticmethod
+    def get_pending_rows(user_ids):
+        """
+        Returns the rows of the Applicant table of the applicants among [user_ids] that are still pending.
+        Call it in a locked session (see tables.lock), so that no other superuser can decide on the
+        applicants before they are updated.
+        """
+        applicants = tables.read('Applicant')
+        return applicants.loc[applicants['user_id'].isin(list(user_ids)) & (applicants['status'] == 'pending')]
 
     @staticmethod
     def reject(user_id, reason):
         """
         Reject the applicant. The applicant's status is changed to rejected.
         """
-        df = pd.read_csv('database/Applicant.csv')
-        user = df.loc[df.user_id == user_id]
+        user = tables.lookup('Applicant', 'user_id', user_id)
 
         if user['status'].item() == 'pending':
             # update status
-            df.loc[df.user_id == user_id, 'status'] = 'rejected'
-            df.loc[df.user_id == user_id, 'reason'] = reason
-            df.to_csv('database/Applicant.csv', index=False)
+            tables.update('Applicant', 'user_id', user_id, {'status': 'rejected', 'reason': reason})
 
     @staticmethod
     def get_pending_applicants():
         """
         Gets all applicants with a status of 'pending'
         """
-        df = pd.read_csv('database/Applicant.csv')
-        get_apps = df.loc[df['status'] == 'pending']
+        get_apps = tables.lookup('Applicant', 'status', 'pending')
         pending_applicants = get_apps.T.to_dict().values()
         return pending_applicants
 
@@ -683,20 +632,29 @@ class Demand:
         Create a new demand by adding a row with the information to the Demand table.
         Returns the demand_id, which is the index of the row that was just added.
         """
-        df = pd.read_csv('database/Demand.csv')
-
         now = datetime.datetime.now()
         format = '%m-%d-%Y %I:%M %p'
         date_posted = now.strftime(format)
 
-        df.loc[len(df)] = pd.Series(data=[client_username, date_posted, title, tags, specifications, bidding_deadline, submission_deadline, False, False, False, False],
-            index=['client_username', 'date_posted', 'title', 'tags', 'specifications', 'bidding_deadline', 'submission_deadline', 'is_completed', 'bidding_deadline_approaching_notif_sent', 'is_expired', 'submission_deadline_approaching_notif_sent'])
-
-        df.to_csv('database/Demand.csv', index=False)
+        with tables.session():
+            tables.append('Demand', [{'client_username': client_username,
+                                      'date_posted': date_posted,
+                                      'title': title,
+                                      'tags': tags,
+                                      'specifications': specifications,
+                                      'bidding_deadline': bidding_deadline,
+                                      'submission_deadline': submission_deadline,
+                                      'is_completed': False,
+                                      'bidding_deadline_approaching_notif_sent': False,
+                                      'is_expired': False,
+                                      'submission_deadline_approaching_notif_sent': False,
+                                      'bid_count': 0}])
+            # the client's projects changed
+            Recommendation.invalidate(client_username)
 
     @staticmethod
     def get_most_recent_demand_id():
-        df = pd.read_csv('database/Demand.csv')
+        df = tables.read('Demand')
         return df.index.values.tolist()[-1]
 
     @staticmethod
@@ -704,17 +662,32 @@ class Demand:
         """
         Returns a dictionary of information for the specified demand.
         """
-        df = pd.read_csv('database/Demand.csv')
-        demand = df.loc[int(demand_id)]
+        return Demand._info(demand_id, tables.row('Demand', demand_id), datetime.datetime.now())
+
+    @staticmethod
+    def get_info_many(demand_ids):
+        """
+        Returns a list of dictionaries of information for the specified demands, in the same order.
+        Reads the Demand table once no matter how many demands are given.
+        """
+        demand_ids = [int(demand_id) for demand_id in demand_ids]
+        demands = tables.rows('Demand', demand_ids)
 
         now = datetime.datetime.now()
-        deadline_passed = datetime.datetime.strptime(demand['bidding_deadline'], '%m-%d-%Y %I:%M %p') < now
+        return [Demand._info(demand_id, demands.iloc[position], now) for position, demand_id in enumerate(demand_ids)]
 
-        bids = Bid.get_bids_for_demand(demand_id)
-        if len(bids) > 0:
-            lowest_bid = Bid.get_info(bids[0])['bid_amount']
-        else:
+    @staticmethod
+    def _info(demand_id, demand, now):
+        """
+        Returns the dictionary of information for the demand in the row [demand].
+        """
+        # the lowest bid is kept on the demand's row, so the Bid table is not needed
+        if pd.isnull(demand['min_bid']):
             lowest_bid = None
+        else:
+            lowest_bid = format(demand['min_bid'], '.2f')
+
+        deadline_passed = datetime.datetime.strptime(demand['bidding_deadline'], '%m-%d-%Y %I:%M %p') < now
 
         if not demand.empty:
             return {'client_username': demand['client_username'],
@@ -731,6 +704,7 @@ class Demand:
                     'chosen_bid_amount': demand['bid_amount'],
                     'developer_was_chosen': not pd.isnull(demand['chosen_developer_username']),
                     'min_bid': lowest_bid,
+                    'bid_count': demand['bid_count'],
                     'link_to_client': '/user/' + demand['client_username'],
                     'link_to_demand': '/bid/' + str(demand_id)}
 
@@ -740,16 +714,47 @@ class Demand:
         Returns a list of all demands.
         The demands are ordered from most recent to least recent.
         """
-        df = pd.read_csv('database/Demand.csv')
+        df = tables.read('Demand')
         return df.index.tolist()[::-1]
 
+    @staticmethod
+    def get_demands_with_tags(tags):
+        """
+        Returns the set of ids of the demands that share at least one tag with the string [tags].
+        Uses an inverted index from each tag to the demands that have it, which is kept up to date
+        as demands are posted and changed.
+        """
+        index = tables.view('Demand', helpers.build_tag_index,
+                            helpers.add_to_tag_index, helpers.update_tag_index)
+
+        demand_ids = set()
+        for tag in helpers.tokenize_tags(tags):
+            demand_ids |= index.get(tag, set())
+        return demand_ids
+
+    @staticmethod
+    def get_similar_demands(demand_id, number=3):
+        """
+        Returns a list of the ids of up to [number] other demands whose tags are most similar to
+        the tags of the specified demand, most similar first.
+        Uses the MinHash buckets in minhash.py, so only demands likely to be similar are compared.
+        """
+        index = tables.view('Demand', minhash.DemandIndex, minhash.DemandIndex.add, minhash.DemandIndex.update)
+        tags = index.tags.get(int(demand_id), frozenset())
+        return index.similar(tags, number, exclude=[int(demand_id)])
+
     @staticmethod
     def get_filtered_demands(start_date, end_date, client, client_rating, tags, min_bid, active):
         """
         Returns a list of demands that are filtered.
         The demands are ordered from most recent to least recent.
         """
-        filtered = pd.read_csv('database/Demand.csv')
+        if tags is not None and tags != '':
+            # only the demands that share at least one tag with [tags] can match,
+            # so start from the union of their posting lists instead of every demand
+            filtered = tables.rows('Demand', sorted(Demand.get_demands_with_tags(tags))).copy()
+        else:
+            filtered = tables.read('Demand').copy()
         now = datetime.datetime.now()
         filtered['date_posted'] = pd.to_datetime(filtered['date_posted'])
         filtered['bidding_deadline'] = pd.to_datetime(filtered['bidding_deadline'])
@@ -771,34 +776,12 @@ class Demand:
 
         # filter by client_rating
         if client_rating is not None:
-            client_df = pd.read_csv('database/Client.csv')
-            merged = pd.merge(filtered, client_df, how='left', left_on=['client_username'], right_on=['username'])
-            filtered = merged.loc[merged.avg_rating >= client_rating]
+            ratings = tables.read('Client').drop_duplicates('username').set_index('username')['avg_rating']
+            filtered = filtered.loc[filtered.client_username.map(ratings) >= client_rating]
 
         # filter by the minimum bid amount
         if min_bid is not None:
-            def lowest_bid(demand_id):
-                bids = Bid.get_bids_for_demand(demand_id)
-                return float(Bid.get_info(bids[0])['bid_amount']) if len(bids) > 0 else None
-
-            filtered['lowest_bid'] = pd.Series(filtered.index.map(lowest_bid))
-            filtered = filtered.loc[(filtered.lowest_bid >= min_bid) | (filtered.lowest_bid.isnull())]
-
-        # filter by tags
-        if tags is not None and tags != '':
-            # remove punctuation, change words to lowercase
-            tags = map(lambda x: x.lower(), re.findall(r'[^\s!,.?":;0-9]+', tags))
-            tags = set(tags)
-
-            def has_tag(demand_id):
-                demand_tags = map(lambda x: x.lower(), re.findall(r'[^\s!,.?":;0-9]+', Demand.get_info(demand_id)['tags']))
-                demand_tags = set(demand_tags)
-
-                # if there is an intersection between the sets, there are matching tags
-                return len(tags & demand_tags) > 0
-
-            filtered['has_tag'] = pd.Series(filtered.index.map(has_tag))
-            filtered = filtered.loc[filtered.has_tag == True]
+            filtered = filtered.loc[(filtered.min_bid >= min_bid) | (filtered.min_bid.isnull())]
 
         return filtered.sort_values(['date_posted'], ascending=[True]).index.tolist()[::-1]
 
@@ -807,9 +790,10 @@ class Demand:
         """
         Returns index of projects related to username.
         """
-        df = pd.read_csv('database/Demand.csv')
-        projects = df.loc[((df.chosen_developer_username == username) | (df.client_username == username)) 
-                    & (df.is_completed == False) & (df.chosen_developer_username.notnull())]
+        df = pd.concat([tables.lookup('Demand', 'chosen_developer_username', username),
+                        tables.lookup('Demand', 'client_username', username)])
+        df = df.loc[~df.index.duplicated()].sort_index()
+        projects = df.loc[(df.is_completed == False) & (df.chosen_developer_username.notnull())]
         
         return projects.index.tolist()
 
@@ -820,18 +804,26 @@ class Demand:
         Update the Demand table when a client chooses a developer for a certain demand.
         Also half of the bid amount is transferred from the client to the developer.
         """
-        df = pd.read_csv('database/Demand.csv')
-        df.loc[int(demand_id), 'chosen_developer_username'] = developer_username
-        df.loc[int(demand_id), 'bid_amount'] = bid_amount
-        df.to_csv('database/Demand.csv', index=False)
+        with tables.session():
+            tables.update_rows('Demand', [demand_id], {'chosen_developer_username': developer_username,
+                                                       'bid_amount': bid_amount})
 
-        # notify the developer that he/she was chosen to implement the system
-        demand_title = Demand.get_info(demand_id)['title']
-        message = 'Congratulations! You were chosen by {} for the {} demand.'.format(client_username, demand_title)
-        Notification(developer_username, client_username, message)
+            # notify the developer that he/she was chosen to implement the system
+            demand_title = Demand.get_info(demand_id)['title']
+            message = 'Congratulations! You were chosen by {} for the {} demand.'.format(client_username, demand_title)
+            Notification(developer_username, client_username, message)
 
-        # transfer money from client to developer
-        Transaction(developer_username, client_username, float(bid_amount) / 2, reason)
+            # transfer money from client to developer
+            Transaction(developer_username, client_username, float(bid_amount) / 2, reason)
+
+    @staticmethod
+    def get_deadlines():
+        """
+        Returns the queue of upcoming deadlines of the demands (see deadlines.py), which is kept
+        up to date as demands are posted and changed.
+        """
+        return tables.view('Demand', deadlines.DeadlineQueue,
+                           deadlines.DeadlineQueue.add, deadlines.DeadlineQueue.update)
 
     @staticmethod
     def check_approaching_bidding_deadlines():
@@ -839,19 +831,24 @@ class Demand:
         Checks for any approaching bidding deadlines for all of the demands.
         If the deadline is within 24 hours, a notification will be sent to the client
         who created the demand. Only one notification will be sent.
+        Only the demands whose deadline queue entry came due are looked at.
         """
-        df = pd.read_csv('database/Demand.csv')
         now = datetime.datetime.now()
 
-        for index, row in df.iterrows():
-            dt = datetime.datetime.strptime(row['bidding_deadline'], '%m-%d-%Y %I:%M %p')
-            time_diff = (dt - now).days
-            if time_diff <= 1 and (not row['bidding_deadline_approaching_notif_sent']):
-                message = 'The deadline for your {} demand is approaching.'.format(row['title'])
-                Notification(row['client_username'], 'superuser0', message)
-                df.loc[index, 'bidding_deadline_approaching_notif_sent'] = True
+        with Demand.get_deadlines().due('bidding_warning', now) as demand_ids, tables.session():
+            df = tables.rows('Demand', demand_ids)
+            notified, notifs = [], []
+            for index, row in df.iterrows():
+                dt = datetime.datetime.strptime(row['bidding_deadline'], '%m-%d-%Y %I:%M %p')
+                time_diff = (dt - now).days
+                if time_diff <= 1 and (not row['bidding_deadline_approaching_notif_sent']):
+                    message = 'The deadline for your {} demand is approaching.'.format(row['title'])
+                    notifs.append({'recipient': row['client_username'], 'sender': 'superuser0', 'message': message})
+                    notified.append(index)
 
-        df.to_csv('database/Demand.csv', index=False)
+            if notified:
+                Notification.bulk_create(notifs)
+                tables.update_rows('Demand', notified, {'bidding_deadline_approaching_notif_sent': True})
 
     @staticmethod
     def check_approaching_submission_deadlines():
@@ -859,20 +856,25 @@ class Demand:
         Checks for any approaching submission deadlines for all of the demands.
         if the deadline is within 24 hours, a notification will be sent to the
         developer who is assigned the demand. Only one notification will be sent.
+        Only the demands whose deadline queue entry came due are looked at.
         """
-        df = pd.read_csv('database/Demand.csv')
         now = datetime.datetime.now()
 
-        for index, row in df.iterrows():
-            if (not row['is_expired']) and (row['chosen_developer_username'] is not None):
-                dt = datetime.datetime.strptime(row['submission_deadline'], '%m-%d-%Y %I:%M %p')
-                time_diff = (dt - now).days
-                if time_diff <= 1 and (not row['submission_deadline_approaching_notif_sent']):
-                    message = 'The deadline for submitting your system for the {} demand is approaching.'.format(row['title'])
-                    Notification(row['chosen_developer_username'], 'superuser0', message)
-                    df.loc[index, 'submission_deadline_approaching_notif_sent'] = True
+        with Demand.get_deadlines().due('submission_warning', now) as demand_ids, tables.session():
+            df = tables.rows('Demand', demand_ids)
+            notified, notifs = [], []
+            for index, row in df.iterrows():
+                if (not row['is_expired']) and pd.notnull(row['chosen_developer_username']):
+                    dt = datetime.datetime.strptime(row['submission_deadline'], '%m-%d-%Y %I:%M %p')
+                    time_diff = (dt - now).days
+                    if time_diff <= 1 and (not row['submission_deadline_approaching_notif_sent']):
+                        message = 'The deadline for submitting your system for the {} demand is approaching.'.format(row['title'])
+                        notifs.append({'recipient': row['chosen_developer_username'], 'sender': 'superuser0', 'message': message})
+                        notified.append(index)
 
-        df.to_csv('database/Demand.csv', index=False)
+            if notified:
+                Notification.bulk_create(notifs)
+                tables.update_rows('Demand', notified, {'submission_deadline_approaching_notif_sent': True})
 
     @staticmethod
     def check_expired_demands():
@@ -880,24 +882,26 @@ class Demand:
         Checks for any demands that are passed their bidding deadlines
         and have no bidders. These systems are marked as expired, and
         the client who posted the demand pays a $10 fee.
+        Only the demands whose deadline queue entry came due are looked at.
         """
-        df = pd.read_csv('database/Demand.csv')
         now = datetime.datetime.now()
 
-        for index, row in df.iterrows():
-            if not row['is_expired']:
-                dt = datetime.datetime.strptime(row['bidding_deadline'], '%m-%d-%Y %I:%M %p')
-                num_bids = len(Bid.get_bids_for_demand(index))
+        with Demand.get_deadlines().due('expired', now) as demand_ids, tables.session():
+            df = tables.rows('Demand', demand_ids)
+            bidding_deadline = pd.to_datetime(df['bidding_deadline'], format='%m-%d-%Y %I:%M %p')
 
-                # if the bidding deadline passed and there are no bids for this demand,
-                # make it expired
-                if (now > dt) and (num_bids == 0):
-                    df.loc[index, 'is_expired'] = True
-                    message = 'Your {} demand expired at {}. $10 is taken off of your balance.'.format(row['title'], row['bidding_deadline'])
-                    Notification(row['client_username'], 'superuser0', message)
-                    Transaction('superuser0', row['client_username'], 10)
+            # if the bidding deadline passed and there are no bids for this demand,
+            # make it expired
+            expired = df.loc[(df.is_expired == False) & (bidding_deadline < now) & (df.bid_count == 0)]
+            if expired.empty:
+                return
 
-        df.to_csv('database/Demand.csv', index=False)
+            tables.update_rows('Demand', expired.index, {'is_expired': True})
+            Notification.bulk_create([{'recipient': client, 'sender': 'superuser0',
+                                       'message': 'Your {} demand expired at {}. $10 is taken off of your balance.'.format(title, deadline)}
+                                      for title, deadline, client in zip(expired['title'], expired['bidding_deadline'], expired['client_username'])])
+            Transaction.bulk_create([{'recipient': 'superuser0', 'sender': client, 'amount': 10}
+                                     for client in expired['client_username']])
 
     @staticmethod
     def check_overdue_demands():
@@ -906,52 +910,64 @@ class Demand:
         not already completed by the chosen developers. These systems are arked as expired,
         and the chosen developer has to pay back the amount of money that was originally
         given to them at the beginning, along with a fee of $10.
+        Only the demands whose deadline queue entry came due are looked at.
         """
-        df = pd.read_csv('database/Demand.csv')
         now = datetime.datetime.now()
 
-        for index, row in df.iterrows():
-            if not row['is_expired']:
-                dt = datetime.datetime.strptime(row['submission_deadline'], '%m-%d-%Y %I:%M %p')
-                chosen_developer = row['chosen_developer_username']
-
-                # the chosen developer did not complete the system in time
-                if (now > dt) and (chosen_developer is not None) and not row['is_completed']:
-                    df.loc[index, 'is_expired'] = True
-                    fee = round(row['bid_amount'] + 10, 2)
-                    message = 'The deadline for submitting the system demand {} is over. ${} is taken off your balance as a penalty fee.'.format(Demand.get_info(index)['title'], fee)
-                    Notification(chosen_developer, 'superuser0', message)
-                    Transaction(chosen_developer, row['client_username'], fee)
-
-                    # automatically give this developer a rating of 1
-                    df2 = pd.read_csv('database/Rating.csv')
-                    df2.loc[len(df)] = pd.Series(data=[index, chosen_developer, row['client_username'], 1, 'System demand overdue.'],
-                        index=['demand_id', 'recipient', 'rater', 'rating', 'message'])
-                    df2.to_csv('database/Rating.csv')
-
-        df.to_csv('database/Demand.csv', index=False)
+        with Demand.get_deadlines().due('overdue', now) as demand_ids, tables.session():
+            df = tables.rows('Demand', demand_ids)
+            submission_deadline = pd.to_datetime(df['submission_deadline'], format='%m-%d-%Y %I:%M %p')
+
+            # the chosen developer did not complete the system in time
+            overdue = df.loc[(df.is_expired == False) & (submission_deadline < now) &
+                             df.chosen_developer_username.notnull() & (df.is_completed == False)]
+            if overdue.empty:
+                return
+
+            tables.update_rows('Demand', overdue.index, {'is_expired': True})
+            fees = (overdue['bid_amount'] + 10).round(2)
+            developers, clients = overdue['chosen_developer_username'], overdue['client_username']
+            Notification.bulk_create([{'recipient': developer, 'sender': 'superuser0',
+                                       'message': 'The deadline for submitting the system demand {} is over. ${} is taken off your balance as a penalty fee.'.format(title, fee)}
+                                      for title, developer, fee in zip(overdue['title'], developers, fees)])
+            Transaction.bulk_create([{'recipient': developer, 'sender': client, 'amount': fee}
+                                     for developer, client, fee in zip(developers, clients, fees)])
+
+            # automatically give these developers a rating of 1
+            Rating.bulk_create([{'demand_id': index, 'recipient': developer, 'rater': client,
+                                 'rating': 1, 'message': 'System demand overdue.'}
+                                for index, developer, client in zip(overdue.index, developers, clients)])
 
 class Bid:
     """
     Bid class. Has methods that inserts to Bid table.
     """
     def __init__(self, demand_id, developer_username, bid_amount):
-        df = pd.read_csv('database/Bid.csv')
         now = datetime.datetime.now()
         format = '%m-%d-%Y %I:%M %p'
         date_bidded = now.strftime(format)
         bid_amount = round(bid_amount, 2)
 
-        df.loc[len(df)] = pd.Series(data=[demand_id, developer_username, bid_amount, date_bidded],
-            index=['demand_id', 'developer_username', 'bid_amount', 'date_bidded'])
-        df.to_csv('database/Bid.csv', index=False)
+        # the new bid count and lowest bid are computed from the demand as it is
+        # stored under the write lock, so bids placed at the same time are all counted
+        with tables.session(locked=True):
+            tables.append('Bid', [{'demand_id': demand_id,
+                                   'developer_username': developer_username,
+                                   'bid_amount': bid_amount,
+                                   'date_bidded': date_bidded}])
 
-        # send notification to client who made the demand stating that a bid was made
-        demand_info = Demand.get_info(demand_id)
-        client_username = demand_info['client_username']
-        demand_title = demand_info['title']
-        message = '{} made a bid of ${} on your {} demand'.format(developer_username, bid_amount, demand_title) 
-        Notification(client_username, developer_username, message)
+            # keep the demand's summary of its bids up to date along with the new bid
+            demand = tables.row('Demand', demand_id)
+            changes = {'bid_count': demand['bid_count'] + 1, 'last_bid_at': date_bidded}
+            if pd.isnull(demand['min_bid']) or bid_amount < demand['min_bid']:
+                changes['min_bid'] = bid_amount
+            tables.update_rows('Demand', [demand_id], changes)
+
+            # send notification to client who made the demand stating that a bid was made
+            client_username = demand['client_username']
+            demand_title = demand['title']
+            message = '{} made a bid of ${} on your {} demand'.format(developer_username, bid_amount, demand_title) 
+            Notification(client_username, developer_username, message)
 
     @staticmethod
     def get_info(bid_id):
@@ -959,11 +975,24 @@ class Bid:
         Returns a dictionary of information for the bid specified by the given index.
         Argument bid_id is the index of the row for the bid in the Bid table.
         """
-        df = pd.read_csv('database/Bid.csv')
-        bid = df.loc[int(bid_id)]
+        return Bid._info(tables.row('Bid', bid_id), datetime.datetime.now())
 
-        # get time since bid was made
+    @staticmethod
+    def get_info_many(bid_ids):
+        """
+        Returns a list of dictionaries of information for the specified bids, in the same order.
+        Reads the Bid table once no matter how many bids are given.
+        """
+        bids = tables.rows('Bid', bid_ids)
         now = datetime.datetime.now()
+        return [Bid._info(bids.iloc[position], now) for position in range(len(bids))]
+
+    @staticmethod
+    def _info(bid, now):
+        """
+        Returns the dictionary of information for the bid in the row [bid].
+        """
+        # get time since bid was made
         bid_made = datetime.datetime.strptime(bid['date_bidded'], '%m-%d-%Y %I:%M %p')
         time_diff = now - bid_made
 
@@ -988,8 +1017,7 @@ class Bid:
         Returns a list of bid_ids or indexes where the bids are located in the Bid table.
         The list is sorted from lowest bid to highest bid.
         """
-        df = pd.read_csv('database/Bid.csv')
-        bids = df.loc[df['demand_id'] == int(demand_id)].sort_values(['bid_amount'], ascending=[True])
+        bids = tables.lookup('Bid', 'demand_id', int(demand_id)).sort_values(['bid_amount'], ascending=[True])
 
         return bids.index.tolist()
 
@@ -998,8 +1026,7 @@ class Bid:
         """
         Returns bid index by username, ordered in latest to oldest.
         """
-        df = pd.read_csv('database/Bid.csv')
-        bids = df.loc[df.developer_username == username]
+        bids = tables.lookup('Bid', 'developer_username', username)
         bids_sorted = bids.sort_values(['date_bidded'], ascending=[False])
 
         return bids_sorted.index.tolist()
@@ -1009,32 +1036,26 @@ class BlacklistedUser:
     BlacklistedUser class. Has methods that inserts to and reads from BlacklistedUser table.
     """
     def __init__(self, user_id):
-        df = pd.read_csv('database/BlacklistedUser.csv')
-
         # get date for when the user can be taken off of blacklist
         # it is a year from the day when the user is put on the blacklist
         now = datetime.datetime.now()
         date = "{}-{}-{}".format(now.year + 1, now.month, now.day)
 
-        df.loc[len(df)] = pd.Series(data=[user_id, date],
-            index=['user_id', 'blacklisted_until'])
-        df.to_csv('database/BlacklistedUser.csv', index=False)
+        tables.append('BlacklistedUser', [{'user_id': user_id, 'blacklisted_until': date}])
 
     @staticmethod
     def is_blacklisted(username):
         """
         Checks if a user is on the blacklist.
         """
-        df = pd.read_csv('database/BlacklistedUser.csv')
-        return len(df.loc[df['user_id'] == username]) > 0
+        return len(tables.lookup('BlacklistedUser', 'user_id', username)) > 0
 
     @staticmethod
     def get_info(username):
         """
         Returns a dictionary of information for the given developer.
         """
-        df = pd.read_csv('database/BlacklistedUser.csv')
-        blacklisteduser = df.loc[df.user_id == username]
+        blacklisteduser = tables.lookup('BlacklistedUser', 'user_id', username)
 
         return {'username': username,
                 'blacklisted_until': blacklisteduser['blacklisted_until'].item()}
@@ -1045,7 +1066,7 @@ class SuperUser:
     SuperUser class.
     """
     def __init__(self, username, password, first_name, last_name):
-        df = pd.read_csv('database/SuperUser.csv')
+        df = tables.read('SuperUser').copy()
 
         hashed = hash_password(password)
         df.loc[len(df)] = pdf.Series(data=[username, hashed],
@@ -1056,8 +1077,7 @@ class SuperUser:
         """
         Returns a dictionary of the superuser's information.
         """
-        df = pd.read_csv('database/SuperUser.csv')
-        user = df.loc[df['username'] == username]
+        user = tables.lookup('SuperUser', 'username', username)
 
         if not user.empty:
             return {'id': user['id'],
@@ -1073,8 +1093,7 @@ class SuperUser:
         Returns true if password given matches the password for user_id 
         given and false if the password does not match.
         """
-        df = pd.read_csv('database/SuperUser.csv')
-        user = df.loc[df['username'] == username]
+        user = tables.lookup('SuperUser', 'username', username)
         if not user.empty:
             pwhash = user['password'].item()
             return pwhash == hash_password(password) 
@@ -1085,26 +1104,90 @@ class Notification:
     Notifications that show up on dashboard.
     """
     def __init__(self,recipient,sender,message):
-        df = pd.read_csv('database/Notification.csv')
+        Notification.bulk_create([{'recipient': recipient, 'sender': sender, 'message': message}])
 
+    @staticmethod
+    def bulk_create(rows):
+        """
+        Sends many notifications with one write. Each row is a dictionary with the recipient,
+        sender and message of a notification. The notifications get consecutive message ids,
+        which are returned.
+        """
         now = datetime.datetime.now()
         format = '%m-%d-%Y %I:%M %p'
         date_sent = now.strftime(format)
-        
-        df.loc[len(df)] = pd.Series(data=[len(df), recipient, sender, date_sent, message, False],
-            index=['message_id','recipient', 'sender','date_sent', 'message', 'read_status'])
 
-        df.to_csv('database/Notification.csv', index=False)
+        ids = tables.append('Notification', [{'recipient': row['recipient'],
+                                              'sender': row['sender'],
+                                              'date_sent': date_sent,
+                                              'message': row['message'],
+                                              'read_status': False} for row in rows], id_column='message_id')
+
+        notifs = {}
+        for row in rows:
+            notif = {'sender': row['sender'], 'message': row['message'], 'date_sent': date_sent, 'read_status': False}
+            notifs.setdefault(row['recipient'], []).append(notif)
+        tables.after_commit(lambda: Notification.publish(notifs))
+
+        return ids
+
+    @staticmethod
+    def publish(notifs):
+        """
+        Sends each recipient's new notifications in [notifs], a dictionary from recipient to a
+        list of notifications, to the dashboards they have open along with their number of
+        unread messages. A recipient with an empty list only gets the number of unread messages.
+        """
+        for recipient, new_notifs in notifs.items():
+            unread = Notification.get_number_of_unread(recipient)
+            topic = ('notifications', recipient)
+            if not new_notifs:
+                pubsub.publish(topic, {'unread': unread})
+            for notif in new_notifs:
+                pubsub.publish(topic, {'unread': unread, 'notification': notif})
+
+    @staticmethod
+    def get_inbox(recipient):
+        """
+        Returns [ids, unread_ids] for the recipient, the ids of all their notifications and of the
+        ones whose read_status is False, each from oldest to newest.
+        Uses an index of every recipient's inbox, which is kept up to date as notifications
+        are sent and read.
+        """
+        inboxes = tables.view('Notification', helpers.build_inbox_index,
+                              helpers.add_to_inbox_index, helpers.update_inbox_index)
+        return inboxes.get(recipient, [[], []])
+
+    @staticmethod
+    def get_last_read_id(recipient):
+        """
+        Returns the id of the newest notification the recipient has read all notifications up to,
+        or -1 if they have not read any.
+        """
+        last_read = tables.lookup('NotificationRead', 'recipient', recipient)
+        if last_read.empty:
+            return -1
+        return int(last_read['last_read_id'].item())
 
     @staticmethod
     def get_number_of_unread(recipient):
         """
         Gets the number of unread messages the recipient username has.
         """
-        df = pd.read_csv('database/Notification.csv')
-        msgs = df.loc[(df['recipient'] == recipient) & (df.read_status == False)]
+        unread_ids = Notification.get_inbox(recipient)[1]
+        return len(unread_ids) - bisect.bisect_right(unread_ids, Notification.get_last_read_id(recipient))
 
-        return len(msgs)
+    @staticmethod
+    def get_notifs(recipient, ids):
+        """
+        Returns the notifications with the given ids, in the same order.
+        A notification is read if its read_status is True or the recipient has read up to it.
+        """
+        msgs = tables.rows('Notification', ids)
+        msgs = msgs[['sender', 'message', 'date_sent', 'read_status']]
+        msgs = msgs.assign(read_status=(msgs.read_status == True) | (msgs.index <= Notification.get_last_read_id(recipient)))
+
+        return msgs.to_dict('records')
 
     @staticmethod
     def get_notif_to_recipient(recipient, number):
@@ -1112,42 +1195,41 @@ class Notification:
         Get messages to a certain recipient. The amount that is returned is number.
         The most recent notifications are returned.
         """
-        df = pd.read_csv('database/Notification.csv')
-        msgs = df.loc[df['recipient'] == recipient]
-        msgs_sorted = msgs.sort_values(by="message_id", ascending=False) # latest notif first
-
-        notifs = []
-        for index, row in msgs_sorted.iterrows():
-            if len(notifs) == number :
-                break
-            temp = { 'sender': row['sender'],
-                    'message': row['message'],
-                    'date_sent': row['date_sent'],
-                    'read_status': row['read_status']}
-            notifs.append(temp)
-        return notifs
+        ids = Notification.get_inbox(recipient)[0]
+        ids = ids[max(len(ids) - number, 0):][::-1] # latest notif first
+
+        return Notification.get_notifs(recipient, ids)
 
     @staticmethod
     def get_all_notif_to_recipient(recipient):
         """
-        Get all notifications to a user
+        Get all notifications to a user, then marks them as read.
         """
-        df = pd.read_csv('database/Notification.csv')
-        msgs = df.loc[df['recipient'] == recipient]
-        msgs_sorted = msgs.sort_values(by="message_id", ascending=False) # latest notif first
+        ids = Notification.get_inbox(recipient)[0]
+        notifs = Notification.get_notifs(recipient, ids[::-1]) # latest notif first
 
-        df.loc[df['recipient'] == recipient, ['read_status']] = True
-        df.to_csv('database/Notification.csv', index=False)
+        Notification.mark_all_read(recipient)
 
-        notifs = []
-        for index, row in msgs_sorted.iterrows():
-            temp = {'sender': row['sender'],
-                    'message': row['message'],
-                    'date_sent': row['date_sent'],
-                    'read_status': row['read_status']}
-            notifs.append(temp)
         return notifs
 
+    @staticmethod
+    def mark_all_read(recipient):
+        """
+        Marks all of the recipient's notifications as read by recording the id of their newest one,
+        so only the recipient's row of the NotificationRead table changes.
+        Does nothing if they have no unread notifications.
+        """
+        if Notification.get_number_of_unread(recipient) == 0:
+            return
+
+        last_id = Notification.get_inbox(recipient)[0][-1]
+        with tables.session():
+            if tables.lookup('NotificationRead', 'recipient', recipient).empty:
+                tables.append('NotificationRead', [{'recipient': recipient, 'last_read_id': last_id}])
+            else:
+                tables.update('NotificationRead', 'recipient', recipient, {'last_read_id': last_id})
+            tables.after_commit(lambda: Notification.publish({recipient: []}))
+
 class SystemWarning:
     """
     A warning that is issued to a user
@@ -1158,71 +1240,66 @@ class SystemWarning:
         inactive
     """
     def __init__(self,recipient,status):
-        df = pd.read_csv('database/Warning.csv')
         # Create a new row in table for warning
-        df.loc[len(df)] = pd.Series(data=[len(df), recipient, status],
-            index=['warning_id','warned_user','status'])
-        df.to_csv('database/Warning.csv', index=False)
+        SystemWarning.bulk_create([{'warned_user': recipient, 'status': status}])
+
+    @staticmethod
+    def bulk_create(rows):
+        """
+        Issues many warnings with one write. Each row is a dictionary with the warned_user and
+        status of a warning. The warnings get consecutive ids, which are returned.
+        """
+        return tables.append('Warning', [{'warned_user': row['warned_user'], 'status': row['status']} for row in rows],
+                             id_column='warning_id')
 
     @staticmethod
     def protest_warning(warning_id,reason):
         """
         Allow user to protest a warning
         """
-        df = pd.read_csv('database/Warning.csv')
         # Set warning back to active and give reason
-        df.loc[df.warning_id == warning_id, 'status'] = 'pending'
-        df.loc[df.warning_id == warning_id, 'reason'] = reason
-
-        df.to_csv('database/Warning.csv', index=False)
+        tables.update('Warning', 'warning_id', warning_id, {'status': 'pending', 'reason': reason})
 
     @staticmethod
     def remove_warning(warning_id):
         """
         Remove warning that user has protested
         """
-        df = pd.read_csv('database/Warning.csv')
         # Set warning back to active and give reason
-        df.loc[df.warning_id == warning_id, 'status'] = 'inactive'
-        df.to_csv('database/Warning.csv', index=False)
+        tables.update('Warning', 'warning_id', warning_id, {'status': 'inactive'})
 
     @staticmethod
     def keep_warning(warning_id):
         """
         Keep the warning that user has protested and provide reason for doing so
         """
-        df = pd.read_csv('database/Warning.csv')
         # Set warning back to active and give reason
-        df.loc[df.warning_id == warning_id, 'status'] = 'active_and_denied'
-        df.to_csv('database/Warning.csv', index=False)
+        tables.update('Warning', 'warning_id', warning_id, {'status': 'active_and_denied'})
 
     @staticmethod
     def get_warned_user(warning_id):
         """
         Get the recipient of a particular warning's username
         """
-        df = pd.read_csv('database/Warning.csv')
-        if len(df.loc[df.warning_id == warning_id]) > 0:
-            df = pd.read_csv('database/Warning.csv')
-            return df.loc[df.warning_id == warning_id, 'warned_user'][warning_id]
+        df = tables.lookup('Warning', 'warning_id', warning_id)
+        if len(df) > 0:
+            return df['warned_user'][warning_id]
 
     @staticmethod
     def get_warning_status(warning_id):
         """
         Get the recipient of a particular warning's username
         """
-        df = pd.read_csv('database/Warning.csv')
-        if len(df.loc[df.warning_id == warning_id]) > 0:
-            df = pd.read_csv('database/Warning.csv')
-            return df.loc[df.warning_id == warning_id, 'status'][warning_id]
+        df = tables.lookup('Warning', 'warning_id', warning_id)
+        if len(df) > 0:
+            return df['status'][warning_id]
 
     @staticmethod
     def get_warning_info(warning_id):
         """
         Returns a dictionary of the warning's information.
         """
-        df = pd.read_csv('database/Warning.csv')
-        warning = df.loc[df['warning_id'] == warning_id]
+        warning = tables.lookup('Warning', 'warning_id', warning_id)
 
         if not warning.empty:
             return {'warning_id': warning['warning_id'].item(),
@@ -1235,8 +1312,7 @@ class SystemWarning:
         """
         Gets all pending protest requests.
         """
-        df = pd.read_csv('database/Warning.csv')
-        get_protests = df.loc[df['status'] == 'pending']
+        get_protests = tables.lookup('Warning', 'status', 'pending')
         protests = get_protests.T.to_dict().values()
         return protests
 
@@ -1245,8 +1321,7 @@ class SystemWarning:
         """
         Gets a dictionary of all the warnings given to [username]
         """
-        df = pd.read_csv('database/Warning.csv')
-        get_warnings = df.loc[df['warned_user'] == username]
+        get_warnings = tables.lookup('Warning', 'warned_user', username)
         warnings = get_warnings.T.to_dict().values()
         return warnings
 
@@ -1255,8 +1330,7 @@ class SystemWarning:
         """
         Returns whether [username] should be blacklisted (if they have more than 2 active warnings)
         """
-        df = pd.read_csv('database/Warning.csv')
-        get_warnings = df.loc[df['warned_user'] == username]
+        get_warnings = tables.lookup('Warning', 'warned_user', username)
         warnings = get_warnings.T.to_dict().values()
         num_of_warnings = 0
         for warning in warnings:
@@ -1271,18 +1345,43 @@ class Transaction:
     Transactions between users (sender and recipient).
     """
     def __init__(self, recipient, sender, amount, message=None):
-        df = pd.read_csv('database/Transaction.csv')
-        df.loc[len(df)] = pd.Series(data=[len(df), recipient, sender, amount, 'pending', message],
-            index=['transaction_id', 'recipient','sender','amount','status', 'optional_message'])
-        df.to_csv('database/Transaction.csv', index=False)
+        Transaction.bulk_create([{'recipient': recipient, 'sender': sender, 'amount': amount, 'optional_message': message}])
+
+    @staticmethod
+    def bulk_create(rows):
+        """
+        Creates many transactions with one write. Each row is a dictionary with the recipient,
+        sender and amount of a transaction and optionally its optional_message and status,
+        which is 'pending' if it is not given. The transactions get consecutive ids, which are returned.
+        """
+        return tables.append('Transaction', [{'recipient': row['recipient'],
+                                              'sender': row['sender'],
+                                              'amount': row['amount'],
+                                              'status': row.get('status', 'pending'),
+                                              'optional_message': row.get('optional_message')} for row in rows],
+                             id_column='transaction_id')
+
+    @staticmethod
+    def deposit(username, amount):
+        """
+        Adds [amount] dollars from the user's credit card to their balance, as an approved
+        transaction from Ledger.CREDIT_CARD that is posted to the ledger right away.
+        Returns the id of the transaction.
+        """
+        row = {'recipient': username, 'sender': Ledger.CREDIT_CARD, 'amount': amount,
+               'status': 'approved', 'optional_message': 'Deposit'}
+        # the id is only certain to be the one the transaction is written with under the write lock
+        with tables.session(locked=True):
+            transaction_id = Transaction.bulk_create([row])[0]
+            Ledger.post([dict(row, transaction_id=transaction_id)])
+        return transaction_id
 
     @staticmethod
     def get_transaction_info(transaction_id):
         """
         Returns a dictionary of the transaction's information.
         """
-        df = pd.read_csv('database/Transaction.csv')
-        transaction = df.loc[df['transaction_id'] == int(transaction_id)]
+        transaction = tables.lookup('Transaction', 'transaction_id', int(transaction_id))
 
         if not transaction.empty:
             return {'transaction_id': transaction['transaction_id'].item(),
@@ -1294,33 +1393,91 @@ class Transaction:
     @staticmethod
     def approve_transaction(transaction_id):
         """
-        Approves a transaction
+        Approves a pending transaction and moves its amount from the sender's balance to the
+        recipient's, by posting it to the ledger in the same session as the new status.
+        Does nothing if the transaction is not pending, so it is never posted twice.
         """
-        df = pd.read_csv('database/Transaction.csv')
-        transaction = df.loc[df['transaction_id'] == transaction_id]
-        df.loc[df.transaction_id == transaction_id, 'status'] = 'approved'
-        df.to_csv('database/Transaction.csv', index=False)
+        with tables.session(locked=True):
+            transaction = tables.lookup('Transaction', 'transaction_id', int(transaction_id))
+            Transaction._approve(transaction.loc[transaction['status'] == 'pending'])
 
     @staticmethod
     def deny_transaction(transaction_id):
         """
         Denies a transaction
         """
-        df = pd.read_csv('database/Transaction.csv')
-        transaction = df.loc[df['transaction_id'] == transaction_id]
-        df.loc[df.transaction_id == transaction_id, 'status'] = 'denied'
-        df.to_csv('database/Transaction.csv', index=False)
-        # Issues a warning to the sender
-        sender = transaction['sender'].item()
-        SystemWarning(sender,'active')
+        with tables.session(locked=True):
+            transaction = tables.lookup('Transaction', 'transaction_id', int(transaction_id))
+            Transaction._deny(transaction.loc[transaction['status'] == 'pending'])
+
+    @staticmethod
+    def approve_many(transaction_ids, superuser):
+        """
+        Approves the pending transactions among [transaction_ids] and posts them to the ledger,
+        with one write to each table, and notifies their senders that [superuser] approved them.
+        Returns the ids of the transactions that were approved.
+        """
+        with tables.session(locked=True):
+            transactions = Transaction.get_pending_rows(transaction_ids)
+            Transaction._approve(transactions)
+            Transaction._notify(transactions, superuser, 'approved')
+        return transactions['transaction_id'].tolist()
+
+    @staticmethod
+    def deny_many(transaction_ids, superuser):
+        """
+        Denies the pending transactions among [transaction_ids] and warns their senders, with one
+        write to each table, and notifies the senders that [superuser] denied them.
+        Returns the ids of the transactions that were denied.
+        """
+        with tables.session(locked=True):
+            transactions = Transaction.get_pending_rows(transaction_ids)
+            Transaction._deny(transactions)
+            Transaction._notify(transactions, superuser, 'denied')
+        return transactions['transaction_id'].tolist()
+
+    @staticmethod
+    def get_pending_rows(transaction_ids):
+        """
+        Returns the rows of the Transaction table of the transactions among [transaction_ids]
+        that are still pending. Call it in a locked session (see tables.lock), so that no
+        other superuser can decide on the transactions before they are updated.
+        """
+        transactions = tables.read('Transaction')
+        transaction_ids = [int(transaction_id) for transaction_id in transaction_ids]
+        return transactions.loc[transactions['transaction_id'].isin(transaction_ids) & (transactions['status'] == 'pending')]
+
+    @staticmethod
+    def _approve(transactions):
+        """
+        Approves the pending Transaction rows [transactions] and moves their amounts from
+        the senders' balances to the recipients'.
+        """
+        tables.update_rows('Transaction', transactions.index, {'status': 'approved'})
+        Ledger.post([{'transaction_id': int(transaction_id), 'sender': sender, 'recipient': recipient, 'amount': amount}
+                     for transaction_id, sender, recipient, amount in zip(transactions['transaction_id'], transactions['sender'],
+                                                                          transactions['recipient'], transactions['amount'])])
+
+    @staticmethod
+    def _deny(transactions):
+        """
+        Denies the pending Transaction rows [transactions] and issues a warning to each of their senders.
+        """
+        tables.update_rows('Transaction', transactions.index, {'status': 'denied'})
+        SystemWarning.bulk_create([{'warned_user': sender, 'status': 'active'} for sender in transactions['sender']])
+
+    @staticmethod
+    def _notify(transactions, superuser, decision):
+        Notification.bulk_create([{'recipient': sender, 'sender': superuser,
+                                   'message': 'Your transaction (Transaction#'+ str(transaction_id) +') was ' + decision + '.'}
+                                  for transaction_id, sender in zip(transactions['transaction_id'], transactions['sender'])])
 
     @staticmethod
     def get_pending_transactions():
         """
         Gets all pending transactions that are waiting on approval from the superuser.
         """
-        df = pd.read_csv('database/Transaction.csv')
-        get_pending_transactions = df.loc[df['status'] == 'pending']
+        get_pending_transactions = tables.lookup('Transaction', 'status', 'pending')
         pending_transactions = get_pending_transactions.T.to_dict().values()
         return pending_transactions
 
@@ -1329,8 +1486,7 @@ class Transaction:
         """
         Get all transactions where username is recipient.
         """
-        df = pd.read_csv("database/Transaction.csv")
-        transactions = df.loc[(df.recipient == username)]
+        transactions = tables.lookup('Transaction', 'recipient', username)
         dict_transactions = transactions.T.to_dict().values()
 
         print(dict_transactions)
@@ -1342,42 +1498,194 @@ class Transaction:
         """
         Get all transactions where username is sender.
         """
-        df = pd.read_csv("database/Transaction.csv")
-        transactions = df.loc[(df.sender == username)]
+        transactions = tables.lookup('Transaction', 'sender', username)
         dict_transactions = transactions.T.to_dict().values()
 
         print(dict_transactions)
 
         return dict_transactions
 
+class Ledger:
+    """
+    Ledger class. Keeps the money moved by approved transactions in the Ledger table as
+    double-entry bookkeeping: each transfer is two entries, taking the amount out of the
+    sender's account and putting it into the recipient's, so the entries always sum to 0.
+    The balance of every account is kept as a running total, so reading it does not
+    depend on the number of entries.
+    """
+    # account that deposits come from
+    CREDIT_CARD = '(credit card)'
+    # account that the balance a user starts with comes from
+    OPENING = '(opening balance)'
+
+    @staticmethod
+    def post(transfers):
+        """
+        Writes the entries of many transfers with one write. Each transfer is a dictionary with
+        the sender, recipient and amount, and the transaction_id of the transaction it carries out.
+        """
+        now = datetime.datetime.now()
+        format = '%m-%d-%Y %I:%M %p'
+        posted_at = now.strftime(format)
+
+        entries = []
+        for transfer in transfers:
+            amount = float(transfer['amount'])
+            for account, signed_amount in [(transfer['sender'], -amount), (transfer['recipient'], amount)]:
+                entries.append({'transaction_id': int(transfer['transaction_id']),
+                                'account': account,
+                                'amount': signed_amount,
+                                'posted_at': posted_at})
+        if entries:
+            tables.append('Ledger', entries, id_column='entry_id')
+
+    @staticmethod
+    def open_account(username, balance):
+        """
+        Gives a new user the [balance] they start with.
+        """
+        if balance:
+            Ledger._open({username: balance})
+
+    @staticmethod
+    def _open(balances):
+        """
+        Records the balance each username in [balances] starts with as an approved transaction
+        from Ledger.OPENING and posts it, so that every entry belongs to a transaction.
+        """
+        rows = [{'recipient': username, 'sender': Ledger.OPENING, 'amount': balance,
+                 'status': 'approved', 'optional_message': 'Opening balance'}
+                for username, balance in sorted(balances.items())]
+        with tables.session(locked=True):
+            transaction_ids = Transaction.bulk_create(rows)
+            Ledger.post([dict(row, transaction_id=transaction_id) for transaction_id, row in zip(transaction_ids, rows)])
+
+    @staticmethod
+    def get_balances():
+        """
+        Returns the running balance of every account in the ledger.
+        """
+        return tables.view('Ledger', helpers.build_balances, helpers.add_to_balances)
+
+    @staticmethod
+    def get_balance(username):
+        """
+        Returns the balance of [username], in dollars.
+        """
+        return round(Ledger.get_balances().get(username, 0), 2)
+
+    @staticmethod
+    def open_missing_accounts():
+        """
+        Gives every client and developer who has no entries in the ledger an opening balance
+        equal to the balance column of their row, for databases from before the ledger was kept.
+        Users whose balance is 0 need no entries.
+        Returns a dictionary from the username of each opened account to its balance.
+        """
+        with tables.session(locked=True):
+            balances = Ledger.get_balances()
+            opened = {}
+            for name in ['Client', 'Developer']:
+                users = tables.read(name)
+                for username, balance in zip(users['username'], users['balance'].fillna(0)):
+                    if isinstance(username, str) and balance and username not in balances and username not in opened:
+                        opened[username] = float(balance)
+
+            Ledger._open(opened)
+        return opened
+
 class Rating:
     """
     Ratings between developers and clients.
     """
     def __init__(self, demand_id, recipient, rater, rating, message=None):
-        df = pd.read_csv('database/Rating.csv')
-        df.loc[len(df)] = pd.Series(data=[demand_id, recipient, rater, rating, message],
-            index=['demand_id', 'recipient', 'rater', 'rating', 'message'])
-        df.to_csv('database/Rating.csv', index=False)
+        Rating.bulk_create([{'demand_id': demand_id, 'recipient': recipient, 'rater': rater,
+                             'rating': rating, 'message': message}])
+
+    @staticmethod
+    def bulk_create(rows):
+        """
+        Adds many ratings with one write, and stores the new average of each recipient and rater
+        once. Each row is a dictionary with the demand_id, recipient, rater and rating of a rating
+        and optionally its message.
+        """
+        if not rows:
+            return
+
+        new_ratings = pd.DataFrame({'recipient': [row['recipient'] for row in rows],
+                                    'rater': [row['rater'] for row in rows],
+                                    'rating': [float(row['rating']) for row in rows]})
+        added = helpers.build_rating_totals(new_ratings)
+
+        with tables.session(locked=True):
+            # the averages including the new ratings, from the totals before they are added,
+            # read under the write lock so ratings given at the same time are all counted
+            totals = Rating.get_totals()
+
+            tables.append('Rating', [{'demand_id': row['demand_id'],
+                                      'recipient': row['recipient'],
+                                      'rater': row['rater'],
+                                      'rating': row['rating'],
+                                      'message': row.get('message')} for row in rows])
+
+            for column, average_column in [('recipient', 'avg_rating'), ('rater', 'avg_given_rating')]:
+                for username, (rating_sum, rating_count) in added[column].items():
+                    old_sum, old_count = totals[column].get(username, [0, 0])
+                    Rating.set_average(username, average_column, (old_sum + rating_sum) / (old_count + rating_count))
+
+    @staticmethod
+    def get_totals():
+        """
+        Returns the running [sum, count] of the ratings each user received and gave, as
+        {'recipient': {username: [sum, count]}, 'rater': {username: [sum, count]}}.
+        The totals are computed from the Rating table once and kept up to date as ratings are added.
+        """
+        return tables.view('Rating', helpers.build_rating_totals, helpers.add_to_rating_totals)
+
+    @staticmethod
+    def set_average(username, column, average):
+        """
+        Stores [average] in the [column] of [username]'s row in the Client or Developer table.
+        Does nothing for users that are in neither table, such as superusers.
+        """
+        user = tables.lookup('User', 'username', username)
+        if user.empty:
+            return
+
+        type_of_user = user['type_of_user'].iloc[0]
+        if type_of_user == 'client':
+            tables.update('Client', 'username', username, {column: average})
+        elif type_of_user == 'developer':
+            tables.update('Developer', 'username', username, {column: average})
 
     @staticmethod
     def get_avg_rating(username):
         """
         Gets the average rating of [username]
         """
-        df = pd.read_csv('database/Rating.csv')
-        ratings = df.loc[df.recipient == username]
-        average = ratings["rating"].mean()
+        rating_sum, rating_count = Rating.get_totals()['recipient'].get(username, [0, 0])
+        if rating_count == 0:
+            return np.nan
 
-        return average
+        return rating_sum / rating_count
+
+    @staticmethod
+    def get_avg_given_rating(username):
+        """
+        Gets the average of the ratings [username] gave
+        """
+        rating_sum, rating_count = Rating.get_totals()['rater'].get(username, [0, 0])
+        if rating_count == 0:
+            return np.nan
+
+        return rating_sum / rating_count
 
     @staticmethod
     def get_ratings_by_demand_id(demand_id):
         """
         Returns dataframe of ratings corresponding to a demand_id.
         """
-        df = pd.read_csv('database/Rating.csv')
-        ratings = df.loc[df.demand_id == demand_id]
+        ratings = tables.lookup('Rating', 'demand_id', demand_id)
 
         return ratings
 
@@ -1402,17 +1710,14 @@ class DeleteRequest:
     Delete requests created by users
     """
     def __init__(self, username):
-        df = pd.read_csv('database/DeleteRequest.csv')
-        df.loc[len(df)] = pd.Series(data=[len(df), username, 'pending'],
-            index=['delete_request_id', 'username', 'status'])
+        tables.append('DeleteRequest', [{'username': username, 'status': 'pending'}], id_column='delete_request_id')
 
     @staticmethod
     def get_delete_request_status(delete_request_id):
         """
         Gets the status of the delete request with the id of [delete_request_id]
         """
-        df = pd.read_csv('database/DeleteRequest.csv')
-        status = df.loc[df.delete_request_id == delete_request_id, 'status'] 
+        status = tables.lookup('DeleteRequest', 'delete_request_id', delete_request_id)['status']
         return status
 
     @staticmethod
@@ -1420,18 +1725,15 @@ class DeleteRequest:
         """
         Sets the status of the delete request with the id of [delete_request_id] to [status]
         """
-        df = pd.read_csv('database/DeleteRequest.csv')
-        df.loc[df.delete_request_id == delete_request_id, 'status'] = status
-        df.to_csv('database/DeleteRequest.csv', index=False)
+        tables.update('DeleteRequest', 'delete_request_id', delete_request_id, {'status': status})
 
     @staticmethod
     def is_account_deleted(username):
         """
         Checks if [username]'s account is deleted
         """
-        df = pd.read_csv('database/DeleteRequest.csv')
         # Check if user has requested a deletion.
-        df = df.loc[df.username == username]
+        df = tables.lookup('DeleteRequest', 'username', username)
         # If they have, check if that request has been approved
         if len(df) > 0:
             df = df.loc[df.status == 'approved']
@@ -1444,11 +1746,10 @@ class DeleteRequest:
         """
         Gets a dictionary of all pending delete requests that are waiting on approval from the superuser.
         """
-        df = pd.read_csv('database/DeleteRequest.csv')
-        pending_delete_requests = df.loc[df['status']=='pending'].T.to_dict().values()
+        pending_delete_requests = tables.lookup('DeleteRequest', 'status', 'pending').T.to_dict().values()
         return pending_delete_requests
 
-        df = pd.read_csv('database/Warning.csv')
+        df = tables.read('Warning')
         get_warnings = df.loc[df['warned_user'] == username]
         warnings = get_warnings.T.to_dict().values()
         return warnings
@@ -1458,8 +1759,7 @@ class DeleteRequest:
         """
         Returns a dictionary of the delete request's information.
         """
-        df = pd.read_csv('database/DeleteRequest.csv')
-        delete_request = df.loc[df.delete_request_id == delete_request_id]
+        delete_request = tables.lookup('DeleteRequest', 'delete_request_id', delete_request_id)
 
         if not delete_request.empty:
             return {'delete_request_id': delete_request_id,
@@ -1474,17 +1774,168 @@ class DeleteRequest:
         """
         info = DeleteRequest.get_delete_request_info(delete_request_id)
         print(info['username'])
-        User.delete_user(info['username'])
-        DeleteRequest.set_delete_request_status(delete_request_id,'approved')
+        with tables.session():
+            User.delete_user(info['username'])
+            DeleteRequest.set_delete_request_status(delete_request_id,'approved')
 
 
     @staticmethod
     def deny_delete_request(delete_request_id):
         DeleteRequest.set_delete_request_status(delete_request_id,'denied')
 
+    @staticmethod
+    def approve_many(delete_request_ids):
+        """
+        Deletes the accounts of the users whose pending delete requests are among [delete_request_ids],
+        with one write to each table, and changes the status of the requests.
+        Returns the ids of the delete requests that were approved.
+        """
+        with tables.session(locked=True):
+            delete_requests = DeleteRequest.get_pending_rows(delete_request_ids)
+            User.delete_many(delete_requests['username'])
+            tables.update_rows('DeleteRequest', delete_requests.index, {'status': 'approved'})
+        return delete_requests['delete_request_id'].tolist()
 
-# run these checks here (not as good as real triggers, but good enough)
-Demand.check_approaching_bidding_deadlines()
-Demand.check_approaching_submission_deadlines()
-Demand.check_expired_demands()
-Demand.check_overdue_demands()
+    @staticmethod
+    def deny_many(delete_request_ids, superuser):
+        """
+        Denies the pending delete requests among [delete_request_ids] with one write, and notifies
+        the users that [superuser] denied them. Returns the ids of the delete requests that were denied.
+        """
+        with tables.session(locked=True):
+            delete_requests = DeleteRequest.get_pending_rows(delete_request_ids)
+            tables.update_rows('DeleteRequest', delete_requests.index, {'status': 'denied'})
+            Notification.bulk_create([{'recipient': username, 'sender': superuser,
+                                       'message': 'Your delete account request (ID#'+ str(delete_request_id) +') was denied.'}
+                                      for delete_request_id, username in zip(delete_requests['delete_request_id'], delete_requests['username'])])
+        return delete_requests['delete_request_id'].tolist()
+
+    @staticmethod
+    def get_pending_rows(delete_request_ids):
+        """
+        Returns the rows of the DeleteRequest table of the delete requests among [delete_request_ids]
+        that are still pending. Call it in a locked session (see tables.lock).
+        """
+        delete_requests = tables.read('DeleteRequest')
+        delete_request_ids = [int(delete_request_id) for delete_request_id in delete_request_ids]
+        return delete_requests.loc[delete_requests['delete_request_id'].isin(delete_request_ids) & (delete_requests['status'] == 'pending')]
+
+
+class Counter:
+    """
+    Counter class. Keeps the number of users, clients and developers in the Counter table,
+    so that they can be shown without counting the rows of their tables.
+    """
+    # name of counter -> (table, column whose non-empty values are counted)
+    COUNTED = {'users': ('User', 'username'),
+               'clients': ('Client', 'username'),
+               'developers': ('Developer', 'username')}
+
+    @staticmethod
+    def get(name):
+        """
+        Returns the value of the counter [name].
+        Counts the table if the counter has not been created yet.
+        """
+        counter = tables.lookup('Counter', 'name', name)
+        if counter.empty:
+            return Counter.count(name)
+        return int(counter['value'].item())
+
+    @staticmethod
+    def add(name, amount):
+        """
+        Adds [amount] to the counter [name]. Does nothing if the counter has not been created yet.
+        The counter is read under the write lock, so additions made at the same time are not lost.
+        """
+        with tables.session(locked=True):
+            counter = tables.lookup('Counter', 'name', name)
+            if not counter.empty:
+                tables.update('Counter', 'name', name, {'value': int(counter['value'].item()) + amount})
+
+    @staticmethod
+    def count(name):
+        """
+        Counts the rows that the counter [name] is meant to hold the number of.
+        """
+        table, column = Counter.COUNTED[name]
+        return int(tables.read(table)[column].count()) # does not count NaNs
+
+    @staticmethod
+    def reconcile():
+        """
+        Counts the tables again and corrects the counters that do not match, creating the missing ones.
+        Returns a dictionary from the name of each corrected counter to its (stored, counted) values,
+        where the stored value is None if the counter was missing.
+        """
+        corrected = {}
+        with tables.session():
+            for name in sorted(Counter.COUNTED):
+                counted = Counter.count(name)
+                counter = tables.lookup('Counter', 'name', name)
+                if counter.empty:
+                    tables.append('Counter', [{'name': name, 'value': counted}])
+                    corrected[name] = (None, counted)
+                elif int(counter['value'].item()) != counted:
+                    tables.update('Counter', 'name', name, {'value': counted})
+                    corrected[name] = (int(counter['value'].item()), counted)
+        return corrected
+
+
+class Recommendation:
+    """
+    Recommendation class. Stores the clients and developers with interests similar to each
+    user's in the Recommendation table, so the dashboard does not compute them on every visit.
+    recommend.py computes them for every user at once; otherwise they are computed the first
+    time a user's dashboard needs them and again after the user's projects change.
+    """
+    @staticmethod
+    def compute(username):
+        """
+        Returns the usernames of three clients and three developers with interests similar to
+        the user's, as two lists.
+        """
+        tags = User.get_project_tags(username)
+        exclude = User.get_unlisted() | set([username])
+        return (similarity.get_clients().similar(tags, 3, exclude),
+                similarity.get_developers().similar(tags, 3, exclude))
+
+    @staticmethod
+    def make_row(username, client_rec, dev_rec, generated_at):
+        return {'username': username,
+                'client_rec': json.dumps(client_rec),
+                'dev_rec': json.dumps(dev_rec),
+                'generated_at': generated_at.strftime('%m-%d-%Y %I:%M %p'),
+                'is_stale': False}
+
+    @staticmethod
+    def get(username):
+        """
+        Returns the stored recommendations of the user as two lists of usernames, of similar
+        clients and of similar developers. Computes and stores them first if they are missing
+        or the user's projects changed since they were computed. Users who were blacklisted or
+        deleted since then are left out.
+        """
+        stored = tables.lookup('Recommendation', 'username', username)
+
+        if stored.empty or stored['is_stale'].item() == True:
+            client_rec, dev_rec = Recommendation.compute(username)
+            row = Recommendation.make_row(username, client_rec, dev_rec, datetime.datetime.now())
+            if stored.empty:
+                tables.append('Recommendation', [row])
+            else:
+                tables.update('Recommendation', 'username', username, row)
+        else:
+            client_rec = json.loads(stored['client_rec'].item())
+            dev_rec = json.loads(stored['dev_rec'].item())
+
+        unlisted = User.get_unlisted()
+        return ([client for client in client_rec if client not in unlisted],
+                [developer for developer in dev_rec if developer not in unlisted])
+
+    @staticmethod
+    def invalidate(username):
+        """
+        Marks the user's recommendations to be computed again, after their projects changed.
+        """
+        tables.update('Recommendation', 'username', username, {'is_stale': True})
@@ -0,0 +1,54 @@
+"""
+In-process publish/subscribe hub that hands events to the requests waiting
+for them, such as new notifications to the /dashboard/stream route.
+
+Events are only delivered to subscribers in the same process, so when the
+site runs in several processes a user only gets live updates for changes
+made by the process serving their stream; the rest show up on reload.
+"""
+import queue
+import threading
+
+# number of events kept for a subscriber that is not reading them, after which new ones are dropped
+QUEUE_SIZE = 100
+
+_lock = threading.Lock()
+# topic -> set of queues of the subscribers
+_subscribers = {}
+
+
+def subscribe(topic):
+    """
+    Returns a queue that receives every event published to [topic] from now on.
+    Call unsubscribe() with it when done.
+    """
+    subscriber = queue.Queue(QUEUE_SIZE)
+    with _lock:
+        _subscribers.setdefault(topic, set()).add(subscriber)
+    return subscriber
+
+
+def unsubscribe(topic, subscriber):
+    """
+    Stops sending the events of [topic] to the queue [subscriber].
+    """
+    with _lock:
+        subscribers = _subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del _subscribers[topic]
+
+
+def publish(topic, event):
+    """
+    Sends [event] to every subscriber of [topic]. Never blocks: subscribers
+    whose queue is full miss the event.
+    """
+    with _lock:
+        subscribers = list(_subscribers.get(topic, ()))
+    for subscriber in subscribers:
+        try:
+            subscriber.put_nowait(event)
+        except queue.Full:
+            pass
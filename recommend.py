@@ -0,0 +1,60 @@
+"""
+Computes the dashboard recommendations (similar clients and similar
+developers) of every user who has completed a project, and stores them in
+the Recommendation table with the time they were generated.
+
+Usage:
+    python3 recommend.py
+
+The dashboard reads the stored recommendations instead of computing them.
+A user's recommendations are computed again on their next visit after
+their projects change, but those of other users only change when this is
+run, so run it periodically (for example nightly). It uses the CSV files or
+the database given by TURK_DATABASE_URL, the same way the site does.
+"""
+import datetime
+import tables
+from models import Recommendation, User
+
+
+def get_active_users():
+    """
+    Returns the usernames of the clients and developers who have completed a project
+    and are neither blacklisted nor deleted.
+    """
+    usernames = set()
+    for name in ['Client', 'Developer']:
+        users = tables.read(name)
+        usernames.update(users.loc[users['num_of_completed_projects'] > 0, 'username'].dropna())
+    return sorted(usernames - User.get_unlisted())
+
+
+def recommend_all():
+    """
+    Computes the recommendations of every active user and stores them, and removes those of
+    the users who are no longer active. Only these rows are written. The pass holds the write
+    lock, so a user whose projects change meanwhile is marked stale after their row is stored.
+    """
+    now = datetime.datetime.now()
+    with tables.session(locked=True):
+        active = get_active_users()
+        stored = tables.read('Recommendation')
+        positions = dict(zip(stored['username'], stored.index))
+
+        new_rows = []
+        for username in active:
+            client_rec, dev_rec = Recommendation.compute(username)
+            row = Recommendation.make_row(username, client_rec, dev_rec, now)
+            if username in positions:
+                tables.update_rows('Recommendation', [positions[username]], row)
+            else:
+                new_rows.append(row)
+        tables.append('Recommendation', new_rows)
+
+        inactive = set(positions) - set(active)
+        tables.delete_rows('Recommendation', [positions[username] for username in inactive])
+    print('Recommendation: {} rows'.format(len(active)))
+
+
+if __name__ == "__main__":
+    recommend_all()
@@ -1,16 +1,54 @@
-from flask import Flask, flash, render_template, request, session, redirect, url_for
+from flask import Flask, Response, flash, render_template, request, session, redirect, url_for
 import numpy as np
 from csv import reader
 import datetime
+import json
+import queue
+import time
 from dateutil import parser
-from forms import SignupForm, LoginForm, DemandForm, BidForm, ApplicantApprovalForm, BecomeUserForm, JustifyDeveloperChoiceForm, ProtestForm, ProtestApprovalForm, SubmitSystemForm, RatingForm,RatingMessageForm, TransactionApprovalForm, DeleteAccountForm, DeleteAccountApprovalForm, AddFundsForm, EditProfileForm, validate_user_id, validate_email
-from models import User, Client, Developer, Applicant, Demand, Bid, BlacklistedUser, SuperUser, SystemWarning, Notification, Rating, Transaction, DeleteRequest
+from forms import SignupForm, LoginForm, DemandForm, BidForm, ApplicantApprovalForm, BecomeUserForm, JustifyDeveloperChoiceForm, ProtestForm, ProtestApprovalForm, SubmitSystemForm, RatingForm,RatingMessageForm, TransactionApprovalForm, DeleteAccountForm, DeleteAccountApprovalForm, BatchApprovalForm, AddFundsForm, EditProfileForm, validate_user_id, validate_email
+from models import User, Client, Developer, Applicant, Demand, Bid, BlacklistedUser, SuperUser, SystemWarning, Notification, Rating, Transaction, Ledger, DeleteRequest, Recommendation
 import helpers
+import pubsub
+import scheduler
+import tables
+
+# seconds between the comments sent to keep an idle notification stream open
+STREAM_KEEPALIVE = 15
+# seconds after which a notification stream is closed; the browser opens it again by itself
+STREAM_DURATION = 300
 
 app = Flask(__name__)
 app.secret_key = 'development-key'
 
 
+@app.before_request
+def begin_session():
+    """
+    Records the changes a request makes to the tables so they are written once, after the view returns.
+    """
+    tables.begin()
+
+@app.after_request
+def commit_session(response):
+    """
+    Writes the changes of the request, unless it failed: Flask also runs this for the response
+    of an error handler, and the changes of a request that raised part way must not be written.
+    """
+    if response.status_code >= 500:
+        tables.rollback()
+    else:
+        tables.commit()
+    return response
+
+@app.teardown_request
+def end_session(exception=None):
+    """
+    Throws away the changes of a request that failed before they were committed.
+    """
+    tables.rollback()
+
+
 @app.route("/")
 def index():
     number_of_clients = Client.get_number_of_clients()
@@ -44,23 +82,23 @@ def dashboard():
 
         # If the user has no projects in history, they are a new user.
         user_type = User.get_user_info(session['username'])['type_of_user']
-        recs = {"client_rec_des": "Most Active Clients", 
+        has_projects = False
+        if user_type == 'client':
+            has_projects = Client.get_info(session['username'])['num_of_completed_projects'] > 0
+        elif user_type == 'developer':
+            has_projects = Developer.get_info(session['username'])['num_of_completed_projects'] > 0
+
+        if has_projects:
+            client_rec, dev_rec = Recommendation.get(session['username'])
+            recs = {"client_rec_des": "Clients with Similar Interests", 
+                "dev_rec_des": "Developers with Similar Interests",
+                "client_rec": [User.get_user_info(username) for username in client_rec], 
+                "dev_rec": [User.get_user_info(username) for username in dev_rec]}
+        else:
+            recs = {"client_rec_des": "Most Active Clients", 
                 "dev_rec_des": "Most Active Developers",
                 "client_rec": Client.get_most_active_clients(), 
                 "dev_rec": Developer.get_most_active_developers()}
-
-        if user_type == 'client':
-            if Client.get_info(session['username'])['num_of_completed_projects'] > 0:
-                recs = {"client_rec_des": "Clients with Similar Interests", 
-                    "dev_rec_des": "Developers with Similar Interests",
-                    "client_rec": Client.get_similar_clients(session['username']), 
-                    "dev_rec": Developer.get_similar_developers(session['username'])}
-        elif user_type == 'developer':
-            if Developer.get_info(session['username'])['num_of_completed_projects'] > 0:
-                recs = {"client_rec_des": "Clients with Similar Interests", 
-                    "dev_rec_des": "Developers with Similar Interests",
-                    "client_rec": Client.get_similar_clients(session['username']), 
-                    "dev_rec": Developer.get_similar_developers(session['username'])}
         return render_template("dashboard.html", first_name=first_name, notifications=notifications,
                                 recs=recs, unread=unread)
     else:
@@ -76,26 +114,26 @@ def my_projects():
             return render_template("access_denied.html")
 
         user_type = User.get_user_info(session['username'])['type_of_user']
-        current = list(Demand.get_info(x) for x in Demand.get_current_projects(session['username']))
+        current = Demand.get_info_many(Demand.get_current_projects(session['username']))
         mid = []
         completed = []
         if user_type == "developer":
             bids_by_username = Bid.get_bids_by_username(session['username'])
             temp = []
 
-            for i in bids_by_username:
-                info = Bid.get_info(i)['demand_id']
+            for bid in Bid.get_info_many(bids_by_username):
+                info = bid['demand_id']
                 if info not in temp:
                     temp.append(info)
 
-            mid = list(Demand.get_info(y) for y in temp)
-            completed = list(Demand.get_info(x) for x in Developer.get_past_projects(session['username']))
+            mid = Demand.get_info_many(temp)
+            completed = Demand.get_info_many(Developer.get_past_projects(session['username']))
         else:
-            temp = (Demand.get_info(x) for x in Demand.get_filtered_demands(None, None, session['username'], None, None, None, True))
+            temp = Demand.get_info_many(Demand.get_filtered_demands(None, None, session['username'], None, None, None, True))
             for demand in temp:
                 if demand['chosen_developer_username'] is np.nan:
                     mid.append(demand)
-            completed = list(Demand.get_info(x) for x in Client.get_past_projects(session['username']))
+            completed = Demand.get_info_many(Client.get_past_projects(session['username']))
 
         return render_template("myProjects.html", user_type = user_type, current=current, mid=mid, completed=completed)
     else:
@@ -112,11 +150,7 @@ def view_transactions():
         if not session['type_of_user'] == "user":
             return render_template("access_denied.html")
 
-        balance = 0
-        if session['type_of_user'] == "developer":
-            balance = Developer.get_info(session['username'])["balance"]
-        else:
-            balance = Client.get_info(session['username'])["balance"]
+        balance = Ledger.get_balance(session['username'])
 
         outgoing = Transaction.get_transactions_by_sender(session['username'])
         incoming = Transaction.get_transactions_by_recipient(session['username'])
@@ -134,11 +168,7 @@ def add_funds():
             cc = str(User.get_user_info(session['username'])["credit_card"])
             cc = "******" + cc[-4:]
 
-            balance = 0
-            if session['type_of_user'] == "developer":
-                balance = Developer.get_info(session['username'])["balance"]
-            else:
-                balance = Client.get_info(session['username'])["balance"]
+            balance = Ledger.get_balance(session['username'])
 
             form = AddFundsForm()
 
@@ -146,12 +176,8 @@ def add_funds():
                 return render_template("addFunds.html", cc=cc,form=form, balance=balance, added=False)
             elif request.method == "POST":
                 if form.amount.validate(form):
-                    if session['type_of_user'] == "developer":
-                        Developer.add_earnings(session['username'], form.amount.data)
-                        balance = Developer.get_info(session['username'])["balance"]
-                    else:
-                        Client.add_to_balance(session['username'], form.amount.data)
-                        balance = Client.get_info(session['username'])["balance"]
+                    Transaction.deposit(session['username'], form.amount.data)
+                    balance = Ledger.get_balance(session['username'])
                     return render_template("addFunds.html",cc=cc, form=form, balance=balance, added=True)
                 else:
                     return render_template("addFunds.html", cc=cc, form=form, balance=balance, added=False)
@@ -173,6 +199,37 @@ def view_notifications():
     else:
         return redirect(url_for('login'))
 
+@app.route("/dashboard/stream")
+def stream_notifications():
+    """
+    The '/dashboard/stream' route sends the user's new notifications and number of unread
+    messages as server-sent events, so the dashboard can show them without reloading.
+    The stream ends after STREAM_DURATION seconds so it does not hold on to a worker forever.
+    """
+    if 'username' not in session or session['type_of_user'] != 'user':
+        return Response(status=403)
+
+    topic = ('notifications', session['username'])
+    subscriber = pubsub.subscribe(topic)
+    unread = Notification.get_number_of_unread(session['username'])
+
+    def events():
+        end = time.time() + STREAM_DURATION
+        try:
+            yield 'data: {}\n\n'.format(json.dumps({'unread': unread}))
+            while time.time() < end:
+                try:
+                    event = subscriber.get(timeout=min(STREAM_KEEPALIVE, max(end - time.time(), 0)))
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield 'data: {}\n\n'.format(json.dumps(event))
+        finally:
+            pubsub.unsubscribe(topic, subscriber)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route("/dashboard_applicant", methods=["GET", "POST"])
 def dashboard_applicant():
     """
@@ -238,7 +295,8 @@ def dashboard_superuser():
                                 pending_applicants=pending_applicants, 
                                 protests=protests, 
                                 pending_transactions=pending_transactions,
-                                pending_delete_requests=pending_delete_requests)
+                                pending_delete_requests=pending_delete_requests,
+                                form=BatchApprovalForm())
     else:
         return render_template("index.html")
 
@@ -269,9 +327,7 @@ def browse():
                                           tags=tags,
                                           min_bid=min_bid,
                                           active=active)
-    demands_info = []
-    for demand in demands:
-        demands_info.append(Demand.get_info(demand))
+    demands_info = Demand.get_info_many(demands)
 
     return render_template("browse.html", demands_info=demands_info)
 
@@ -292,10 +348,7 @@ def user(name):
         rating = Developer.get_info(name)['avg_rating']
         projects = Developer.get_past_projects(name)
 
-    projects_info = []
-
-    for demand_id in projects:
-        projects_info.append(Demand.get_info(demand_id))
+    projects_info = Demand.get_info_many(projects)
 
     # round rating to the nearest 0.5
     rating = round(0.5 * round(float(rating) / 0.5), 1)
@@ -480,19 +533,16 @@ def bidInfo(demand_id):
     """
     demand_info = Demand.get_info(demand_id)
     client_info = User.get_user_info(demand_info['client_username'])
-    bids = Bid.get_bids_for_demand(demand_id)
-    bids_info = []
+    bids_info = Bid.get_info_many(Bid.get_bids_for_demand(demand_id))
+    similar_demands = Demand.get_info_many(Demand.get_similar_demands(demand_id))
     bidders_info = {}
 
-    if (len(bids) > 0):
-        lowest_bid = Bid.get_info(bids[0])['bid_amount']
+    if demand_info['min_bid'] is not None:
+        lowest_bid = demand_info['min_bid']
     else:
         lowest_bid = 'None'
 
-    for bid in bids:
-        info = Bid.get_info(bid)
-        bids_info.append(info)
-
+    for info in bids_info:
         if info['developer_username'] not in bidders_info:
             bidders_info[info['developer_username']] = User.get_user_info(info['developer_username'])
     
@@ -506,7 +556,7 @@ def bidInfo(demand_id):
             return redirect(url_for('bidInfo', demand_id=demand_id))
 
     elif request.method == 'GET':
-        return render_template("bidPage.html", demand_info=demand_info, client_info=client_info, bids_info=bids_info, bidders_info=bidders_info, lowest_bid=lowest_bid, form=form, demand_id=demand_id)
+        return render_template("bidPage.html", demand_info=demand_info, client_info=client_info, bids_info=bids_info, bidders_info=bidders_info, lowest_bid=lowest_bid, form=form, demand_id=demand_id, similar_demands=similar_demands)
 
 @app.route('/bid/<demand_id>/choose-developer', methods=['GET', 'POST'])
 def choose_developer(demand_id):
@@ -517,14 +567,10 @@ def choose_developer(demand_id):
     """
     demand_info = Demand.get_info(demand_id)
 
-    bids = Bid.get_bids_for_demand(demand_id)
-    bids_info = []
+    bids_info = Bid.get_info_many(Bid.get_bids_for_demand(demand_id))
     bidders_info = {}
 
-    for bid in bids:
-        info = Bid.get_info(bid)
-        bids_info.append(info)
-
+    for info in bids_info:
         if info['developer_username'] not in bidders_info:
             username = info['developer_username']
             bidders_info[username] = User.get_user_info(username)
@@ -560,14 +606,10 @@ def justify_developer_choice(demand_id):
     The '/bid/<demand_id>/justify-developer' route is where the client fills out a form
     to explain his/her reason for choosing a developer who did not offer the lowest bid.
     """
-    bids = Bid.get_bids_for_demand(demand_id)
-    bids_info = []
+    bids_info = Bid.get_info_many(Bid.get_bids_for_demand(demand_id))
     bidders_info = {}
 
-    for bid in bids:
-        info = Bid.get_info(bid)
-        bids_info.append(info)
-
+    for info in bids_info:
         if info['developer_username'] not in bidders_info:
             username = info['developer_username']
             bidders_info[username] = User.get_user_info(username)
@@ -796,11 +838,9 @@ def transaction_approval(transaction_id):
     if request.method == 'POST':
         if form.validate():
             if form.decision.data == 'approve':
-                Transaction.approve_transaction(transaction_id)
-                Notification(info['sender'],session['username'],'Your transaction (Transaction#'+ str(transaction_id) +') was approved.')
+                Transaction.approve_many([transaction_id], session['username'])
             else:
-                Transaction.deny_transaction(transaction_id)
-                Notification(info['sender'],session['username'],'Your transaction (Transaction#'+ str(transaction_id) +') was denied.')
+                Transaction.deny_many([transaction_id], session['username'])
             return redirect(url_for('dashboard_superuser'))
         else:
             return render_template("protestApproval.html", warning_id=warning_id, info=info, form=form, avg_rating=avg_rating)
@@ -872,5 +912,64 @@ def delete_account_approval(delete_request_id):
         else:
             return render_template("deleteAccountApproval.html", form=form,info=info)
 
+def _batch_approval(approve, deny, reason_required=False):
+    """
+    Applies the decision in the batch approval form of the superuser's dashboard to every item
+    selected in it, approve(ids) or deny(ids, reason), then redirects back to the dashboard.
+    """
+    form = BatchApprovalForm()
+    selected = request.form.getlist('selected')
+    if not form.validate():
+        flash('Please choose a decision.')
+    elif not selected:
+        flash('Please select at least one item.')
+    elif form.decision.data == 'deny' and reason_required and not form.reason.data:
+        flash('Please provide a reason.')
+    elif form.decision.data == 'approve':
+        flash('{} approved.'.format(len(approve(selected))))
+    else:
+        flash('{} denied.'.format(len(deny(selected, form.reason.data))))
+    return redirect(url_for('dashboard_superuser'))
+
+@app.route("/transaction_approval/batch", methods=["POST"])
+def transaction_approval_batch():
+    """
+    The '/transaction_approval/batch' route applies a superuser's decision to every transaction
+    selected on their dashboard at once.
+    """
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    if session['type_of_user'] != 'superuser':
+        return render_template("access_denied.html")
+    return _batch_approval(lambda ids: Transaction.approve_many(ids, session['username']),
+                           lambda ids, reason: Transaction.deny_many(ids, session['username']))
+
+@app.route("/applicant_approval/batch", methods=["POST"])
+def applicant_approval_batch():
+    """
+    The '/applicant_approval/batch' route applies a superuser's decision to every application
+    selected on their dashboard at once. Rejecting them requires a reason.
+    """
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    if session['type_of_user'] != 'superuser':
+        return render_template("access_denied.html")
+    return _batch_approval(Applicant.approve_many, Applicant.reject_many, reason_required=True)
+
+@app.route("/delete_acount_approval/batch", methods=["POST"])
+def delete_account_approval_batch():
+    """
+    The '/delete_acount_approval/batch' route applies a superuser's decision to every account
+    deletion request selected on their dashboard at once.
+    """
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    if session['type_of_user'] != 'superuser':
+        return render_template("access_denied.html")
+    return _batch_approval(DeleteRequest.approve_many,
+                           lambda ids, reason: DeleteRequest.deny_many(ids, session['username']))
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    scheduler.start()
+    # threaded, so that open notification streams do not hold up other requests
+    app.run(debug=True, threaded=True)
@@ -0,0 +1,144 @@
+"""
+Runs the deadline checks on the demands (approaching deadlines, expired and
+overdue demands) every few seconds while the site is running.
+
+Usage:
+    python3 scheduler.py [interval in seconds]
+
+routes.py starts the checks in a background thread when it runs the
+development server. When the site is served by several worker processes,
+run this file as a separate process instead. Either way, only one process
+runs the checks at a time: the others wait on a lock file in the database
+folder and take over if that process stops.
+
+The interval defaults to the TURK_SWEEP_INTERVAL environment variable, or to
+60 seconds if it is not set.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import tables
+from models import Demand
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+DEFAULT_INTERVAL = 60
+LOCK_PATH = os.path.join(tables.DATABASE_DIR, '.scheduler.lock')
+
+# (name of check, function), in the order they run
+SWEEPS = [('approaching_bidding_deadlines', Demand.check_approaching_bidding_deadlines),
+          ('approaching_submission_deadlines', Demand.check_approaching_submission_deadlines),
+          ('expired_demands', Demand.check_expired_demands),
+          ('overdue_demands', Demand.check_overdue_demands)]
+
+log = logging.getLogger(__name__)
+
+_metrics_lock = threading.Lock()
+# name of check -> {'runs', 'errors', 'last_seconds', 'total_seconds', 'last_run_at'}
+_metrics = {}
+_thread = None
+
+
+def get_interval():
+    """
+    Returns the number of seconds between runs of the checks.
+    """
+    return float(os.environ.get('TURK_SWEEP_INTERVAL', DEFAULT_INTERVAL))
+
+
+def get_metrics():
+    """
+    Returns a copy of the timing of each check run by this process: how many times it ran,
+    how many of those failed, how long the last run and all runs together took in seconds,
+    and when it last ran.
+    """
+    with _metrics_lock:
+        return dict((name, dict(metric)) for name, metric in _metrics.items())
+
+
+def _record(name, seconds, failed):
+    with _metrics_lock:
+        metric = _metrics.setdefault(name, {'runs': 0, 'errors': 0, 'last_seconds': 0.0,
+                                            'total_seconds': 0.0, 'last_run_at': None})
+        metric['runs'] += 1
+        metric['errors'] += int(failed)
+        metric['last_seconds'] = seconds
+        metric['total_seconds'] += seconds
+        metric['last_run_at'] = time.time()
+
+
+def run_sweeps():
+    """
+    Runs every check once and records how long each one took.
+    A check that fails is logged and does not stop the others.
+    """
+    for name, sweep in SWEEPS:
+        start = time.perf_counter()
+        failed = False
+        try:
+            sweep()
+        except Exception:
+            failed = True
+            log.exception('deadline check %s failed', name)
+        seconds = time.perf_counter() - start
+        _record(name, seconds, failed)
+        log.info('deadline check %s took %.3fs', name, seconds)
+
+
+def _acquire_lock():
+    """
+    Returns the open lock file if this process is now the one running the checks, or None.
+    The lock is held until run() stops or the process exits.
+    """
+    lock_file = open(LOCK_PATH, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+    return lock_file
+
+
+def run(interval=None, stop=None):
+    """
+    Runs the checks every [interval] seconds until the threading.Event [stop] is set.
+    Only runs them while holding the lock file, checking for it once per interval.
+    """
+    if interval is None:
+        interval = get_interval()
+    if stop is None:
+        stop = threading.Event()
+
+    lock_file = None
+    while not stop.is_set():
+        if lock_file is None:
+            lock_file = _acquire_lock()
+        if lock_file is not None:
+            run_sweeps()
+        stop.wait(interval)
+
+    if lock_file is not None:
+        lock_file.close()
+
+
+def start(interval=None):
+    """
+    Starts running the checks in a background thread of this process, unless it is already
+    running. Returns the thread.
+    """
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=run, args=(interval,), name='deadline-checks', daemon=True)
+        _thread.start()
+    return _thread
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else None)
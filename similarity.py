@@ -0,0 +1,144 @@
+"""
+Finds the clients and developers whose projects are most similar to a set
+of tags, for the recommendations on the dashboard.
+
+Every client and developer has a vector with a TF-IDF weight for each tag
+of their projects: tags they use on many projects weigh more, tags that
+many users share weigh less. The vectors are kept as the rows of a sparse
+matrix in compressed sparse row form, so ranking every user is one
+vectorized dot product with the query's vector.
+
+The tag counts are a view of the Demand table (see tables.view), so they
+are kept up to date as demands are posted and changed. The matrix is
+rebuilt from them the next time it is used after a change.
+"""
+import collections
+import threading
+import numpy as np
+import helpers
+import tables
+
+
+class TagVectors:
+    """
+    The tag vectors of the users named in [column] of the Demand table, built from the rows [demands].
+    """
+    def __init__(self, column, demands):
+        self.column = column
+        self._lock = threading.Lock()
+        # username -> Counter of the number of their projects with each tag
+        self._counts = {}
+        self._matrix = None
+        self.add(demands)
+
+    def add(self, demands):
+        """
+        Counts the tags of the new rows [demands].
+        """
+        self._count(demands, 1)
+
+    def update(self, old_demands, new_demands):
+        """
+        Moves the tags of changed rows from [old_demands] to [new_demands].
+        """
+        columns = [self.column, 'tags']
+        old, new = old_demands[columns], new_demands[columns]
+        changed = ~((old == new) | (old.isnull() & new.isnull())).all(axis=1)
+        if changed.any():
+            self._count(old_demands.loc[changed], -1)
+            self._count(new_demands.loc[changed], 1)
+
+    def _count(self, demands, sign):
+        with self._lock:
+            for username, tags in zip(demands[self.column], demands['tags']):
+                if not isinstance(username, str):
+                    continue
+                counts = self._counts.setdefault(username, collections.Counter())
+                for tag in helpers.tokenize_tags(tags):
+                    counts[tag] += sign
+                    if counts[tag] <= 0:
+                        del counts[tag]
+                if not counts:
+                    del self._counts[username]
+            self._matrix = None
+
+    def _build(self):
+        """
+        Returns (usernames, vocabulary, idf, indptr, indices, data) for the current counts.
+        Each row of the matrix is a user's vector, normalized to length 1.
+        Must be called while holding _lock.
+        """
+        usernames = sorted(self._counts)
+        vocabulary = {}
+        indptr, indices, frequencies = [0], [], []
+        for username in usernames:
+            for tag, count in self._counts[username].items():
+                indices.append(vocabulary.setdefault(tag, len(vocabulary)))
+                frequencies.append(count)
+            indptr.append(len(indices))
+
+        indptr = np.array(indptr, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int64)
+        # number of users with each tag
+        document_frequency = np.bincount(indices, minlength=len(vocabulary))
+        idf = np.log((1.0 + len(usernames)) / (1.0 + document_frequency)) + 1.0
+        data = (1.0 + np.log(np.array(frequencies, dtype=float))) * idf[indices]
+
+        if len(data):
+            norms = np.sqrt(np.add.reduceat(data ** 2, indptr[:-1]))
+            data /= np.repeat(norms, np.diff(indptr))
+
+        return np.array(usernames, dtype=object), vocabulary, idf, indptr, indices, data
+
+    def similar(self, tags, count, exclude=()):
+        """
+        Returns the usernames of up to [count] users whose vectors are most similar to [tags],
+        a Counter of the number of projects with each tag, most similar first. Users in
+        [exclude] and users who share no tags with [tags] are left out.
+        """
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = self._build()
+            usernames, vocabulary, idf, indptr, indices, data = self._matrix
+
+        known = [(vocabulary[tag], frequency) for tag, frequency in tags.items() if tag in vocabulary and frequency > 0]
+        if not known or not len(data):
+            return []
+
+        query = np.zeros(len(vocabulary))
+        columns, frequencies = zip(*known)
+        query[list(columns)] = (1.0 + np.log(np.array(frequencies, dtype=float))) * idf[list(columns)]
+
+        # cosine similarity with every user; rows are already normalized
+        scores = np.add.reduceat(data * query[indices], indptr[:-1])
+        if exclude:
+            scores[np.isin(usernames, list(exclude))] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > count:
+            candidates = candidates[np.argpartition(-scores[candidates], count - 1)[:count]]
+        # most similar first, then by username
+        order = np.lexsort((usernames[candidates], -scores[candidates]))
+        return usernames[candidates][order].tolist()
+
+
+def _clients(demands):
+    return TagVectors('client_username', demands)
+
+
+def _developers(demands):
+    return TagVectors('chosen_developer_username', demands)
+
+
+def get_clients():
+    """
+    Returns the tag vectors of the clients, from the demands they posted.
+    """
+    return tables.view('Demand', _clients, TagVectors.add, TagVectors.update)
+
+
+def get_developers():
+    """
+    Returns the tag vectors of the developers, from the demands they were chosen for.
+    """
+    return tables.view('Demand', _developers, TagVectors.add, TagVectors.update)
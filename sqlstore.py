@@ -0,0 +1,399 @@
+"""
+SQLite storage for the tables of the Turk System.
+
+Set the TURK_DATABASE_URL environment variable (for example to
+sqlite:///database/turk.db) to keep the tables in SQLite instead of the CSV
+files. Run migrate.py once to create the database from the CSV files.
+
+Every table has a row_id primary key that holds the row's position, which is
+what the models use as the id of demands and bids. Columns that the models
+search by are indexed.
+"""
+import contextlib
+import json
+import threading
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text, MetaData, Table, Column, Integer, Float, Boolean, Text
+
+metadata = MetaData()
+
+
+def _table(name, *columns):
+    """
+    Defines the table [name] with a row_id primary key followed by [columns].
+    """
+    return Table(name, metadata,
+                 Column('row_id', Integer, primary_key=True, autoincrement=False),
+                 *columns)
+
+
+_table('User',
+       Column('username', Text, index=True),
+       Column('password', Text),
+       Column('first_name', Text),
+       Column('last_name', Text),
+       Column('email', Text, index=True),
+       Column('phone', Integer),
+       Column('credit_card', Float),
+       Column('type_of_user', Text),
+       Column('about', Text),
+       Column('resume', Text),
+       Column('portfolio', Text),
+       Column('interests', Text))
+
+_table('Client',
+       Column('username', Text, index=True),
+       Column('avg_rating', Float),
+       Column('avg_given_rating', Float),
+       Column('num_of_completed_projects', Integer),
+       Column('num_of_warnings', Float),
+       Column('balance', Float))
+
+_table('Developer',
+       Column('username', Text, index=True),
+       Column('avg_rating', Float),
+       Column('avg_given_rating', Float),
+       Column('num_of_completed_projects', Integer),
+       Column('num_of_warnings', Integer),
+       Column('balance', Float),
+       Column('earnings', Float))
+
+_table('Applicant',
+       Column('user_id', Text, index=True),
+       Column('password', Text),
+       Column('first_name', Text),
+       Column('last_name', Text),
+       Column('email', Text, index=True),
+       Column('phone', Integer),
+       Column('credit_card', Float),
+       Column('type_of_user', Text),
+       Column('status', Text, index=True),
+       Column('reason', Text),
+       Column('username', Text, index=True))
+
+_table('Demand',
+       Column('client_username', Text, index=True),
+       Column('date_posted', Text),
+       Column('title', Text),
+       Column('tags', Text),
+       Column('specifications', Text),
+       Column('bidding_deadline', Text),
+       Column('chosen_developer_username', Text, index=True),
+       Column('bid_amount', Float),
+       Column('submission_deadline', Text),
+       Column('is_completed', Boolean),
+       Column('bidding_deadline_approaching_notif_sent', Boolean),
+       Column('is_expired', Boolean),
+       Column('submission_deadline_approaching_notif_sent', Boolean),
+       Column('min_bid', Float),
+       Column('bid_count', Integer),
+       Column('last_bid_at', Text))
+
+_table('Bid',
+       Column('demand_id', Integer, index=True),
+       Column('developer_username', Text, index=True),
+       Column('bid_amount', Float),
+       Column('date_bidded', Text))
+
+_table('Transaction',
+       Column('transaction_id', Integer, index=True),
+       Column('recipient', Text, index=True),
+       Column('sender', Text, index=True),
+       Column('amount', Float),
+       Column('status', Text, index=True),
+       Column('optional_message', Text))
+
+_table('Ledger',
+       Column('entry_id', Integer, index=True),
+       Column('transaction_id', Integer, index=True),
+       Column('account', Text, index=True),
+       Column('amount', Float),
+       Column('posted_at', Text))
+
+_table('Rating',
+       Column('demand_id', Integer, index=True),
+       Column('recipient', Text, index=True),
+       Column('rater', Text),
+       Column('rating', Integer),
+       Column('message', Text))
+
+_table('Notification',
+       Column('message_id', Integer, index=True),
+       Column('recipient', Text, index=True),
+       Column('sender', Text),
+       Column('date_sent', Text),
+       Column('message', Text),
+       Column('read_status', Boolean))
+
+_table('NotificationRead',
+       Column('recipient', Text, index=True),
+       Column('last_read_id', Integer))
+
+_table('Warning',
+       Column('warning_id', Integer, index=True),
+       Column('warned_user', Text, index=True),
+       Column('status', Text, index=True),
+       Column('reason', Text))
+
+_table('BlacklistedUser',
+       Column('user_id', Text, index=True),
+       Column('blacklisted_until', Text))
+
+_table('DeleteRequest',
+       Column('delete_request_id', Integer, index=True),
+       Column('username', Text, index=True),
+       Column('status', Text, index=True))
+
+_table('SuperUser',
+       Column('id', Integer),
+       Column('username', Text, index=True),
+       Column('password', Text),
+       Column('first_name', Text),
+       Column('last_name', Text),
+       Column('email', Text, index=True))
+
+_table('Recommendation',
+       Column('username', Text, index=True),
+       Column('client_rec', Text),
+       Column('dev_rec', Text),
+       Column('generated_at', Text),
+       Column('is_stale', Boolean))
+
+_table('Counter',
+       Column('name', Text, index=True),
+       Column('value', Integer))
+
+# version of every table, bumped on each write so that caches know when to reload
+versions = Table('table_version', metadata,
+                 Column('name', Text, primary_key=True),
+                 Column('version', Integer))
+
+# the changes written to each table that can be described row by row, so that other
+# processes can follow them (see tables.view)
+journal = Table('table_journal', metadata,
+                Column('entry_id', Integer, primary_key=True),
+                Column('name', Text, index=True),
+                Column('previous', Integer),
+                Column('version', Integer),
+                Column('events', Text))
+
+
+def _python(value):
+    """
+    Converts NaN to None and numpy scalars to Python values so they can be bound to a query.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if hasattr(value, 'item'):
+        return _python(value.item())
+    return value
+
+
+class SqliteBackend:
+    """
+    Keeps the tables in a SQLite database.
+    """
+    indexed = True
+    # number of changes kept in the journal of each table
+    journal_size = 1000
+
+    def __init__(self, url):
+        self.engine = create_engine(url)
+        metadata.create_all(self.engine)
+        self._add_missing_columns()
+        # connection of the transaction running in each thread
+        self._local = threading.local()
+
+    def _add_missing_columns(self):
+        """
+        Adds the columns that were added to the tables after the database was created.
+        They start out empty; run backfill.py to fill them in.
+        """
+        inspector = inspect(self.engine)
+        with self.engine.begin() as conn:
+            for table in metadata.sorted_tables:
+                existing = set(column['name'] for column in inspector.get_columns(table.name))
+                for column in table.columns:
+                    if column.name not in existing:
+                        conn.execute(text('ALTER TABLE "{}" ADD COLUMN "{}" {}'.format(
+                            table.name, column.name, column.type.compile(dialect=self.engine.dialect))))
+
+    @contextlib.contextmanager
+    def _connection(self):
+        """
+        Returns the connection of the current transaction, or a new connection outside of one.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+        else:
+            with self.engine.connect() as conn:
+                yield conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Runs the block in one transaction that holds the database's write lock,
+        so writes from other processes cannot interleave with it.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield self._local.conn
+            return
+
+        with self.engine.connect() as conn:
+            trans = conn.begin()
+            conn.execute(text('BEGIN IMMEDIATE'))
+            self._local.conn = conn
+            try:
+                yield conn
+                trans.commit()
+            except:
+                trans.rollback()
+                raise
+            finally:
+                self._local.conn = None
+
+    def _bump(self, conn, name):
+        """
+        Increases the version of the table [name] and returns the new version.
+        """
+        version = self.stamp(name) + 1
+        conn.execute(versions.delete().where(versions.c.name == name))
+        conn.execute(versions.insert(), {'name': name, 'version': version})
+        return version
+
+    def _convert(self, table, frame):
+        """
+        Gives the columns of [frame] the same types they have when read from a CSV file.
+        """
+        frame.index.name = None
+        for column in table.columns:
+            if column.name not in frame:
+                continue
+            values = frame[column.name]
+            if isinstance(column.type, Boolean):
+                values = values.where(values.isnull(), values == 1)
+                frame[column.name] = values.astype(bool) if values.notnull().all() else values
+            elif isinstance(column.type, Float) and values.dtype == object:
+                # a column that is empty in every selected row comes back as None
+                frame[column.name] = values.astype(float)
+            elif values.dtype == object:
+                frame[column.name] = values.where(values.notnull(), np.nan)
+        return frame
+
+    def _select(self, table, where=None):
+        query = table.select()
+        if where is not None:
+            query = query.where(where)
+        with self._connection() as conn:
+            frame = pd.read_sql(query.order_by(table.c.row_id), conn, index_col='row_id')
+        return self._convert(table, frame)
+
+    def stamp(self, name):
+        with self._connection() as conn:
+            row = conn.execute(versions.select().where(versions.c.name == name)).fetchone()
+        return row.version if row is not None else 0
+
+    def load(self, name):
+        return self._select(metadata.tables[name])
+
+    def lookup(self, name, column, value):
+        table = metadata.tables[name]
+        return self._select(table, table.c[column] == _python(value))
+
+    def row(self, name, row_id):
+        table = metadata.tables[name]
+        return self._select(table, table.c.row_id == int(row_id))
+
+    def rows(self, name, row_ids):
+        table = metadata.tables[name]
+        return self._select(table, table.c.row_id.in_([int(row_id) for row_id in row_ids]))
+
+    def save(self, name, df):
+        table = metadata.tables[name]
+        columns = [column.name for column in table.columns if column.name != 'row_id']
+        records = []
+        for position, (index, row) in enumerate(df.iterrows()):
+            record = dict((column, _python(row[column]) if column in row else None) for column in columns)
+            record['row_id'] = position
+            records.append(record)
+
+        with self.transaction() as conn:
+            conn.execute(table.delete())
+            if records:
+                conn.execute(table.insert(), records)
+            return self._bump(conn, name)
+
+    def journal(self, name, previous, stamp, events):
+        """
+        Records that the change [events] took the table [name] from the version [previous] to [stamp],
+        and forgets the oldest changes beyond journal_size. Must be called inside transaction().
+        """
+        with self.transaction() as conn:
+            conn.execute(journal.insert(), {'name': name, 'previous': previous, 'version': stamp,
+                                            'events': json.dumps(events, default=str)})
+            conn.execute(text('DELETE FROM table_journal WHERE name = :name AND entry_id <= '
+                              '(SELECT entry_id FROM table_journal WHERE name = :name '
+                              'ORDER BY entry_id DESC LIMIT 1 OFFSET :size)'),
+                         {'name': name, 'size': self.journal_size})
+
+    def changes(self, name):
+        """
+        Returns the recorded changes to the table [name], oldest first, as (previous version, version, events).
+        """
+        query = journal.select().where(journal.c.name == name).order_by(journal.c.entry_id)
+        with self._connection() as conn:
+            return [(row.previous, row.version, json.loads(row.events)) for row in conn.execute(query)]
+
+    def count(self, name):
+        """
+        Returns the number of rows in the table [name], which is also the position of the next row.
+        """
+        query = text('SELECT COALESCE(MAX(row_id) + 1, 0) FROM "{}"'.format(name))
+        with self._connection() as conn:
+            return conn.execute(query).scalar()
+
+    def columns(self, name):
+        return [column.name for column in metadata.tables[name].columns if column.name != 'row_id']
+
+    def frame(self, name, columns, ids, rows):
+        """
+        Returns [rows] as a DataFrame indexed by [ids], with the types the
+        values get when they are stored in the table [name].
+        """
+        table = metadata.tables[name]
+        frame = pd.DataFrame([[_python(row.get(column)) for column in columns] for row in rows],
+                             index=ids, columns=columns)
+        for column in table.columns:
+            if column.name in frame and isinstance(column.type, (Integer, Float)):
+                frame[column.name] = pd.to_numeric(frame[column.name], errors='coerce')
+        return self._convert(table, frame)
+
+    def insert(self, name, columns, ids, rows):
+        table = metadata.tables[name]
+        records = []
+        for row_id, row in zip(ids, rows):
+            record = dict((column, _python(row.get(column))) for column in columns)
+            record['row_id'] = row_id
+            records.append(record)
+
+        with self.transaction() as conn:
+            conn.execute(table.insert(), records)
+            return self._bump(conn, name)
+
+    def update(self, name, column, value, changes):
+        """
+        Sets the columns in [changes] for the rows whose [column] is equal to [value].
+        If [column] is None, [value] is a list of row positions.
+        """
+        table = metadata.tables[name]
+        if column is None:
+            where = table.c.row_id.in_([int(row_id) for row_id in value])
+        else:
+            where = table.c[column] == _python(value)
+        values = dict((key, _python(new_value)) for key, new_value in changes.items())
+
+        with self.transaction() as conn:
+            conn.execute(table.update().where(where).values(**values))
+            return self._bump(conn, name)
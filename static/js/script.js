@@ -0,0 +1,62 @@
+/*
+ * Live notifications: pages with a #notification-list subscribe to
+ * /dashboard/stream and show new notifications and the number of unread
+ * messages as they arrive, without reloading the page.
+ */
+(function () {
+  var list = document.getElementById('notification-list');
+  if (!list || !window.EventSource) {
+    return;
+  }
+  var unreadCount = document.getElementById('unread-count');
+  var limit = parseInt(list.getAttribute('data-limit'), 10);
+  // messages contain links to pages of the site, such as the rating page of a demand
+  var link = /<a href="(\/(?!\/)[^"<>]*)">([^<]*)<\/a>/g;
+
+  // adds the message to the element as text, with only its links to the site made into links
+  function appendMessage(element, message) {
+    var start = 0;
+    var match;
+    link.lastIndex = 0;
+    while ((match = link.exec(message)) !== null) {
+      element.appendChild(document.createTextNode(message.slice(start, match.index)));
+      var anchor = document.createElement('a');
+      anchor.setAttribute('href', match[1]);
+      anchor.textContent = match[2];
+      element.appendChild(anchor);
+      start = link.lastIndex;
+    }
+    element.appendChild(document.createTextNode(message.slice(start)));
+  }
+
+  function render(notif) {
+    var box = document.createElement('div');
+    box.className = 'notification ' + (notif.read_status ? 'is-light' : 'is-success');
+
+    var content = document.createElement('p');
+    content.className = 'content';
+    appendMessage(content, notif.message);
+    content.appendChild(document.createElement('br'));
+
+    var date = document.createElement('small');
+    date.textContent = notif.date_sent;
+    content.appendChild(date);
+
+    box.appendChild(content);
+    return box;
+  }
+
+  var stream = new EventSource('/dashboard/stream');
+  stream.onmessage = function (message) {
+    var event = JSON.parse(message.data);
+    if (unreadCount) {
+      unreadCount.textContent = event.unread;
+    }
+    if (event.notification) {
+      list.insertBefore(render(event.notification), list.firstChild);
+      while (limit && list.children.length > limit) {
+        list.removeChild(list.lastElementChild);
+      }
+    }
+  };
+})();
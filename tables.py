@@ -0,0 +1,1083 @@
+"""
+Module for reading and writing the tables of the Turk System.
+
+By default each table is stored as database/<name>.csv. Setting the
+TURK_DATABASE_URL environment variable stores them in SQLite instead (see
+sqlstore.py). A parsed copy of every table is kept in memory and is only
+loaded again when the table changes, so the models can read a table many
+times per request without paying the parse cost each time.
+
+Changes can be grouped in a session (see begin() and session()). Inside a
+session every change is recorded instead of written, reads see the recorded
+changes, and each table is written once when the session is committed. A
+session that computes its changes from what it reads calls lock() first, so
+that no other thread or process can change the tables in between.
+
+Every change that can be described row by row is also recorded in a
+journal kept next to the table, so that a process can bring the structures
+it computed from a table (see view()) up to date with the changes other
+processes made, instead of computing them again.
+
+The backend's write lock is always taken before _lock, never the other way
+around.
+"""
+import collections
+import contextlib
+import csv
+import io
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+DATABASE_DIR = 'database'
+
+
+class CsvBackend:
+    """
+    Keeps each table in a CSV file.
+    """
+    indexed = False
+    # the journal of a table is cut down to its later half once it grows past this many bytes
+    journal_bytes = 1 << 20
+
+    def __init__(self, directory=DATABASE_DIR):
+        self.directory = directory
+        # the lock file and the number of nested transactions of each thread
+        self._local = threading.local()
+        # fcntl.flock only keeps other processes out where it is available
+        self._mutex = threading.Lock()
+
+    def path(self, name):
+        """
+        Returns the path of the CSV file that stores the table [name].
+        """
+        return os.path.join(self.directory, name + '.csv')
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Holds an exclusive lock on the database folder for the block, so that
+        writes from other threads and processes serving the site do not
+        interleave with it. Nested blocks in the same thread share the lock.
+        """
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0:
+            self._mutex.acquire()
+            try:
+                self._local.lock_file = open(os.path.join(self.directory, '.lock'), 'a')
+                if fcntl is not None:
+                    fcntl.flock(self._local.lock_file, fcntl.LOCK_EX)
+            except:
+                self._mutex.release()
+                raise
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                self._local.lock_file.close()
+                self._local.lock_file = None
+                self._mutex.release()
+
+    def stamp(self, name):
+        """
+        Returns the modification time and size of the table's file.
+        The table is loaded again whenever this value changes.
+        """
+        stat = os.stat(self.path(name))
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self, name):
+        return pd.read_csv(self.path(name))
+
+    def save(self, name, df):
+        df.to_csv(self.path(name), index=False)
+
+    def _lines(self, columns, rows):
+        lines = io.StringIO()
+        writer = csv.writer(lines, lineterminator='\n')
+        for row in rows:
+            writer.writerow([_format(row.get(column)) for column in columns])
+        return lines.getvalue()
+
+    def frame(self, name, columns, ids, rows):
+        """
+        Returns [rows] as a DataFrame indexed by [ids].
+        Only the new rows are parsed, so each value gets the type of its own text;
+        tables._frame() gives them the types of the rest of the table.
+        """
+        new_rows = pd.read_csv(io.StringIO(self._lines(columns, rows)), header=None, names=columns)
+        new_rows.index = ids
+        return new_rows
+
+    def journal_path(self, name):
+        return os.path.join(self.directory, '.' + name + '.journal')
+
+    def journal(self, name, previous, stamp, events):
+        """
+        Records that the change [events] took the table [name] from the stamp [previous] to [stamp].
+        Must be called inside transaction().
+        """
+        path = self.journal_path(name)
+        if os.path.exists(path) and os.path.getsize(path) > self.journal_bytes:
+            with open(path) as f:
+                lines = f.readlines()
+            with open(path, 'w') as f:
+                f.writelines(lines[len(lines) // 2:])
+
+        with open(path, 'a') as f:
+            f.write(json.dumps({'previous': previous, 'stamp': stamp, 'events': events}, default=str) + '\n')
+
+    def changes(self, name):
+        """
+        Returns the recorded changes to the table [name], oldest first, as (previous stamp, stamp, events).
+        """
+        changes = []
+        try:
+            with open(self.journal_path(name)) as f:
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                    except ValueError:  # cut short by a crash
+                        continue
+                    changes.append((tuple(change['previous']), tuple(change['stamp']), change['events']))
+        except FileNotFoundError:
+            pass
+        return changes
+
+    def insert(self, name, columns, ids, rows):
+        with open(self.path(name), 'ab+') as f:
+            # make sure the new rows do not end up on the same line as the last row
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            f.write(self._lines(columns, rows).encode('utf-8'))
+        return self.stamp(name)
+
+
+def _format(value):
+    """
+    Returns [value] the way DataFrame.to_csv writes it.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return str(value)
+
+
+def _create_backend():
+    url = os.environ.get('TURK_DATABASE_URL')
+    if url:
+        from sqlstore import SqliteBackend
+        return SqliteBackend(url)
+    return CsvBackend()
+
+
+backend = _create_backend()
+
+
+def _index(values, positions):
+    """
+    Returns a dictionary from each value in [values] to the list of [positions] that hold it.
+    """
+    index = {}
+    for position, value in zip(positions, values.tolist()):
+        if value == value:  # skip NaN, which never equals anything
+            index.setdefault(value, []).append(position)
+    return index
+
+
+class _Entry:
+    """
+    A loaded table along with the stamp of the table it was loaded from.
+    Rows appended by this process are kept in [tail] until the next read,
+    so a burst of appends does not copy the whole table after each row.
+
+    [indexes] maps a column to a hash index from each value in the column to
+    the positions of the rows that hold it. An index is built the first time
+    the column is looked up and is kept up to date as rows are appended and
+    deleted, so a lookup does not scan the table.
+    """
+    def __init__(self, stamp, frame):
+        self.stamp = stamp
+        self.frame = frame
+        self.tail = []
+        self.indexes = {}
+
+    def __len__(self):
+        return len(self.frame) + sum(len(rows) for rows in self.tail)
+
+    def index(self, column):
+        """
+        Returns the hash index of [column]. The tail must have been merged into the frame.
+        """
+        if column not in self.indexes:
+            self.indexes[column] = _index(self.frame[column], self.frame.index)
+        return self.indexes[column]
+
+    def add(self, new_rows):
+        """
+        Adds [new_rows], which were appended to the stored table, to the tail and the indexes.
+        """
+        self.tail.append(new_rows)
+        for column, index in self.indexes.items():
+            for value, positions in _index(new_rows[column], new_rows.index).items():
+                index.setdefault(value, []).extend(positions)
+
+    def drop(self, rows, stamp):
+        """
+        Returns the entry for the table without the rows at the positions [rows].
+        The remaining rows move up, and the indexes are renumbered to match.
+        """
+        kept = self.frame.index.difference(rows)
+        entry = _Entry(stamp, self.frame.loc[kept].reset_index(drop=True))
+
+        moved = dict(zip(kept, range(len(kept))))
+        for column, index in self.indexes.items():
+            renumbered = {}
+            for value, positions in index.items():
+                positions = [moved[position] for position in positions if position in moved]
+                if positions:
+                    renumbered[value] = positions
+            entry.indexes[column] = renumbered
+        return entry
+
+
+class _Views:
+    """
+    The structures that view() computed from one table, along with the stamp
+    of the table they describe. Each structure is kept with the functions
+    that update it in place when rows are appended ([add]) or changed
+    ([update]). A structure without the function a change needs is dropped
+    and built again the next time it is used.
+    """
+    def __init__(self, stamp):
+        self.stamp = stamp
+        # build function -> (structure, add function, update function)
+        self.structures = {}
+
+    def apply(self, events):
+        """
+        Updates the structures with [events], a list of ('add', new_rows) and
+        ('update', old_rows, new_rows) in the order the changes were made.
+        """
+        for event in events:
+            for build, (structure, add, update) in list(self.structures.items()):
+                if event[0] == 'add' and add is not None:
+                    add(structure, event[1])
+                elif event[0] == 'update' and update is not None:
+                    if not event[1].empty:
+                        update(structure, event[1], event[2])
+                else:
+                    del self.structures[build]
+
+
+# name of table -> _Entry
+_cache = {}
+# name of table -> _Views
+_views = {}
+_lock = threading.RLock()
+
+
+def _current_views(name):
+    """
+    Returns the views of the table [name] brought up to date with the changes made to the table
+    since they were computed, or None if there are none or some change is not in the journal.
+    Must be called inside backend.transaction() and while holding _lock.
+    """
+    views = _views.get(name)
+    if views is None:
+        return None
+
+    stamp = backend.stamp(name)
+    if views.stamp != stamp:
+        events = _changes(name, views.stamp, stamp)
+        if events is None:
+            del _views[name]
+            return None
+        views.apply(events)
+        views.stamp = stamp
+    return views
+
+
+def _changes(name, since, stamp):
+    """
+    Returns the events that took the table [name] from the stamp [since] to [stamp],
+    or None if the journal does not have all of them.
+    """
+    following = {}
+    for previous, after, events in backend.changes(name):
+        following[previous] = (after, events)
+
+    changes = []
+    while since != stamp:
+        if since not in following:
+            return None
+        since, events = following.pop(since)
+        changes.extend(_load_events(events))
+    return changes
+
+
+def _dump_rows(frame):
+    values = frame.astype(object).where(frame.notnull(), None)
+    return {'index': [int(position) for position in frame.index],
+            'columns': frame.columns.tolist(),
+            'data': values.values.tolist()}
+
+
+def _load_rows(rows):
+    frame = pd.DataFrame(rows['data'], index=rows['index'], columns=rows['columns'])
+    return frame.where(frame.notnull(), np.nan).infer_objects()
+
+
+def _dump_events(events):
+    return [[event[0]] + [_dump_rows(rows) for rows in event[1:]] for event in events]
+
+
+def _load_events(events):
+    return [tuple([event[0]] + [_load_rows(rows) for rows in event[1:]]) for event in events]
+
+
+def _notify(name, views, previous, events):
+    """
+    Records the [events] of a change that took the table [name] from the stamp [previous]
+    in the journal, and brings [views], which described the table before the change, up to
+    date with them. If [events] is None, the change could not be described that way and
+    the views are dropped. Must be called inside backend.transaction().
+    """
+    stamp = backend.stamp(name)
+    if events is not None and stamp != previous:
+        backend.journal(name, previous, stamp, _dump_events(events))
+
+    if views is None:
+        return
+    if events is None:
+        _views.pop(name, None)
+        return
+
+    views.apply(events)
+    views.stamp = stamp
+
+
+def _entry(name):
+    """
+    Returns the cache entry for the table [name], loading the table if it changed.
+    """
+    stamp = backend.stamp(name)
+    entry = _cache.get(name)
+
+    if entry is None or entry.stamp != stamp:
+        entry = _Entry(stamp, backend.load(name))
+        _cache[name] = entry
+
+    return entry
+
+
+def _loaded(name):
+    """
+    Returns the cache entry for the table [name] with the appended rows merged into its frame.
+    Must be called while holding _lock.
+    """
+    entry = _entry(name)
+
+    if entry.tail:
+        entry.frame = pd.concat([entry.frame] + entry.tail, ignore_index=True)
+        entry.tail = []
+
+    return entry
+
+
+def _read(name):
+    """
+    Returns the table [name] as it is stored, ignoring the current session.
+    """
+    with _lock:
+        return _loaded(name).frame
+
+
+def _count(name):
+    """
+    Returns the number of rows stored in the table [name].
+    """
+    if backend.indexed:
+        return backend.count(name)
+    return len(_entry(name))
+
+
+def _columns(name):
+    if backend.indexed:
+        return backend.columns(name)
+    return _entry(name).frame.columns.tolist()
+
+
+def _check_columns(name, columns, given):
+    """
+    Raises ValueError if any column in [given] is not one of the table's [columns].
+    """
+    unknown = set(given) - set(columns)
+    if unknown:
+        raise ValueError('Unknown columns for the {} table: {}'.format(name, ', '.join(sorted(unknown))))
+
+
+def _select(frame, column, value):
+    """
+    Returns the index of the rows of [frame] whose [column] is equal to [value].
+    If [column] is None, [value] is a list of row positions.
+    """
+    if column is None:
+        return frame.index[frame.index.isin(value)]
+    return frame.index[frame[column] == value]
+
+
+def _apply(frame, op):
+    """
+    Returns [frame] with the change [op] applied. Updates are applied in place.
+    """
+    kind = op[0]
+    if kind == 'write':
+        return op[1]
+    if kind == 'append':
+        return pd.concat([frame, op[3]], ignore_index=True)
+    if kind == 'delete':
+        return frame.drop(_select(frame, op[1], op[2])).reset_index(drop=True)
+
+    column, value, changes = op[1], op[2], op[3]
+    rows = _select(frame, column, value)
+    for key, new_value in changes.items():
+        frame.loc[rows, key] = new_value
+    return frame
+
+
+def _cast(frame, new_rows):
+    """
+    Returns [new_rows] with the types of the columns of [frame] where their values allow it.
+    Rows parsed on their own get the type of their own values, so a user id made of digits
+    would otherwise be a number in a column of strings and never match a lookup.
+    Columns of [frame] that are empty tell nothing about their type and are left alone.
+    """
+    new_rows = new_rows.copy()
+    for column in new_rows.columns:
+        if column not in frame or frame[column].isnull().all():
+            continue
+        dtype = frame[column].dtype
+        values = new_rows[column]
+        if values.dtype == dtype:
+            continue
+        if dtype.kind == 'O':
+            new_rows[column] = values.astype(object).where(values.isnull(), values.astype(str))
+        elif dtype.kind == 'f' or values.notnull().all():
+            try:
+                cast = values.astype(dtype)
+            except (TypeError, ValueError):
+                continue
+            # only if no value changes, such as 2.5 in a column of ints
+            if ((cast == values) | values.isnull()).all():
+                new_rows[column] = cast
+    return new_rows
+
+
+def _frame(name, columns, ids, rows):
+    """
+    Returns the new [rows] of the table [name] as a DataFrame indexed by [ids], with the
+    types of the columns of the stored table.
+    """
+    new_rows = backend.frame(name, columns, ids, rows)
+    if backend.indexed:
+        return new_rows
+    return _cast(_entry(name).frame, new_rows)
+
+
+def _with_ids(rows, ids, id_column):
+    if id_column is None:
+        return rows
+    return [dict(row, **{id_column: row_id}) for row_id, row in zip(ids, rows)]
+
+
+def _insert(name, rows, id_column):
+    """
+    Writes [rows] to the end of the table [name]. Returns their positions and
+    the new rows as a DataFrame. Must be called inside backend.transaction().
+    """
+    columns = _columns(name)
+    start = _count(name)
+    ids = list(range(start, start + len(rows)))
+    rows = _with_ids(rows, ids, id_column)
+
+    entry = _cache.get(name)
+    current = entry is not None and entry.stamp == backend.stamp(name) and len(entry) == start
+    new_rows = _frame(name, columns, ids, rows)
+    stamp = backend.insert(name, columns, ids, rows)
+
+    # keep the cached table in sync instead of loading the whole table again
+    if current:
+        entry.add(new_rows)
+        entry.stamp = stamp
+    else:
+        _cache.pop(name, None)
+
+    return ids, new_rows
+
+
+def _batches(ops):
+    """
+    Groups [ops] so that consecutive appends with the same id column are written together.
+    """
+    batches = []
+    for op in ops:
+        if op[0] == 'append' and batches and batches[-1][0] == 'append' and batches[-1][2] == op[2]:
+            batches[-1][1].extend(op[1])
+        elif op[0] == 'append':
+            batches.append(('append', list(op[1]), op[2]))
+        else:
+            batches.append(op)
+    return batches
+
+
+def _commit(name, pending):
+    """
+    Writes the changes recorded in [pending] to the table [name].
+    Must be called inside backend.transaction().
+    """
+    views = _current_views(name)
+    previous = backend.stamp(name)
+    ops = _batches(pending.ops)
+
+    if all(op[0] == 'append' for op in ops):
+        events = []
+        for op in ops:
+            ids, new_rows = _insert(name, op[1], op[2])
+            events.append(('add', new_rows))
+        _notify(name, views, previous, events)
+        return
+
+    if not backend.indexed and all(op[0] == 'delete' for op in ops):
+        # drop the rows from the cached table and its indexes instead of loading the table again
+        entry = _loaded(name)
+        rows = entry.frame.index[:0]
+        for op in ops:
+            rows = rows.union(_select(entry.frame, op[1], op[2]))
+        entry = entry.drop(rows, None)
+        backend.save(name, entry.frame)
+        entry.stamp = backend.stamp(name)
+        _cache[name] = entry
+        _notify(name, views, previous, None)
+        return
+
+    # the appended and changed rows, for the journal and the views
+    events = [] if not pending.replaced else None
+
+    if backend.indexed:
+        for op in ops:
+            if op[0] == 'write':
+                backend.save(name, op[1])
+                events = None
+            elif op[0] == 'append':
+                ids, new_rows = _insert(name, op[1], op[2])
+                if events is not None:
+                    events.append(('add', new_rows))
+            elif op[0] == 'delete':
+                backend.save(name, _apply(backend.load(name), op))
+                events = None
+            else:
+                if events is not None:
+                    if op[1] is None:
+                        old_rows = backend.rows(name, op[2])
+                    else:
+                        old_rows = backend.lookup(name, op[1], op[2])
+                    events.append(('update', old_rows, _apply(old_rows.copy(), op)))
+                backend.update(name, op[1], op[2], op[3])
+    else:
+        frame = pending.frame
+        if frame is None or events is not None or not (pending.replaced or pending.stamp == _entry(name).stamp):
+            # apply the changes to the stored table, which may have changed since the session read it
+            frame = _read(name).copy()
+            for op in pending.ops:
+                if events is not None:
+                    events = _event(frame, op, events)
+                frame = _apply(frame, op)
+        backend.save(name, frame)
+
+    _notify(name, views, previous, events)
+    _cache.pop(name, None)
+
+
+def _event(frame, op, events):
+    """
+    Adds the change that [op] makes to [frame] to [events] and returns them,
+    or returns None if the change cannot be described as an event.
+    """
+    if op[0] == 'append':
+        new_rows = op[3].copy()
+        new_rows.index = range(len(frame), len(frame) + len(new_rows))
+        events.append(('add', new_rows))
+    elif op[0] == 'update':
+        old_rows = frame.loc[_select(frame, op[1], op[2])].copy()
+        events.append(('update', old_rows, _apply(old_rows.copy(), op)))
+    else:
+        return None
+    return events
+
+
+class _Pending:
+    """
+    Changes to one table that were recorded in a session but not written yet.
+    [frame] is the table with the changes applied. It is only built once the
+    session reads the whole table, so a session that only appends rows or
+    looks up a few of them never copies the table.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.ops = []
+        self.frame = None
+        self.stamp = None
+        self.replaced = False
+        self.count = None
+
+    def __len__(self):
+        if self.frame is not None:
+            return len(self.frame)
+        if self.count is None:
+            self.count = _count(self.name)
+        return self.count + sum(len(op[3]) for op in self.ops if op[0] == 'append')
+
+    def columns(self):
+        if self.frame is not None:
+            return self.frame.columns.tolist()
+        return _columns(self.name)
+
+    def load(self):
+        """
+        Returns the table with the recorded changes applied, building it if needed.
+        """
+        if self.frame is None:
+            with _lock:
+                self.stamp = backend.stamp(self.name)
+                frame = _read(self.name).copy()
+            for op in self.ops:
+                frame = _apply(frame, op)
+            self.frame = frame
+        return self.frame
+
+    def reset(self):
+        """
+        Forgets what was read from the stored table, so it is read again when needed.
+        """
+        self.frame = None
+        self.stamp = None
+        self.count = None
+
+    def truncate(self, size):
+        """
+        Throws away the changes recorded after the first [size].
+        """
+        del self.ops[size:]
+        self.replaced = any(op[0] == 'write' for op in self.ops)
+        self.reset()
+
+    def record(self, op):
+        self.ops.append(op)
+        if op[0] == 'write':
+            self.frame = op[1]
+            self.replaced = True
+        elif self.frame is not None:
+            self.frame = _apply(self.frame, op)
+
+    def overlay(self, rows, column, value):
+        """
+        Returns the stored rows [rows] of the table whose [column] is equal to
+        [value] with the recorded changes applied, without building the table.
+        Returns None if the changes could affect rows that are not in [rows].
+        """
+        if self.frame is not None:
+            return None
+
+        rows = rows.copy()
+        for op in self.ops:
+            if op[0] in ('write', 'delete') or (op[0] == 'update' and column in op[3]):
+                return None
+            if op[0] == 'append':
+                new_rows = op[3]
+                new_rows = new_rows.loc[_select(new_rows, column, value)]
+                rows = pd.concat([rows, new_rows])
+            else:
+                _apply(rows, op)
+        return rows
+
+
+class _Session:
+    def __init__(self):
+        self.depth = 0
+        # name of table -> _Pending, in the order the tables were first changed
+        self.tables = collections.OrderedDict()
+        # functions to call once the changes are written
+        self.callbacks = []
+        # for each nested begin(), the number of changes recorded for each table
+        # and the number of callbacks, so that rollback() can go back to them
+        self.savepoints = []
+        # the backend's write lock once lock() is called, held until the session ends
+        self.locks = None
+
+    def pending(self, name):
+        if name not in self.tables:
+            self.tables[name] = _Pending(name)
+        return self.tables[name]
+
+    def savepoint(self):
+        sizes = dict((name, len(pending.ops)) for name, pending in self.tables.items())
+        self.savepoints.append((sizes, len(self.callbacks)))
+
+    def restore(self):
+        """
+        Throws away the changes and callbacks recorded since the last savepoint.
+        """
+        sizes, callbacks = self.savepoints.pop()
+        for name, pending in list(self.tables.items()):
+            if name not in sizes:
+                del self.tables[name]
+            elif len(pending.ops) > sizes[name]:
+                pending.truncate(sizes[name])
+        del self.callbacks[callbacks:]
+
+    def unlock(self):
+        if self.locks is not None:
+            locks, self.locks = self.locks, None
+            locks.close()
+
+
+_local = threading.local()
+
+
+def _session():
+    return getattr(_local, 'session', None)
+
+
+def _pending(name):
+    """
+    Returns the changes to [name] recorded in the current session, if any.
+    """
+    session = _session()
+    if session is not None:
+        return session.tables.get(name)
+
+
+def begin():
+    """
+    Starts a session in the current thread, or joins the one that is already running.
+    Every begin() must be matched by a commit() or a rollback().
+    """
+    session = _session()
+    if session is None:
+        session = _local.session = _Session()
+    session.savepoint()
+    session.depth += 1
+
+
+def lock():
+    """
+    Holds the backend's write lock from now until the current session ends,
+    so that the tables the session reads after this call cannot be changed
+    by other threads or processes before the session's changes are written.
+    Does nothing outside of a session.
+    """
+    session = _session()
+    if session is None or session.locks is not None:
+        return
+
+    locks = contextlib.ExitStack()
+    locks.enter_context(backend.transaction())
+    session.locks = locks
+
+    # what the session read so far may have changed since
+    for pending in session.tables.values():
+        pending.reset()
+
+
+def commit():
+    """
+    Ends the current session. When the outermost session ends, every changed
+    table is written once, all of them while holding the backend's write lock.
+    """
+    session = _session()
+    if session is None:
+        return
+
+    session.depth -= 1
+    session.savepoints.pop()
+    if session.depth > 0:
+        return
+
+    _local.session = None
+    try:
+        if session.tables:
+            with backend.transaction(), _lock:
+                for name, pending in session.tables.items():
+                    _commit(name, pending)
+    finally:
+        session.unlock()
+
+    for callback in session.callbacks:
+        callback()
+
+
+def after_commit(callback):
+    """
+    Calls callback() once the current session's changes are written, or right away
+    outside of a session. It is not called if the session is rolled back.
+    """
+    session = _session()
+    if session is None:
+        callback()
+    else:
+        session.callbacks.append(callback)
+
+
+def rollback():
+    """
+    Ends the current session and throws away every change recorded since it
+    began, along with the callbacks waiting for them to commit. The changes
+    of the sessions it is nested in are kept.
+    """
+    session = _session()
+    if session is None:
+        return
+
+    session.depth -= 1
+    session.restore()
+    if session.depth > 0:
+        return
+
+    _local.session = None
+    session.unlock()
+
+
+@contextlib.contextmanager
+def session(locked=False):
+    """
+    Runs the block in a session, committing it when the block finishes and
+    rolling it back if the block raises. If [locked] is true, the session
+    holds the backend's write lock from the start (see lock()).
+    """
+    begin()
+    try:
+        if locked:
+            lock()
+        yield
+    except:
+        rollback()
+        raise
+    commit()
+
+
+def read(name):
+    """
+    Returns the table [name] as a DataFrame.
+    The DataFrame is shared by every caller, so it must not be modified in place.
+    Use read(name).copy() to get a DataFrame that can be changed and written back.
+    """
+    pending = _pending(name)
+    if pending is not None:
+        return pending.load()
+    return _read(name)
+
+
+def lookup(name, column, value):
+    """
+    Returns the rows of the table [name] whose [column] is equal to [value].
+    The index of the returned DataFrame holds the positions of the rows in the table.
+    """
+    pending = _pending(name)
+
+    if backend.indexed:
+        rows = backend.lookup(name, column, value)
+        if pending is None:
+            return rows
+        rows = pending.overlay(rows, column, value)
+        if rows is not None:
+            return rows
+
+    if pending is not None:
+        df = pending.load()
+        return df.loc[df[column] == value]
+
+    with _lock:
+        entry = _loaded(name)
+        return entry.frame.loc[entry.index(column).get(value, [])]
+
+
+def row(name, row_id):
+    """
+    Returns the row at position [row_id] of the table [name] as a Series.
+    Raises KeyError if there is no such row.
+    """
+    pending = _pending(name)
+
+    if backend.indexed:
+        rows = backend.row(name, row_id)
+        if pending is not None:
+            rows = pending.overlay(rows, None, [int(row_id)])
+        if rows is not None:
+            if rows.empty:
+                raise KeyError(row_id)
+            return rows.iloc[0]
+
+    return read(name).loc[int(row_id)]
+
+
+def view(name, build, add=None, update=None):
+    """
+    Returns the structure that build(frame) computes from the table [name],
+    such as an index or a summary of the table.
+
+    The structure is cached and is only computed again after the table
+    changes in a way it cannot follow, including changes made by other
+    processes, which are read from the table's journal. If [add] is given,
+    add(structure, new_rows) updates the structure in place when rows are
+    appended. If [update] is given, update(structure, old_rows, new_rows)
+    updates it in place when rows are changed, where [old_rows] and
+    [new_rows] are the changed rows before and after the change. The
+    structure is shared, so callers must not modify it.
+    """
+    pending = _pending(name)
+    if pending is not None:
+        return build(pending.load())
+
+    with _lock:
+        views = _views.get(name)
+        if views is not None and build in views.structures and views.stamp == backend.stamp(name):
+            return views.structures[build][0]
+
+    # the write lock keeps the table from changing while the views catch up or the structure is built
+    with backend.transaction(), _lock:
+        views = _current_views(name)
+        if views is None:
+            views = _views[name] = _Views(backend.stamp(name))
+        if build not in views.structures:
+            views.structures[build] = (build(_read(name)), add, update)
+        return views.structures[build][0]
+
+
+def rows(name, row_ids):
+    """
+    Returns the rows at the positions [row_ids] of the table [name], in the same order.
+    Raises KeyError if any of the rows does not exist.
+    """
+    row_ids = [int(row_id) for row_id in row_ids]
+    pending = _pending(name)
+
+    if backend.indexed:
+        found = backend.rows(name, row_ids)
+        if pending is not None:
+            found = pending.overlay(found, None, row_ids)
+        if found is not None:
+            return found.loc[row_ids]
+
+    return read(name).loc[row_ids]
+
+
+def write(name, df):
+    """
+    Replaces the contents of the table [name] with [df].
+    """
+    with session():
+        _session().pending(name).record(('write', df))
+
+
+def append(name, rows, id_column=None):
+    """
+    Adds [rows] to the end of the table [name] without rewriting the table.
+    Each row is a dictionary from column name to value. Columns that are left out are empty.
+
+    If [id_column] is given, each new row gets the number of rows before it as its id,
+    the same way message_id and transaction_id have always been assigned.
+    Returns the list of row indexes of the new rows. Inside a session, the
+    session takes the write lock (see lock()) so the rows keep these indexes.
+    """
+    if not rows:
+        return []
+
+    given = set([id_column]) if id_column is not None else set()
+    for new_row in rows:
+        given |= set(new_row)
+
+    if _session() is None:
+        with backend.transaction(), _lock:
+            _check_columns(name, _columns(name), given)
+            views = _current_views(name)
+            previous = backend.stamp(name)
+            ids, new_rows = _insert(name, rows, id_column)
+            _notify(name, views, previous, [('add', new_rows)])
+            return ids
+
+    lock()
+    pending = _session().pending(name)
+    columns = pending.columns()
+    _check_columns(name, columns, given)
+
+    start = len(pending)
+    ids = list(range(start, start + len(rows)))
+    new_rows = _frame(name, columns, ids, _with_ids(rows, ids, id_column))
+    pending.record(('append', rows, id_column, new_rows))
+    return ids
+
+
+def update(name, column, value, changes):
+    """
+    Sets the columns in [changes] for every row of the table [name] whose
+    [column] is equal to [value]. [changes] maps column names to new values.
+    """
+    _update(name, column, value, changes)
+
+
+def update_rows(name, row_ids, changes):
+    """
+    Sets the columns in [changes] for the rows at the positions [row_ids] of the table [name].
+    """
+    _update(name, None, [int(row_id) for row_id in row_ids], changes)
+
+
+def _update(name, column, value, changes):
+    with session():
+        pending = _session().pending(name)
+        _check_columns(name, pending.columns(), changes)
+
+        # the CSV backend rewrites the whole table anyway, so apply the change to a copy now
+        if not backend.indexed:
+            if _select(pending.load(), column, value).empty:
+                return
+        pending.record(('update', column, value, changes))
+
+
+def delete(name, column, value):
+    """
+    Removes every row of the table [name] whose [column] is equal to [value].
+    The rows after them move up, so their positions change.
+    """
+    _delete(name, column, value)
+
+
+def delete_rows(name, row_ids):
+    """
+    Removes the rows at the positions [row_ids] of the table [name].
+    The rows after them move up, so their positions change.
+    """
+    _delete(name, None, [int(row_id) for row_id in row_ids])
+
+
+def _delete(name, column, value):
+    with session():
+        pending = _session().pending(name)
+        if column is not None:
+            _check_columns(name, pending.columns(), [column])
+
+        if _select(pending.load(), column, value).empty:
+            return
+        pending.record(('delete', column, value))
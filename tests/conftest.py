@@ -0,0 +1,66 @@
+import os
+import shutil
+import sys
+import threading
+import time
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import tables
+
+
+@pytest.fixture
+def database(tmpdir, monkeypatch):
+    """
+    Runs the test on a copy of the bundled CSV tables, so it can change them freely.
+    Returns the folder that holds the copy.
+    """
+    shutil.copytree(os.path.join(ROOT, tables.DATABASE_DIR), str(tmpdir.join(tables.DATABASE_DIR)))
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setattr(tables, 'backend', tables.CsvBackend())
+    monkeypatch.setattr(tables, '_cache', {})
+    monkeypatch.setattr(tables, '_views', {})
+    return str(tmpdir)
+
+
+def run_together(calls):
+    """
+    Runs each (function, args) of [calls] in its own thread and waits for all of them.
+    """
+    threads = [threading.Thread(target=function, args=args) for function, args in calls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def slow_down(monkeypatch, name, seconds=0.2):
+    """
+    Makes tables.<name> wait after reading, so that other threads read the same rows
+    before the caller writes its changes.
+    """
+    function = getattr(tables, name)
+
+    def slow(*args, **kwargs):
+        found = function(*args, **kwargs)
+        time.sleep(seconds)
+        return found
+
+    monkeypatch.setattr(tables, name, slow)
+
+
+@pytest.fixture
+def sqlite_database(database, monkeypatch):
+    """
+    Runs the test on a SQLite database migrated from the copy of the CSV tables.
+    Returns the url of the database.
+    """
+    import migrate
+    from sqlstore import SqliteBackend
+
+    url = 'sqlite:///' + os.path.join(database, tables.DATABASE_DIR, 'turk.db')
+    migrate.migrate(url)
+    monkeypatch.setattr(tables, 'backend', SqliteBackend(url))
+    return url
@@ -0,0 +1,71 @@
+import tables
+from conftest import run_together, slow_down
+from models import Applicant, Counter, DeleteRequest, Transaction
+
+
+def _decide_twice(decide):
+    results = []
+    run_together([(lambda: results.append(decide()), ())] * 2)
+    return sorted(results)
+
+
+def test_concurrent_approvals_of_an_applicant_create_one_user(database, monkeypatch):
+    users = len(tables.read('User'))
+    counted = Counter.get('users')
+    slow_down(monkeypatch, 'read')
+
+    results = _decide_twice(lambda: Applicant.approve_many(['jennylee']))
+
+    assert results == [[], ['jennylee']]
+    assert len(tables.read('User')) == users + 1
+    assert Counter.get('users') == counted + 1
+
+
+def test_approving_applicants_skips_decided_and_unknown_ids(database):
+    users = len(tables.read('User'))
+
+    assert Applicant.approve_many(['jennylee', 'samjohnson', 'marysmith', 'nobody']) == ['jennylee']
+
+    applicants = tables.read('Applicant').set_index('user_id')['status']
+    assert applicants['jennylee'] == 'approved'
+    assert applicants['marysmith'] == 'rejected'
+    assert len(tables.read('User')) == users + 1
+
+
+def test_rejecting_decided_applicants_changes_nothing(database):
+    assert Applicant.reject_many(['samjohnson', 'marysmith'], 'too late') == []
+
+    applicants = tables.read('Applicant').set_index('user_id')
+    assert applicants.at['samjohnson', 'status'] == 'approved'
+    assert applicants.at['marysmith', 'status'] == 'rejected'
+
+
+def test_concurrent_approvals_of_a_delete_request_delete_one_account(database, monkeypatch):
+    users = tables.read('User')['username'].tolist()
+    counted = Counter.get('users')
+    slow_down(monkeypatch, 'read')
+
+    results = _decide_twice(lambda: DeleteRequest.approve_many([0]))
+
+    assert results == [[], [0]]
+    assert tables.read('User')['username'].tolist() == [username for username in users if username != 'testuser4']
+    assert Counter.get('users') == counted - 1
+
+
+def test_delete_requests_with_mixed_ids(database):
+    assert DeleteRequest.deny_many([1, 7], 'superuser0') == [1]
+    assert DeleteRequest.approve_many([0, 1]) == [0]
+
+    statuses = tables.read('DeleteRequest').set_index('delete_request_id')['status']
+    assert statuses.tolist() == ['approved', 'denied']
+    assert tables.lookup('User', 'username', 'testuser5')['username'].tolist() == ['testuser5']
+
+
+def test_transactions_with_mixed_ids(database):
+    assert Transaction.approve_many([12, 13, 999], 'superuser0') == [12]
+    assert Transaction.deny_many([12, 17], 'superuser0') == [17]
+
+    statuses = tables.read('Transaction').set_index('transaction_id')['status']
+    assert statuses[12] == 'approved'
+    assert statuses[13] == 'approved'
+    assert statuses[17] == 'denied'
@@ -0,0 +1,28 @@
+import threading
+import time
+import tables
+from models import Bid
+
+
+def test_concurrent_bids_on_one_demand(database, monkeypatch):
+    row = tables.row
+
+    def slow_row(name, row_id):
+        # give the other bid time to read the demand before this one is written
+        found = row(name, row_id)
+        time.sleep(0.2)
+        return found
+
+    monkeypatch.setattr(tables, 'row', slow_row)
+
+    bids = [threading.Thread(target=Bid, args=(9, 'testuser1', 10)),
+            threading.Thread(target=Bid, args=(9, 'feliciadunn4', 20))]
+    for bid in bids:
+        bid.start()
+    for bid in bids:
+        bid.join()
+
+    demand = tables.row('Demand', 9)
+    assert demand['bid_count'] == 2
+    assert demand['min_bid'] == 10
+    assert len(tables.lookup('Bid', 'demand_id', 9)) == 2
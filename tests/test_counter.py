@@ -0,0 +1,24 @@
+import threading
+import time
+import tables
+from models import Counter
+
+
+def test_concurrent_additions_are_all_counted(database, monkeypatch):
+    lookup = tables.lookup
+
+    def slow_lookup(name, column, value):
+        # give the other additions time to read the counter before this one is written
+        found = lookup(name, column, value)
+        time.sleep(0.1)
+        return found
+
+    monkeypatch.setattr(tables, 'lookup', slow_lookup)
+
+    additions = [threading.Thread(target=Counter.add, args=('users', 1)) for _ in range(3)]
+    for addition in additions:
+        addition.start()
+    for addition in additions:
+        addition.join()
+
+    assert Counter.get('users') == 18
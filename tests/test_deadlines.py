@@ -0,0 +1,109 @@
+import contextlib
+import datetime
+import os
+import shutil
+import subprocess
+import sys
+import pandas as pd
+import tables
+from conftest import ROOT
+from models import Demand
+
+DATE_FORMAT = '%m-%d-%Y %I:%M %p'
+# tables the sweeps write to, and their columns that hold the time the row was written
+SWEPT = ['Demand', 'Notification', 'Transaction', 'Rating', 'Developer']
+TIMES = ['date_posted', 'date_sent']
+
+# posts a demand that has already expired, then opens it again, from another process
+WRITER = '''
+import tables
+ids = tables.append('Demand', [{'client_username': 'testuser0', 'date_posted': '12-07-2017 01:01 AM',
+                                'title': 'elsewhere', 'tags': 'other process', 'specifications': 'none',
+                                'bidding_deadline': '01-01-2100 12:00 AM', 'submission_deadline': '01-02-2100 12:00 AM',
+                                'is_completed': False, 'bidding_deadline_approaching_notif_sent': False,
+                                'is_expired': True, 'submission_deadline_approaching_notif_sent': False,
+                                'bid_count': 0}])
+tables.update_rows('Demand', ids, {'is_expired': False})
+print(ids[0])
+'''
+
+
+def test_demands_written_by_another_process_are_queued(database):
+    queue = Demand.get_deadlines()
+    size = len(queue)
+
+    output = subprocess.check_output([sys.executable, '-c', WRITER], cwd=database,
+                                     env=dict(os.environ, PYTHONPATH=ROOT))
+    demand_id = int(output)
+
+    # the queue follows the other process's changes instead of being built again
+    assert Demand.get_deadlines() is queue
+    assert len(queue) > size
+    with queue.due('expired', datetime.datetime(2100, 1, 2)) as demand_ids:
+        assert demand_id in demand_ids
+
+
+class _Scan:
+    """
+    Stands in for the deadline queue and hands every demand to each check, the way the
+    sweeps did before the queue.
+    """
+    @contextlib.contextmanager
+    def due(self, kind, now):
+        yield tables.read('Demand').index.tolist()
+
+
+def _sweep():
+    Demand.check_approaching_bidding_deadlines()
+    Demand.check_approaching_submission_deadlines()
+    Demand.check_expired_demands()
+    Demand.check_overdue_demands()
+
+
+def _run_sweeps(soon, later):
+    """
+    Posts demands due at different times, sweeps, changes some demands and sweeps again.
+    Returns the tables the sweeps write to.
+    """
+    for title, bidding, submission in [('bidding soon', soon, later), ('far away', later, later),
+                                       ('submission soon', later, soon), ('reopened', later, later)]:
+        Demand('samjohnson', title, 'tags', 'specs', bidding.strftime(DATE_FORMAT), submission.strftime(DATE_FORMAT))
+    demands = tables.read('Demand')
+    ids = dict(zip(demands['title'], demands.index))
+    tables.update_rows('Demand', [ids['submission soon']], {'chosen_developer_username': 'testuser0', 'bid_amount': 5.0,
+                                                          'bid_count': 1})
+    _sweep()
+
+    # a demand whose deadline moves into the past, one given a developer that is already late,
+    # and an expired one that is opened again
+    past = (soon - datetime.timedelta(days=3)).strftime(DATE_FORMAT)
+    tables.update_rows('Demand', [ids['far away']], {'bidding_deadline': past})
+    tables.update_rows('Demand', [ids['submission soon']], {'submission_deadline': past})
+    tables.update_rows('Demand', [ids['reopened']], {'is_expired': True})
+    tables.update_rows('Demand', [ids['reopened']], {'is_expired': False, 'bidding_deadline': past})
+    _sweep()
+
+    tables._cache.clear()
+    return dict((name, tables.read(name)) for name in SWEPT)
+
+
+def test_queued_sweeps_change_the_tables_like_scanning_every_demand(database, monkeypatch, tmpdir):
+    bundled = str(tmpdir.join('bundled'))
+    shutil.copytree(tables.DATABASE_DIR, bundled)
+    now = datetime.datetime.now()
+    soon, later = now + datetime.timedelta(hours=12), now + datetime.timedelta(days=30)
+
+    queued = _run_sweeps(soon, later)
+
+    # start again from the same tables, this time scanning every demand
+    shutil.rmtree(tables.DATABASE_DIR)
+    shutil.copytree(bundled, tables.DATABASE_DIR)
+    tables._cache.clear()
+    tables._views.clear()
+    monkeypatch.setattr(Demand, 'get_deadlines', staticmethod(lambda: _Scan()))
+    scanned = _run_sweeps(soon, later)
+
+    for name in SWEPT:
+        columns = [column for column in queued[name].columns if column not in TIMES]
+        pd.testing.assert_frame_equal(queued[name][columns], scanned[name][columns])
+    assert len(queued['Notification']) > len(tables.CsvBackend(bundled).load('Notification'))
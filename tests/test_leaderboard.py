@@ -0,0 +1,74 @@
+import pytest
+import leaderboard
+import tables
+from models import Client, Demand, Developer, User
+
+# leaderboard.SIZE before the tests change it
+SIZE = leaderboard.SIZE
+BOARDS = [(leaderboard.PROJECTS, 'Demand'), (leaderboard.EARNINGS, 'Developer'),
+          (leaderboard.COMPLETED, 'Client'), (leaderboard.COMPLETED, 'Developer')]
+
+
+def _scores(board, name):
+    """
+    Returns the score of each user on [board], counted from the whole table [name].
+    """
+    frame = tables.read(name)
+    if isinstance(board, leaderboard.CountBoard):
+        return frame.groupby(board.column).size().to_dict()
+    frame = frame.loc[frame['username'].notnull()]
+    return dict(zip(frame['username'], frame[board.column].fillna(0)))
+
+
+def _ranked(scores, keep=lambda username: True):
+    """
+    Returns the users in [scores] that keep(username) is True for, highest score first, by sorting all of them.
+    """
+    return [username for score, username in sorted((-score, username) for username, score in scores.items())
+            if keep(username)]
+
+
+def _check(size):
+    for board, name in BOARDS:
+        assert board.get(name).first(size) == _ranked(_scores(board, name))[:size]
+
+    # with fewer users kept than the default, skipping unlisted users may leave too few to show
+    if size == SIZE:
+        projects = _scores(leaderboard.PROJECTS, 'Demand')
+        assert Client.get_clients_with_most_projects() == _ranked(projects, User.is_listed)[:3]
+        earnings = _scores(leaderboard.EARNINGS, 'Developer')
+        assert Developer.get_top_earners() == _ranked(
+            earnings, lambda username: earnings[username] > 0 and User.is_listed(username))[:3]
+        for most_active, name in [(Client.get_most_active_clients, 'Client'),
+                                  (Developer.get_most_active_developers, 'Developer')]:
+            completed = _ranked(_scores(leaderboard.COMPLETED, name), User.is_listed)[:3]
+            assert most_active() == [User.get_user_info(username) for username in completed]
+
+
+@pytest.mark.parametrize('size', [3, SIZE])
+def test_leaderboards_match_sorting_every_user(database, monkeypatch, size):
+    # a leaderboard smaller than the tables refills itself when a top user's score drops
+    monkeypatch.setattr(leaderboard, 'SIZE', size)
+    _check(size)
+    built = [board.get(name) for board, name in BOARDS]
+
+    for title in ['one', 'two', 'three']:
+        Demand('javocado0', title, 'tags', 'specs', '01-01-2018 12:00 AM', '01-02-2018 12:00 AM')
+    tables.update_rows('Demand', [0, 1, 2], {'client_username': 'tks'})
+    Developer.add_earnings('jane-dev', 10)
+    tables.update('Developer', 'username', 'testuser1', {'earnings': 0.5})
+    Developer.add_completed_project('hedikarts')
+    Client.add_completed_project('kiehlpearson00')
+    Client.add_completed_project('kiehlpearson00')
+    Client.add_completed_project('jamfun000')
+    tables.update('Client', 'username', 'kiehlpearson00', {'num_of_completed_projects': 0})
+    tables.append('Client', [{'username': 'newclient', 'avg_rating': 0, 'avg_given_rating': 0,
+                              'num_of_completed_projects': 4, 'num_of_warnings': 0, 'balance': 0}])
+    tables.update('Developer', 'username', 'jane-dev', {'earnings': 0})
+    _check(size)
+    # the leaderboards followed the changes instead of being built again
+    assert [board.get(name) for board, name in BOARDS] == built
+
+    tables.delete_rows('Demand', [3, 4])
+    tables.delete('Developer', 'username', 'jane-dev')
+    _check(size)
@@ -0,0 +1,32 @@
+import tables
+from conftest import run_together, slow_down
+from models import Ledger, Transaction
+
+
+def test_concurrent_deposits_post_their_own_transactions(database, monkeypatch):
+    slow_down(monkeypatch, 'append')
+    run_together([(Transaction.deposit, ('testuser0', 10)), (Transaction.deposit, ('samjohnson', 20))])
+
+    transactions = tables.lookup('Transaction', 'sender', Ledger.CREDIT_CARD).set_index('transaction_id')
+    entries = tables.read('Ledger')
+    deposits = entries.loc[entries['transaction_id'].isin(transactions.index) & (entries['amount'] > 0)]
+    assert len(deposits) == 2
+    for transaction_id, account, amount in zip(deposits['transaction_id'], deposits['account'], deposits['amount']):
+        assert transactions.at[transaction_id, 'recipient'] == account
+        assert transactions.at[transaction_id, 'amount'] == amount
+
+
+def test_concurrent_approvals_post_a_transaction_once(database, monkeypatch):
+    balance = Ledger.get_balance('superuser0')
+    slow_down(monkeypatch, 'read')
+    run_together([(Transaction.approve_many, ([12], 'superuser0')), (Transaction.approve_many, ([12], 'superuser0'))])
+
+    assert (tables.read('Ledger')['transaction_id'] == 12).sum() == 2
+    assert Ledger.get_balance('superuser0') == balance + 10
+
+
+def test_every_entry_belongs_to_a_transaction(database):
+    Ledger.open_account('newclient', 100)
+    entries = tables.read('Ledger')
+    assert entries['transaction_id'].dtype.kind == 'i'
+    assert entries['transaction_id'].isin(tables.read('Transaction')['transaction_id']).all()
@@ -0,0 +1,47 @@
+import helpers
+import minhash
+import tables
+from models import Demand
+
+
+def _most_similar(demand_id, count):
+    """
+    Returns the ids of the [count] demands whose tags are most similar to those of [demand_id],
+    found by comparing it to every other demand.
+    """
+    demands = tables.read('Demand')
+    tags = helpers.tokenize_tags(demands.at[demand_id, 'tags'])
+    scored = sorted((-minhash.jaccard(tags, helpers.tokenize_tags(other_tags)), other_id)
+                    for other_id, other_tags in demands['tags'].items() if other_id != demand_id)
+    return [other_id for score, other_id in scored[:count] if score < 0]
+
+
+def _index():
+    return tables.view('Demand', minhash.DemandIndex, minhash.DemandIndex.add, minhash.DemandIndex.update)
+
+
+def _check():
+    index = _index()
+    rebuilt = minhash.DemandIndex(tables.read('Demand'))
+    assert index.tags == rebuilt.tags
+    assert index._buckets == rebuilt._buckets
+
+    for demand_id in tables.read('Demand').index:
+        assert Demand.get_similar_demands(demand_id) == _most_similar(demand_id, 3)
+
+
+def test_minhash_index_finds_what_comparing_every_demand_finds(database):
+    _check()
+    index = _index()
+
+    Demand('samjohnson', 'new', 'testing again, python', 'specs', '01-01-2018 12:00 AM', '01-02-2018 12:00 AM')
+    Demand('samjohnson', 'new', 'toast python flask', 'specs', '01-01-2018 12:00 AM', '01-02-2018 12:00 AM')
+    tables.update_rows('Demand', [0, 6], {'tags': 'toast python'})
+    tables.update_rows('Demand', [1], {'title': 'same tags', 'tags': 'Testing, again!'})
+    tables.update_rows('Demand', [7], {'tags': float('nan')})
+    _check()
+    # the posted and changed demands were added to the index instead of building it again
+    assert _index() is index
+
+    tables.delete_rows('Demand', [2, 8])
+    _check()
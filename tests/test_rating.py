@@ -0,0 +1,60 @@
+import threading
+import time
+import pytest
+import helpers
+import tables
+from models import Demand, Rating
+
+
+def test_concurrent_ratings_of_one_user(database, monkeypatch):
+    view = tables.view
+
+    def slow_view(name, build, add=None, update=None):
+        # give the other rating time to read the totals before this one is written
+        found = view(name, build, add, update)
+        time.sleep(0.2)
+        return found
+
+    monkeypatch.setattr(tables, 'view', slow_view)
+
+    ratings = [threading.Thread(target=Rating, args=(1, 'hedikarts', 'testuser0', 3)),
+               threading.Thread(target=Rating, args=(2, 'hedikarts', 'samjohnson', 5))]
+    for rating in ratings:
+        rating.start()
+    for rating in ratings:
+        rating.join()
+
+    assert Rating.get_avg_rating('hedikarts') == 4
+    assert tables.lookup('Developer', 'username', 'hedikarts')['avg_rating'].item() == 4
+
+
+def test_overdue_sweep_rates_every_developer_with_one_pass_over_the_ratings(database, monkeypatch):
+    build = helpers.build_rating_totals
+    built = []
+
+    def counted_build(frame):
+        built.append('message' in frame)
+        return build(frame)
+
+    monkeypatch.setattr(helpers, 'build_rating_totals', counted_build)
+
+    Demand.check_overdue_demands()
+
+    rated = tables.read('Rating')
+    automatic = rated.loc[rated['message'] == 'System demand overdue.']
+    assert len(automatic) > 1
+    # the totals are only computed from the whole Rating table once, not once per rating
+    assert built.count(True) == 1
+
+    # the averages of the users rated by the sweep cover all their ratings
+    rated = rated.assign(rating=rated['rating'].astype(float))
+    checked = 0
+    for column, average_column in [('recipient', 'avg_rating'), ('rater', 'avg_given_rating')]:
+        averages = rated.groupby(column)['rating'].mean()
+        for username in automatic[column].unique():
+            found = [tables.lookup(name, 'username', username) for name in ['Client', 'Developer']]
+            stored = [users[average_column].item() for users in found if not users.empty]
+            if stored:  # some demands name developers who are not in the bundled data
+                assert stored == [pytest.approx(averages[username])]
+                checked += 1
+    assert checked > 1
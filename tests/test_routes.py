@@ -0,0 +1,24 @@
+import tables
+from routes import app
+
+
+@app.route('/test/fail-after-write')
+def fail_after_write():
+    tables.append('Notification', [{'recipient': 'testuser0', 'sender': 'test', 'message': 'partial write'}],
+                  id_column='message_id')
+    raise RuntimeError('failed part way')
+
+
+@app.errorhandler(500)
+def internal_error(error):
+    return 'failed', 500
+
+
+def test_request_that_raises_writes_nothing(database):
+    client = app.test_client()
+    response = client.get('/test/fail-after-write')
+
+    assert response.status_code == 500
+    assert (tables.read('Notification')['message'] == 'partial write').sum() == 0
+    # the next request starts a session of its own
+    assert tables._session() is None
@@ -0,0 +1,66 @@
+import collections
+import math
+import pytest
+import helpers
+import similarity
+import tables
+from models import Demand
+
+QUERIES = [collections.Counter({'testing': 1}), collections.Counter({'test': 2, 'demand': 1}),
+           collections.Counter({'toast': 1, 'python': 3, 'unknown': 1}),
+           collections.Counter({'testing': 1, 'toast': 2, 'demand': 1}), collections.Counter({'unknown': 1})]
+
+
+def _scores(column, tags):
+    """
+    Returns the cosine similarity of each user's TF-IDF vector with [tags], computed from every demand.
+    """
+    counts = collections.defaultdict(collections.Counter)
+    demands = tables.read('Demand')
+    for username, demand_tags in zip(demands[column], demands['tags']):
+        if isinstance(username, str):
+            counts[username].update(helpers.tokenize_tags(demand_tags))
+    counts = dict((username, tag_counts) for username, tag_counts in counts.items() if tag_counts)
+
+    users = collections.Counter(tag for tag_counts in counts.values() for tag in tag_counts)
+    idf = dict((tag, math.log((1.0 + len(counts)) / (1.0 + users[tag])) + 1.0) for tag in users)
+
+    scores = {}
+    for username, tag_counts in counts.items():
+        vector = dict((tag, (1.0 + math.log(count)) * idf[tag]) for tag, count in tag_counts.items())
+        norm = math.sqrt(sum(weight ** 2 for weight in vector.values()))
+        scores[username] = sum(vector[tag] / norm * (1.0 + math.log(frequency)) * idf[tag]
+                               for tag, frequency in tags.items() if tag in vector)
+    return scores
+
+
+def _check(vectors):
+    for tags in QUERIES:
+        scores = _scores(vectors.column, tags)
+        for count, exclude in [(1, ()), (3, ()), (3, ('testuser1', 'testuser0'))]:
+            found = vectors.similar(tags, count, exclude)
+            expected = sorted((score for username, score in scores.items()
+                               if score > 0 and username not in exclude), reverse=True)[:count]
+            # users with the same score may come in either order
+            assert [scores[username] for username in found] == pytest.approx(expected)
+            assert not set(found) & set(exclude)
+
+
+def test_tag_vectors_rank_users_like_computing_every_vector(database):
+    for get in [similarity.get_clients, similarity.get_developers]:
+        _check(get())
+    built = [similarity.get_clients(), similarity.get_developers()]
+
+    Demand('javocado0', 'new', 'python python toast', 'specs', '01-01-2018 12:00 AM', '01-02-2018 12:00 AM')
+    Demand('newclient', 'new', 'test demand', 'specs', '01-01-2018 12:00 AM', '01-02-2018 12:00 AM')
+    tables.update_rows('Demand', [0, 1], {'tags': 'toast', 'chosen_developer_username': 'jane-dev'})
+    tables.update_rows('Demand', [6], {'client_username': 'javocado0'})
+    tables.update_rows('Demand', [7], {'tags': float('nan')})
+    for get in [similarity.get_clients, similarity.get_developers]:
+        _check(get())
+    # the vectors followed the changes instead of being built again
+    assert [similarity.get_clients(), similarity.get_developers()] == built
+
+    tables.delete_rows('Demand', [2, 8])
+    for get in [similarity.get_clients, similarity.get_developers]:
+        _check(get())
@@ -0,0 +1,140 @@
+import shutil
+import threading
+import time
+import pandas as pd
+import tables
+from sqlstore import SqliteBackend, metadata, versions, journal
+from models import Applicant, Bid, DeleteRequest, Demand, Notification, Rating, Transaction
+
+# columns that hold the time the row was written
+TIMES = ['date_posted', 'date_bidded', 'date_sent', 'generated_at', 'last_bid_at']
+NAMES = [name for name in metadata.tables if name not in (versions.name, journal.name)]
+
+
+def _same(left, right):
+    columns = [column for column in right.columns if column not in TIMES]
+    pd.testing.assert_frame_equal(left[columns].reset_index(drop=True), right[columns].reset_index(drop=True),
+                                  check_dtype=False, check_index_type=False)
+
+
+def test_migrate_copies_every_table(sqlite_database):
+    csv = tables.CsvBackend()
+
+    for name in NAMES:
+        _same(csv.load(name), tables.backend.load(name))
+
+
+def test_frame_gives_rows_the_types_of_the_table(sqlite_database):
+    frame = tables.backend.frame('Applicant', ['user_id', 'phone', 'status'], [7],
+                                 [{'user_id': '12345', 'phone': '1234567890', 'status': 'pending'}])
+
+    assert frame['user_id'].item() == '12345'
+    assert frame['phone'].item() == 1234567890
+    assert frame.index.tolist() == [7]
+
+
+def test_lookup_returns_the_rows_of_the_csv_table(sqlite_database):
+    expected = tables.CsvBackend().load('User')
+    expected = expected[expected['username'] == 'samjohnson']
+
+    found = tables.backend.lookup('User', 'username', 'samjohnson')
+
+    _same(expected, found)
+    assert found.index.tolist() == expected.index.tolist()
+    assert tables.backend.lookup('Applicant', 'user_id', 12345).empty
+
+
+def test_writes_from_another_process_invalidate_the_cache(sqlite_database):
+    other = SqliteBackend(sqlite_database)
+    bids = len(tables.read('Bid'))
+    tables.lookup('Bid', 'developer_username', 'nobody')  # builds the index of the column
+    stamp = tables.backend.stamp('Bid')
+
+    other.insert('Bid', ['demand_id', 'developer_username', 'bid_amount'], [other.count('Bid')],
+                 [{'demand_id': 7, 'developer_username': 'nobody', 'bid_amount': 1.0}])
+
+    assert tables.backend.stamp('Bid') == stamp + 1
+    assert len(tables.read('Bid')) == bids + 1
+    assert tables.lookup('Bid', 'developer_username', 'nobody')['bid_amount'].tolist() == [1.0]
+
+
+def test_transaction_holds_the_write_lock_of_the_database(sqlite_database):
+    other = SqliteBackend(sqlite_database)
+    locked = threading.Event()
+    events = []
+
+    def write_slowly():
+        with other.transaction():
+            locked.set()
+            time.sleep(0.3)
+            other.insert('Bid', ['demand_id', 'developer_username', 'bid_amount'], [other.count('Bid')],
+                         [{'demand_id': 7, 'developer_username': 'first', 'bid_amount': 1.0}])
+            events.append('first')
+
+    thread = threading.Thread(target=write_slowly)
+    thread.start()
+    locked.wait()
+    tables.append('Bid', [{'demand_id': 7, 'developer_username': 'second', 'bid_amount': 2.0}])
+    events.append('second')
+    thread.join()
+
+    assert events == ['first', 'second']
+    bids = tables.read('Bid')
+    assert bids['developer_username'].tolist()[-2:] == ['first', 'second']
+    assert bids.index.is_unique
+
+
+def _run_model_calls():
+    """
+    Makes the same model calls on the current backend, and returns what they returned
+    and the contents of every table afterwards.
+    """
+    results = []
+    Applicant('client', 'first', 'last', 'applicant@example.com', '1234567890', '1234', '12345', 'password')
+    results.append(Applicant.approve_many(['12345', 'jennylee', 'samjohnson']))
+    results.append(Applicant.check_password('12345', 'password'))
+
+    Demand('samjohnson', 'title', 'python, flask', 'specs', '01-01-2018 12:00 AM', '01-02-2018 12:00 AM')
+    demand_id = Demand.get_most_recent_demand_id()
+    Bid(demand_id, 'testuser0', 10)
+    Bid(demand_id, 'testuser0', 8)
+    results.append(Bid.get_bids_for_demand(demand_id))
+
+    transaction_id = Transaction.deposit('samjohnson', 25)
+    Transaction('testuser0', 'samjohnson', 5)
+    pending = [row['transaction_id'] for row in Transaction.get_pending_transactions()]
+    results.append(Transaction.approve_many(pending, 'admin'))
+    results.append(Transaction.get_transaction_info(transaction_id)['amount'])
+
+    Rating(demand_id, 'testuser0', 'samjohnson', 4, 'good')
+    results.append(Rating.get_avg_rating('testuser0'))
+    Notification('samjohnson', 'testuser0', 'hello')
+    results.append(Notification.get_number_of_unread('samjohnson'))
+
+    DeleteRequest('testuser2')
+    pending = [row['delete_request_id'] for row in DeleteRequest.get_pending_delete_requests()]
+    results.append(DeleteRequest.approve_many(pending))
+    Demand.check_expired_demands()
+    Demand.check_overdue_demands()
+
+    tables._cache.clear()
+    return results, dict((name, tables.read(name)) for name in NAMES)
+
+
+def test_model_calls_do_the_same_on_both_backends(database, monkeypatch, tmpdir):
+    bundled = str(tmpdir.join('bundled'))
+    shutil.copytree(tables.DATABASE_DIR, bundled)
+    csv_results, csv_tables = _run_model_calls()
+
+    # start again from the bundled tables, this time in a SQLite database
+    url = 'sqlite:///' + str(tmpdir.join('other.db'))
+    monkeypatch.setattr(tables, 'backend', SqliteBackend(url))
+    for name in NAMES:
+        tables.backend.save(name, tables.CsvBackend(bundled).load(name))
+    tables._cache.clear()
+    tables._views.clear()
+    sqlite_results, sqlite_tables = _run_model_calls()
+
+    assert csv_results == sqlite_results
+    for name in NAMES:
+        _same(csv_tables[name], sqlite_tables[name])
@@ -0,0 +1,91 @@
+import pandas as pd
+import tables
+from models import Applicant
+
+
+def test_appended_rows_get_the_types_of_the_table(database):
+    tables.read('Applicant')  # cache the table, so the new row is added to the cached copy
+    tables.append('Applicant', [{'user_id': '12345', 'first_name': 'a', 'status': 'pending'}])
+
+    found = tables.lookup('Applicant', 'user_id', '12345')
+    assert len(found) == 1
+    assert found['user_id'].item() == '12345'
+    assert (tables.read('Applicant')['user_id'] == '12345').sum() == 1
+
+
+def test_rows_appended_in_a_session_get_the_types_of_the_table(database):
+    with tables.session():
+        tables.append('Applicant', [{'user_id': '12345', 'first_name': 'a', 'status': 'pending'}])
+        assert len(tables.lookup('Applicant', 'user_id', '12345')) == 1
+
+
+def test_applicant_with_a_numeric_id_is_found_in_the_same_process(database):
+    Applicant('client', 'first', 'last', 'applicant@example.com', '1234567890', '1234', '12345', 'password')
+
+    assert not Applicant.is_unique_user_id('12345')
+    assert Applicant.check_password('12345', 'password')
+    assert Applicant.get_applicant_info('12345')['first_name'] == 'first'
+
+
+def _check_index(name, column):
+    """
+    Asserts that looking up every value of [column] returns the rows that scanning the stored table finds.
+    """
+    stored = tables.CsvBackend().load(name)
+    for value in stored[column].dropna().unique().tolist() + ['missing']:
+        pd.testing.assert_frame_equal(tables.lookup(name, column, value), stored.loc[stored[column] == value],
+                                      check_dtype=False)
+
+
+def _indexed(name, columns):
+    for column in columns:
+        tables.lookup(name, column, 'missing')
+    return tables._cache[name]
+
+
+def test_index_follows_appended_rows(database):
+    entry = _indexed('Bid', ['developer_username', 'demand_id'])
+
+    tables.append('Bid', [{'demand_id': 7, 'developer_username': 'testuser0', 'bid_amount': 1.0},
+                          {'demand_id': 99, 'developer_username': 'newcomer', 'bid_amount': 2.0}])
+    with tables.session():
+        tables.append('Bid', [{'demand_id': 99, 'developer_username': 'newcomer', 'bid_amount': 3.0}])
+
+    # the rows were added to the cached table and its indexes instead of loading the table again
+    assert tables._cache['Bid'] is entry
+    assert len(entry.indexes['demand_id'][99]) == 2
+    _check_index('Bid', 'developer_username')
+    _check_index('Bid', 'demand_id')
+
+
+def test_index_follows_deleted_rows(database):
+    entry = _indexed('Bid', ['developer_username', 'demand_id'])
+    bids = tables.read('Bid')
+
+    tables.delete_rows('Bid', [0, len(bids) // 2])
+    tables.delete('Bid', 'developer_username', bids['developer_username'].iloc[-1])
+
+    assert tables._cache['Bid'] is not entry
+    assert set(tables._cache['Bid'].indexes) == set(['developer_username', 'demand_id'])
+    _check_index('Bid', 'developer_username')
+    _check_index('Bid', 'demand_id')
+
+
+def test_index_follows_updated_rows(database):
+    _indexed('Bid', ['developer_username', 'demand_id'])
+
+    tables.update_rows('Bid', [0, 1], {'developer_username': 'renamed', 'demand_id': 99})
+    tables.update('Bid', 'demand_id', 7, {'developer_username': 'renamed'})
+
+    _check_index('Bid', 'developer_username')
+    _check_index('Bid', 'demand_id')
+
+
+def test_index_follows_writes_from_another_process(database):
+    _indexed('Bid', ['developer_username', 'demand_id'])
+    stored = tables.CsvBackend().load('Bid')
+    stored.loc[0, 'developer_username'] = 'elsewhere'
+    tables.CsvBackend().save('Bid', stored.drop(1))
+
+    _check_index('Bid', 'developer_username')
+    _check_index('Bid', 'demand_id')
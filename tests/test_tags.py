@@ -0,0 +1,40 @@
+import re
+import helpers
+import tables
+from models import Demand
+
+QUERIES = ['testing', 'DEMAND, toast', 'tag here', 'python flask', 'no such tag', '']
+
+
+def _scan(tags):
+    """
+    Returns the ids of the demands sharing a tag with [tags], found by splitting the tags of every demand.
+    """
+    wanted = set(tag.lower() for tag in re.findall(r'[^\s!,.?":;0-9]+', tags))
+    demands = tables.read('Demand')
+    return set(demand_id for demand_id, demand_tags in demands['tags'].fillna('').items()
+               if wanted & set(tag.lower() for tag in re.findall(r'[^\s!,.?":;0-9]+', demand_tags)))
+
+
+def _check():
+    for tags in QUERIES:
+        assert Demand.get_demands_with_tags(tags) == _scan(tags)
+
+
+def _index():
+    return tables.view('Demand', helpers.build_tag_index, helpers.add_to_tag_index, helpers.update_tag_index)
+
+
+def test_tag_index_finds_what_scanning_the_demands_finds(database):
+    _check()
+    index = _index()
+
+    Demand('samjohnson', 'new', 'Python, Flask!', 'specs', '01-01-2018 12:00 AM', '01-02-2018 12:00 AM')
+    tables.update_rows('Demand', [0, 6], {'tags': 'toast python'})
+    tables.update_rows('Demand', [7], {'tags': float('nan')})
+    _check()
+    # the posted and changed demands were added to the index instead of building it again
+    assert _index() is index
+
+    tables.delete_rows('Demand', [1, 8])
+    _check()